@@ -0,0 +1,176 @@
+'''
+This module provides ActionProfiler, which counts how often each action is
+attempted and performed, and how long it takes.
+
+While a profiler is enabled, it replaces actions.performFirstApplicableAction
+(which every engine calls through the actions module) with an instrumented
+copy, so when no profiler is enabled the simulation runs exactly the code it
+always does.
+
+Example usage:
+profiler = ActionProfiler()
+profiler.enable()
+for i in range(100):
+    simulation.oneStep()
+profiler.disable()
+print profiler.table()
+
+Created on Oct 18, 2026
+'''
+
+import csv
+from timeit import default_timer
+import actions
+from actions import Neighborhood,CannotPerformActionException
+
+_enabledProfiler = None # The profiler which is enabled, if any.
+
+class ActionProfiler(object):
+    """
+    Records, for every action letter:
+    attempts: how many times the action was considered for a monster's turn.
+    successes: how many times it was performed.
+    failures: how many times it couldn't be (because its precondition was
+    false, or it raised CannotPerformActionException).
+    exceptions: how many CannotPerformActionExceptions it raised (which only
+    actions without a precondition do).
+    seconds: the total time spent checking its precondition and performing it.
+    
+    It also records totals for every step, in steps: a list of (step, turns,
+    attempts, successes, failures, exceptions, seconds) tuples, where turns
+    is the number of monster turns and seconds the time spent choosing and
+    performing actions. (The step is taken from the simulation's stepCount.)
+    
+    The counts are dicts keyed by letter, and only include actions which have
+    been attempted.
+    
+    Only one profiler can be enabled at a time. It sees the actions taken in
+    this process only, so it can't profile the parallel engine's workers, and
+    it doesn't see batched actions (see actions.batchedAction), which don't go
+    through performFirstApplicableAction.
+    """
+    def __init__(self):
+        self.attempts = {}
+        self.successes = {}
+        self.failures = {}
+        self.exceptions = {}
+        self.seconds = {}
+        self.steps = []
+        self._currentStep = None
+        self._stepTotals = None
+        self._originalFunction = None
+    
+    @property
+    def enabled(self):
+        return self._originalFunction != None
+    
+    def enable(self):
+        """Starts recording (every action performed in this process)."""
+        global _enabledProfiler
+        if self.enabled:
+            return
+        if _enabledProfiler != None:
+            raise Exception, "Another ActionProfiler is already enabled."
+        _enabledProfiler = self
+        self._originalFunction = actions.performFirstApplicableAction
+        actions.performFirstApplicableAction = self._performFirstApplicableAction
+    
+    def disable(self):
+        """Stops recording, and puts back the uninstrumented dispatch."""
+        global _enabledProfiler
+        if not self.enabled:
+            return
+        _enabledProfiler = None
+        actions.performFirstApplicableAction = self._originalFunction
+        self._originalFunction = None
+        self._finishStep()
+    
+    def _finishStep(self):
+        """Adds the totals of the current step (if any) to steps."""
+        if self._stepTotals != None:
+            self.steps.append(tuple([self._currentStep] + self._stepTotals))
+        self._currentStep = None
+        self._stepTotals = None
+    
+    def _count(self,counts,letter):
+        counts[letter] = counts.get(letter,0) + 1
+    
+    def _performFirstApplicableAction(self,simulator,monster,monsterCoords):
+        """An instrumented copy of actions.performFirstApplicableAction."""
+        if simulator.stepCount != self._currentStep:
+            self._finishStep()
+            self._currentStep = simulator.stepCount
+            self._stepTotals = [0,0,0,0,0,0.0]
+        stepTotals = self._stepTotals
+        stepTotals[0] += 1
+        startTime = default_timer()
+        performed = None
+        neighborhood = Neighborhood(simulator,monsterCoords)
+        for action in monster.dna:
+            letter = action.letter
+            self._count(self.attempts,letter)
+            stepTotals[1] += 1
+            actionStartTime = default_timer()
+            precondition = action.precondition
+            if precondition == None:
+                try:
+                    action(simulator,monster,monsterCoords)
+                    performed = action
+                except CannotPerformActionException:
+                    self._count(self.exceptions,letter)
+                    stepTotals[4] += 1
+            elif precondition(simulator,monster,neighborhood):
+                action(simulator,monster,monsterCoords,neighborhood)
+                performed = action
+            self.seconds[letter] = self.seconds.get(letter,0.0) + default_timer() - actionStartTime
+            if performed != None:
+                self._count(self.successes,letter)
+                stepTotals[2] += 1
+                break
+            self._count(self.failures,letter)
+            stepTotals[3] += 1
+        stepTotals[5] += default_timer() - startTime
+        return performed
+    
+    def rows(self):
+        """
+        Returns the per-action results as a list of (letter, name, attempts,
+        successes, failures, exceptions, seconds, microseconds per attempt)
+        tuples, in the order of actions.ALL_ACTIONS.
+        """
+        rows = []
+        for action in actions.ALL_ACTIONS:
+            letter = action.letter
+            attempts = self.attempts.get(letter,0)
+            seconds = self.seconds.get(letter,0.0)
+            rows.append((letter,action.name,attempts,self.successes.get(letter,0),self.failures.get(letter,0),
+                         self.exceptions.get(letter,0),seconds,seconds*1e6/attempts if attempts else 0.0))
+        return rows
+    
+    def table(self):
+        """Returns the per-action results (and their totals) as a text table."""
+        lines = ["{0:<16} {1:>10} {2:>10} {3:>10} {4:>10} {5:>9} {6:>9}".format(
+            "action","attempts","successes","failures","exceptions","seconds","us/try")]
+        rows = self.rows()
+        for letter,name,attempts,successes,failures,exceptions,seconds,perAttempt in rows:
+            lines.append("{0:<16} {1:>10} {2:>10} {3:>10} {4:>10} {5:>9.3f} {6:>9.2f}".format(
+                "{0} ({1})".format(letter,name),attempts,successes,failures,exceptions,seconds,perAttempt))
+        totals = [sum(row[i] for row in rows) for i in range(2,7)]
+        lines.append("{0:<16} {1:>10} {2:>10} {3:>10} {4:>10} {5:>9.3f}".format("total",*totals))
+        return "\n".join(lines)
+    
+    def writeCSV(self,filename):
+        """
+        Writes the per-action results to a CSV file, and the per-step totals
+        to another, with "_steps" added before the extension.
+        """
+        with open(filename,"wb") as profileFile:
+            writer = csv.writer(profileFile)
+            writer.writerow(["letter","name","attempts","successes","failures","exceptions","seconds","usPerAttempt"])
+            writer.writerows(self.rows())
+        root,dot,extension = filename.rpartition(".")
+        stepsFilename = root + "_steps." + extension if dot else filename + "_steps"
+        with open(stepsFilename,"wb") as stepsFile:
+            writer = csv.writer(stepsFile)
+            writer.writerow(["step","turns","attempts","successes","failures","exceptions","seconds"])
+            writer.writerows(self.steps)
@@ -17,22 +17,46 @@ class CannotPerformActionException(Exception):
 ALL_ACTIONS = []
 DNA_MAP = {}
 
-def monsterAction(actionFunction,letter=None):
+def monsterAction(actionFunction=None,letter=None,precondition=None,inert=False):
     """
     This is a decorator function for monster action declarations.
     The "letter" parameter specifies the letter representing the action, used
     for compact string representations of monster DNA. If the parameter is not
     provided, the first letter of the function name will be used.
     
+    The optional "precondition" parameter is a function
+    precondition(simulator,monster,neighborhood) which cheaply returns whether
+    the action can be performed, given a Neighborhood (see below) of the
+    monster. An action with a precondition is only called when its
+    precondition is true, and is then passed the neighborhood as a fourth
+    argument, so that it does not need to scan the neighbors again. Actions
+    without a precondition are called without it, and signal that they cannot
+    be performed by raising CannotPerformActionException. Preconditions must
+    not use random numbers.
+    
+    The optional "inert" parameter marks actions which never change anything
+    (like idle), so that a monster performing one can be left alone until
+    something around it changes (see the scheduler module).
+    
     Example usage:
     @monsterAction("Z")
-    def sleep(simulator,monster,monsterCoords:
+    def sleep(simulator,monster,monsterCoords):
         ...
     
     @monsterAction  # Parameter is not provided, so letter will be "S"
     def selfDestruct(simulator,monster,monsterCoords):
         ...
+    
+    @monsterAction(precondition=lambda simulator,monster,neighborhood: neighborhood.food)
+    def gobble(simulator,monster,monsterCoords,neighborhood=None):
+        ...
     """
+    if actionFunction == None or isinstance(actionFunction,basestring):
+        # Called with parameters (like @monsterAction("Z")), so return the
+        # actual decorator.
+        if actionFunction != None:
+            letter = actionFunction
+        return lambda function: monsterAction(function,letter,precondition,inert)
     if letter == None:
         letter = actionFunction.__name__[0].upper()
     else:
@@ -40,11 +64,142 @@ def monsterAction(actionFunction,letter=None):
     assert len(letter) == 1 and letter in string.ascii_uppercase
     actionFunction.letter = letter
     actionFunction.name = actionFunction.__name__
+    actionFunction.precondition = precondition
+    actionFunction.inert = inert
+    actionFunction.batched = None
+    actionFunction.batchedPrecondition = None
+    actionFunction.moves = False
     ALL_ACTIONS.append(actionFunction)
     assert letter not in DNA_MAP
     DNA_MAP[letter] = actionFunction
     return actionFunction
 
+def batchedAction(action,precondition,moves=False):
+    """
+    This is a decorator function declaring the batched form of an action
+    (given as the action function or its letter), which performs the action
+    for many monsters at once. It is used by ArraySimulation when the
+    configurable value BATCHED_ACTIONS is true.
+    
+    The batched form is a function batched(simulator,indices,neighborhoods),
+    where indices is a NumPy array of the cell indices of the monsters which
+    chose the action, in increasing order, and neighborhoods is their
+    Neighborhoods (see below), as they were when the actions were chosen.
+    precondition is a function precondition(simulator,indices,neighborhoods)
+    which returns a boolean array saying which of the monsters can perform the
+    action, like the action's own precondition. Preconditions must not use
+    random numbers; batched actions must only use simulator.rng.
+    
+    "moves" should be true for actions which move monsters or put new ones
+    into cells. They are performed after all the other actions in a step, and
+    must go through simulator.claimCells (or simulator.moveMonsters, which
+    uses it), so that when several monsters want the same cell, the one with
+    the lowest index gets it and the others do nothing.
+    
+    Example usage:
+    @batchedAction(rest,precondition=lambda simulator,indices,neighborhoods: simulator.hp[indices] < 200)
+    def restAll(simulator,indices,neighborhoods):
+        ...
+    """
+    if isinstance(action,basestring):
+        action = DNA_MAP[action.upper()]
+    def register(batchedFunction):
+        action.batched = batchedFunction
+        action.batchedPrecondition = precondition
+        action.moves = moves
+        return batchedFunction
+    return register
+
+def alwaysPossible(simulator,monster,neighborhood):
+    """A precondition for actions which can always be performed."""
+    return True
+
+class Neighborhood(object):
+    """
+    The contents of the cells neighboring a monster, as passed to action
+    preconditions. The neighbors are scanned (once) the first time one of the
+    lists is used, so preconditions that don't need them cost nothing extra.
+    
+    empty is the list of neighbors without a monster (which may contain food).
+    monsters is the list of neighbors containing a monster.
+    food is the list of neighbors containing food.
+    
+    The lists must not be modified.
+    """
+    
+    __slots__ = ("_simulator","_coords","_scan")
+    
+    def __init__(self,simulator,coords):
+        self._simulator = simulator
+        self._coords = coords
+        self._scan = None
+    
+    def _getScan(self):
+        if self._scan == None:
+            self._scan = self._simulator.scanNeighbors(self._coords)
+        return self._scan
+    
+    @property
+    def empty(self):
+        return self._getScan()[0]
+    
+    @property
+    def monsters(self):
+        return self._getScan()[1]
+    
+    @property
+    def food(self):
+        return self._getScan()[2]
+
+class Neighborhoods(object):
+    """
+    The neighborhoods of many monsters at once, as passed to batched actions
+    and their preconditions (see batchedAction). Each attribute is a NumPy
+    array with a row per monster and a column per neighbor:
+    
+    cells holds the cell indices of the neighbors (-1 past the edge of the
+    board).
+    empty, monsters and food are boolean masks of the neighbors without a
+    monster (which may contain food), with a monster, and with food.
+    
+    The arrays must not be modified.
+    """
+    
+    __slots__ = ("cells","empty","monsters","food")
+    
+    def __init__(self,cells,empty,monsters,food):
+        self.cells = cells
+        self.empty = empty
+        self.monsters = monsters
+        self.food = food
+    
+    def subset(self,mask):
+        """Returns the Neighborhoods of the monsters selected by the given boolean array."""
+        return Neighborhoods(self.cells[mask],self.empty[mask],self.monsters[mask],self.food[mask])
+
+def performFirstApplicableAction(simulator,monster,monsterCoords):
+    """
+    Performs the first action in the monster's DNA whose preconditions are met,
+    and returns it (or returns None if there wasn't one).
+    
+    Actions with a precondition function are checked by calling it, against
+    one shared Neighborhood. Actions without one are simply tried, until one
+    doesn't raise a CannotPerformActionException.
+    """
+    neighborhood = Neighborhood(simulator,monsterCoords)
+    for action in monster.dna:
+        precondition = action.precondition
+        if precondition == None:
+            try:
+                action(simulator,monster,monsterCoords)
+                return action
+            except CannotPerformActionException:
+                pass
+        elif precondition(simulator,monster,neighborhood):
+            action(simulator,monster,monsterCoords,neighborhood)
+            return action
+    return None
+
 import basicactions
 # This is the only place the actions themselves are actually imported.
 # (Perhaps in the future they should be loaded in automatically from some
@@ -0,0 +1,701 @@
+'''
+This module provides ArraySimulation, an alternative simulation engine which
+stores the board as dense NumPy arrays (one array per property, indexed by
+cell) rather than as a dict of Coords. It is selected by setting the
+configurable value ENGINE to "array".
+
+The dict-based Simulation remains the reference implementation: both engines
+run the same actions, through the same query methods.
+
+Created on Oct 18, 2026
+'''
+
+import numpy
+from random import getrandbits
+import actions
+from boardelements import FOOD
+from utils.coords import Coords,CARDINAL_DIRECTIONS
+from simulator import SimulationBase,initialDNA,populatedArea
+from lineage import NO_PARENT
+from genomes import GenomeRegistry
+
+# Cell types, as stored in ArraySimulation.cellTypes.
+EMPTY_CELL = 0
+FOOD_CELL = 1
+MONSTER_CELL = 2
+
+class MonsterView(object):
+    """
+    A lightweight handle to a monster stored in an ArraySimulation. It has the
+    same attributes as a Monster, but reads and writes them directly from the
+    simulation's arrays.
+    
+    A MonsterView refers to a board cell rather than to the monster itself, so
+    it should not be kept around between steps. (moveMonster does update the
+    view it is given, though.)
+    """
+    
+    __slots__ = ("_simulation","_index")
+    
+    def __init__(self,simulation,index):
+        self._simulation = simulation
+        self._index = index
+    
+    @property
+    def hp(self):
+        return self._simulation.hp.item(self._index)
+    
+    @hp.setter
+    def hp(self,newValue):
+        self._simulation.hp[self._index] = newValue
+    
+    @property
+    def dna(self):
+        return self._simulation.genomeRegistry.get(self._simulation.genomeIds.item(self._index))
+    
+    @property
+    def color(self):
+        return tuple(self._simulation.colors[self._index].tolist())
+    
+    @property
+    def uid(self):
+        """A number identifying the monster, unique within its simulation."""
+        return self._simulation.uids.item(self._index)
+    
+    @property
+    def followed(self):
+        return self.uid in self._simulation._followed
+    
+    @followed.setter
+    def followed(self,newValue):
+        if newValue:
+            self._simulation._followed.add(self.uid)
+        else:
+            self._simulation._followed.discard(self.uid)
+    
+    @property
+    def name(self):
+        return self._simulation._names.get(self.uid)
+    
+    @name.setter
+    def name(self,newValue):
+        self._simulation._names[self.uid] = newValue
+    
+    @property
+    def lineageId(self):
+        return self._simulation._lineageIds.get(self.uid)
+    
+    @lineageId.setter
+    def lineageId(self,newValue):
+        self._simulation._lineageIds[self.uid] = newValue
+    
+    @property
+    def dnaString(self):
+        """Formats the DNA as a string, such as "DWIAFEHR"."""
+        return self.dna.string
+    
+    @property
+    def infoString(self):
+        """
+        Returns a string with info about the monster, in the same format as
+        Monster.infoString (but using the uid rather than the object id).
+        """
+        if self.name:
+            return "{0} ({1}), dna={2}, hp={3}".format(self.name,self.uid,self.dnaString,self.hp)
+        else:
+            return "{0}, dna={1}, hp={2}".format(self.uid,self.dnaString,self.hp)
+    
+    def __repr__(self):
+        return "<Monster {0}>".format(self.infoString)
+
+
+class ArraySimulation(SimulationBase):
+    """
+    This class represents the simulation as a whole, like Simulation, but
+    stores the board as a set of parallel NumPy arrays indexed by cell
+    (index = y*width + x):
+    cellTypes holds EMPTY_CELL, FOOD_CELL or MONSTER_CELL for each cell.
+    hp, colors and genomeIds hold the HP, RGB color and genome id of the
+    monster in each cell (and are meaningless for cells without a monster).
+    uids holds a number identifying the monster in each cell (or 0).
+    
+    Genome ids refer to the genomes interned in genomeRegistry, so each
+    distinct DNA is only stored once.
+    
+    Only bounded boards are supported.
+    """
+    def __init__(self,config,populate=True):
+        """
+        Creates a simulation with the given config. Unless populate is false,
+        the board is randomly filled with monsters and food.
+        """
+        if config.BOARD_WIDTH == None or config.BOARD_HEIGHT == None:
+            raise Exception, "The array engine requires a bounded board."
+        SimulationBase.__init__(self)
+        self.width = config.BOARD_WIDTH
+        self.height = config.BOARD_HEIGHT
+        self.config = config
+        self.wrap = config.WRAP_EDGES
+        self.stepCount = 0 # The number of steps run so far.
+        self._neighborOffsets = [tuple(dir.offset) for dir in CARDINAL_DIRECTIONS]
+        self.genomeRegistry = GenomeRegistry()
+        startGenome = self.genomeRegistry.intern(initialDNA(config))
+        
+        numCells = self.width*self.height
+        self.cellTypes = numpy.zeros(numCells,numpy.uint8)
+        self.hp = numpy.zeros(numCells,numpy.int32)
+        self.colors = numpy.zeros((numCells,3),numpy.uint8)
+        self.genomeIds = numpy.zeros(numCells,numpy.int32)
+        self.uids = numpy.zeros(numCells,numpy.int64)
+        self._nextUid = 1
+        self._followed = set()
+        self._lineageIds = {} # Maps uids to lineage ids, while lineage is tracked.
+        self._names = {}
+        self._neighborTable = None # The cell indices of every cell's neighbors, once batched actions are used.
+        self._claimed = None # Which cells have been claimed by batched actions, during a batched step.
+        self.rng = None # The NumPy RandomState batched actions draw from, during a batched step.
+        if populate:
+            self._populate(startGenome)
+            self._indexFreeCells()
+    
+    def _populate(self,startGenome):
+        """
+        Randomly places the starting monsters and food, with the same
+        probabilities and limits as Simulation.__init__, but in one vectorized
+        pass.
+        """
+        config = self.config
+        rng = numpy.random.RandomState(getrandbits(32))
+        shape = populatedArea(config)
+        # The masks are laid out column by column (x-major), like the loop in
+        # Simulation.__init__, so that MAX_NUM_MONSTERS and MAX_NUM_FOOD favor
+        # the left-hand side of the board in the same way.
+        monsterMask = rng.random_sample(shape) < config.MONSTER_DENSITY
+        monsterMask &= (numpy.cumsum(monsterMask) <= config.MAX_NUM_MONSTERS).reshape(shape)
+        foodMask = ~monsterMask & (rng.random_sample(shape) < config.FOOD_DENSITY)
+        foodMask &= (numpy.cumsum(foodMask) <= config.MAX_NUM_FOOD).reshape(shape)
+        
+        foodX,foodY = numpy.nonzero(foodMask)
+        self.cellTypes[foodY*self.width + foodX] = FOOD_CELL
+        monsterX,monsterY = numpy.nonzero(monsterMask)
+        monsterIndices = numpy.sort(monsterY*self.width + monsterX)
+        self.cellTypes[monsterIndices] = MONSTER_CELL
+        self.hp[monsterIndices] = config.INITIAL_HP
+        self.colors[monsterIndices] = config.INITIAL_COLOR
+        self.genomeIds[monsterIndices] = startGenome.id
+        self.uids[monsterIndices] = numpy.arange(self._nextUid,self._nextUid+len(monsterIndices))
+        self._nextUid += len(monsterIndices)
+        self.genomeRegistry.born(startGenome,len(monsterIndices))
+    
+    def _index(self,coords):
+        return coords[1]*self.width + coords[0]
+    
+    def _coords(self,index):
+        return Coords(index % self.width, index // self.width)
+    
+    def coordsAt(self,index):
+        """Returns the coords of the cell with the given index."""
+        return self._coords(index)
+    
+    def monsterAt(self,index):
+        """Returns the monster (as a MonsterView) in the cell with the given index, which must hold one."""
+        return MonsterView(self,index)
+    
+    def checkWithinBounds(self,coords):
+        """Returns true if the given coords are within the board's bounds."""
+        return 0 <= coords[0] < self.width and 0 <= coords[1] < self.height
+    
+    def getNeighbors(self,coords):
+        x,y = coords
+        width,height = self.width,self.height
+        if self.wrap:
+            neighbors = []
+            for dx,dy in self._neighborOffsets:
+                neighbor = Coords((x+dx) % width, (y+dy) % height)
+                if neighbor != coords and neighbor not in neighbors:
+                    neighbors.append(neighbor)
+            return neighbors
+        return [Coords(x+dx,y+dy) for dx,dy in self._neighborOffsets if 0 <= x+dx < width and 0 <= y+dy < height]
+    
+    def get(self,coords,default=None):
+        """
+        Returns the contents of the given coords like Simulation.get: a monster
+        (as a MonsterView), FOOD, or default if the cell is empty.
+        """
+        if not self.checkWithinBounds(coords):
+            return default
+        index = self._index(coords)
+        cellType = self.cellTypes.item(index)
+        if cellType == MONSTER_CELL:
+            return MonsterView(self,index)
+        elif cellType == FOOD_CELL:
+            return FOOD
+        else:
+            return default
+    
+    def iteritems(self):
+        """Iterates over (coords,element) for every non-empty cell, like dict.iteritems."""
+        for index in numpy.flatnonzero(self.cellTypes).tolist():
+            coords = self._coords(index)
+            yield coords,self.get(coords)
+    
+    def items(self):
+        return list(self.iteritems())
+    
+    def colorGrid(self,backgroundColor,foodColor):
+        """Returns the colors of the cells, like SimulationBase.colorGrid (but without a loop)."""
+        grid = numpy.empty((self.width*self.height,3),numpy.uint8)
+        grid[:] = backgroundColor
+        grid[self.cellTypes == FOOD_CELL] = foodColor
+        isMonster = self.cellTypes == MONSTER_CELL
+        grid[isMonster] = self.colors[isMonster]
+        return grid.reshape(self.height,self.width,3).transpose(1,0,2)
+    
+    def followedCoords(self):
+        """Returns a list of the coords of the followed monsters."""
+        if not self._followed:
+            return []
+        isFollowed = (self.cellTypes == MONSTER_CELL) & numpy.in1d(self.uids,list(self._followed))
+        return [self._coords(index) for index in numpy.flatnonzero(isFollowed).tolist()]
+    
+    def oneStep(self):
+        """
+        Executes one step of the simulation, like Simulation.oneStep.
+        
+        The monsters move in order of their cell index (row by row). Monsters
+        born or killed during the step, and monsters whose cell has since been
+        taken over by another monster, are skipped.
+        
+        If the configurable value BATCHED_ACTIONS is true, the monsters take
+        their turns together instead (see _takeBatchedTurns).
+        
+        Returns the number of monsters that took a turn.
+        """
+        self.stepCount += 1
+        monsterIndices = numpy.flatnonzero(self.cellTypes == MONSTER_CELL)
+        if self.config.get("BATCHED_ACTIONS"):
+            numProcessed = self._takeBatchedTurns(monsterIndices)
+        else:
+            numProcessed = self._takeTurns(monsterIndices.tolist(),self.uids[monsterIndices].tolist())
+        self.regrowFood()
+        if self.recorder != None:
+            self.recorder.stepped(self)
+        return numProcessed
+    
+    def _takeTurns(self,indices,stepUids,losingHP=True):
+        """
+        Gives a turn to each monster in the given lists of cell indices and
+        uids (taken at the start of the step), skipping any whose cell no
+        longer holds the same monster. Returns the number that took a turn.
+        Unless losingHP is false (because they have already lost it), the
+        monsters lose their HP for the turn first.
+        """
+        currentUid = self.uids.item
+        hpLossPerTurn = self.config.HP_LOSS_PER_TURN
+        numProcessed = 0
+        for index,uid in zip(indices,stepUids):
+            if currentUid(index) != uid:
+                continue
+            numProcessed += 1
+            monster = MonsterView(self,index)
+            coords = self._coords(index)
+            if losingHP:
+                self.changeMonsterHP(monster, coords, -hpLossPerTurn)
+            if monster.hp > 0:
+                actions.performFirstApplicableAction(self,monster,coords)
+        return numProcessed
+    
+    def _takeBatchedTurns(self,indices):
+        """
+        Gives a turn to each monster in the given array of cell indices, all
+        at once, and returns the number that took a turn: every monster loses
+        its HP, then every survivor chooses its first applicable action from
+        the board as it is then, and then each group of monsters which chose
+        the same action performs it with the action's batched form (see
+        actions.batchedAction). The groups take turns in the order of
+        actions.ALL_ACTIONS, except that the actions which move monsters (or
+        add them) come after all the others. A monster which has been killed
+        by then is skipped.
+        
+        Monsters with an action without a batched form in their DNA take
+        ordinary turns, one at a time, after the groups.
+        
+        This is a different simulation from the one-at-a-time turns, since no
+        monster sees what the others did in the same step, so a seeded run
+        gives different results with batched actions than without them.
+        """
+        import batchedactions # Declares the batched forms of the basic actions.
+        self.rng = numpy.random.RandomState(getrandbits(32))
+        self._claimed = numpy.zeros(len(self.cellTypes),bool)
+        numProcessed = len(indices)
+        self.changeMonstersHP(indices,-self.config.HP_LOSS_PER_TURN)
+        indices = indices[self.cellTypes[indices] == MONSTER_CELL]
+        stepUids = self.uids[indices]
+        neighborhoods = self.neighborhoods(indices)
+        chosen,batchable = self._chooseActions(indices,neighborhoods)
+        allActions = actions.ALL_ACTIONS
+        order = [number for number,action in enumerate(allActions) if not action.moves] + \
+                [number for number,action in enumerate(allActions) if action.moves]
+        for actionNumber in order:
+            group = chosen == actionNumber
+            if group.any():
+                group &= self.uids[indices] == stepUids
+                allActions[actionNumber].batched(self,indices[group],neighborhoods.subset(group))
+        unbatched = ~batchable
+        self._takeTurns(indices[unbatched].tolist(),stepUids[unbatched].tolist(),losingHP=False)
+        self.rng = None
+        self._claimed = None
+        return numProcessed
+    
+    def _chooseActions(self,indices,neighborhoods):
+        """
+        Returns, for the monsters in the given cells, the position in
+        actions.ALL_ACTIONS of the first applicable action in each one's DNA
+        (or -1 if there is none), and a boolean array of which monsters have
+        a batched form for every action in their DNA (the others get -1).
+        The preconditions are checked with their batched forms, a DNA
+        position at a time for all the monsters.
+        """
+        allActions = actions.ALL_ACTIONS
+        numMonsters = len(indices)
+        genomeIds,genomeRows = numpy.unique(self.genomeIds[indices],return_inverse=True)
+        genomes = [self.genomeRegistry.get(genomeId) for genomeId in genomeIds.tolist()]
+        dnaLength = max([len(genome) for genome in genomes] or [0])
+        positions = dict((action,position) for position,action in enumerate(allActions))
+        dnaTable = numpy.full((len(genomes),dnaLength),-1,int)
+        for row,genome in enumerate(genomes):
+            dnaTable[row,:len(genome)] = [positions[action] for action in genome]
+        batchable = numpy.array([all(action.batched != None for action in genome) for genome in genomes],bool)[genomeRows]
+        applicable = numpy.zeros((len(allActions),numMonsters),bool)
+        for position,action in enumerate(allActions):
+            if action.batched != None:
+                applicable[position] = action.batchedPrecondition(self,indices,neighborhoods)
+        chosen = numpy.full(numMonsters,-1,int)
+        monsterNumbers = numpy.arange(numMonsters)
+        for dnaPosition in range(dnaLength):
+            actionNumbers = dnaTable[genomeRows,dnaPosition]
+            choosing = (chosen < 0) & (actionNumbers >= 0) & applicable[actionNumbers,monsterNumbers]
+            chosen[choosing] = actionNumbers[choosing]
+        chosen[~batchable] = -1
+        return chosen,batchable
+    
+    def neighborhoods(self,indices):
+        """Returns the actions.Neighborhoods of the cells with the given indices (an array)."""
+        if self._neighborTable is None:
+            self._neighborTable = self._buildNeighborTable()
+        cells = self._neighborTable[indices]
+        exists = cells >= 0
+        cellTypes = self.cellTypes[cells]
+        isMonster = cellTypes == MONSTER_CELL
+        return actions.Neighborhoods(cells,exists & ~isMonster,exists & isMonster,exists & (cellTypes == FOOD_CELL))
+    
+    def _buildNeighborTable(self):
+        """
+        Returns an array with a row for every cell, holding the cell indices of
+        its neighbors, in the order of getNeighbors (with -1 where a neighbor
+        is past the edge of the board, or is the cell itself on a wrapped board).
+        """
+        width,height = self.width,self.height
+        cells = numpy.arange(width*height)
+        x,y = cells % width,cells // width
+        columns = []
+        for dx,dy in self._neighborOffsets:
+            neighborX,neighborY = x+dx,y+dy
+            if self.wrap:
+                neighbors = (neighborY % height)*width + neighborX % width
+            else:
+                neighbors = numpy.where((neighborX >= 0) & (neighborX < width) & (neighborY >= 0) & (neighborY < height),
+                                        neighborY*width + neighborX,-1)
+            neighbors[neighbors == cells] = -1
+            columns.append(neighbors)
+        return numpy.column_stack(columns).astype(numpy.int32)
+    
+    def claimCells(self,targets):
+        """
+        Claims the given cells (an array of indices) for the monsters in a
+        batched action that move into them or put a child there, and returns a
+        boolean array of which claims succeeded. A cell can only be claimed
+        once per step, so when several monsters want the same cell, only the
+        first (the one with the lowest index, since batched actions get the
+        monsters in order) gets it.
+        """
+        firstClaims = numpy.zeros(len(targets),bool)
+        firstClaims[numpy.unique(targets,return_index=True)[1]] = True
+        succeeded = firstClaims & ~self._claimed[targets]
+        self._claimed[targets[succeeded]] = True
+        return succeeded
+    
+    def moveMonsters(self,sources,targets):
+        """
+        Moves the monsters in the given cells (an array of indices) to the
+        given cells (which must not contain monsters), like moveMonster, for
+        batched actions. The target cells are claimed first (see claimCells),
+        and the monsters which don't get their cell stay put. Returns a
+        boolean array of which monsters moved.
+        """
+        moved = self.claimCells(targets)
+        sources,targets = sources[moved],targets[moved]
+        ateFood = self.cellTypes[targets] == FOOD_CELL
+        oldHPs = self.hp[sources]
+        newHPs = oldHPs + numpy.where(ateFood,self.config.FOOD_HP_INCREASE,0)
+        self.cellTypes[targets] = MONSTER_CELL
+        self.hp[targets] = newHPs
+        self.colors[targets] = self.colors[sources]
+        self.genomeIds[targets] = self.genomeIds[sources]
+        self.uids[targets] = self.uids[sources]
+        self.cellTypes[sources] = EMPTY_CELL
+        self.uids[sources] = 0
+        if self.stats:
+            for oldHP,newHP in zip(oldHPs[ateFood].tolist(),newHPs[ateFood].tolist()):
+                self.stats.ate()
+                self.stats.hpChanged(oldHP,newHP)
+        if self.freeCells != None:
+            for source in sources.tolist():
+                self.freeCells.add(source)
+            for target in targets[~ateFood].tolist():
+                self.freeCells.remove(target)
+        if self._changeTrackers:
+            for source,target in zip(sources.tolist(),targets.tolist()):
+                self.markChanged(self._coords(source))
+                self.markChanged(self._coords(target))
+        return moved
+    
+    def changeMonstersHP(self,indices,offsets,attacked=False):
+        """
+        Changes the HP of the monsters in the given cells (an array of
+        indices) by the given offsets (an array, or one number for all of
+        them), like changeMonsterHP, for batched actions. A cell may be given
+        more than once, in which case the offsets are added up. Cells which
+        don't hold a monster (because it has died since it was chosen) are
+        ignored.
+        """
+        offsets = numpy.zeros(len(indices),int) + offsets
+        holdsMonster = self.cellTypes[indices] == MONSTER_CELL
+        cells,positions = numpy.unique(indices[holdsMonster],return_inverse=True)
+        totals = numpy.bincount(positions,offsets[holdsMonster],len(cells)).astype(int)
+        oldHPs = self.hp[cells]
+        newHPs = oldHPs + totals
+        self.hp[cells] = newHPs
+        alive = newHPs > 0
+        if self.stats:
+            for oldHP,newHP in zip(oldHPs[alive].tolist(),newHPs[alive].tolist()):
+                self.stats.hpChanged(oldHP,newHP)
+        for index,oldHP in zip(cells[~alive].tolist(),oldHPs[~alive].tolist()):
+            if self.stats:
+                self.stats.died(oldHP,tuple(self.colors[index].tolist()),attacked)
+            self._removeDead(index)
+    
+    def countMonsters(self):
+        """Returns the number of monsters on the board."""
+        return self.genomeRegistry.totalCount
+    
+    def getMonster(self,coords):
+        """Returns the monster at the given coords, or None if there isn't one."""
+        if self.checkWithinBounds(coords):
+            index = self._index(coords)
+            if self.cellTypes.item(index) == MONSTER_CELL:
+                return MonsterView(self,index)
+        return None
+    
+    def isFood(self,coords):
+        """Returns true if the given coords contain food."""
+        return self.cellTypes.item(self._index(coords)) == FOOD_CELL
+    
+    def scanNeighbors(self,coords):
+        """
+        Sorts the neighbors of the given coords in one pass, returning three
+        lists: the neighbors without a monster (which may contain food), the
+        neighbors with a monster, and the neighbors with food.
+        """
+        cellType,width = self.cellTypes.item,self.width
+        empty = []
+        monsters = []
+        food = []
+        for neighbor in self.getNeighbors(coords):
+            neighborType = cellType(neighbor.y*width+neighbor.x)
+            if neighborType == MONSTER_CELL:
+                monsters.append(neighbor)
+            else:
+                empty.append(neighbor)
+                if neighborType == FOOD_CELL:
+                    food.append(neighbor)
+        return empty,monsters,food
+    
+    def emptyNeighbors(self,coords):
+        """
+        Returns the neighbors of the given coords that do not contain a monster.
+        (They may contain food.)
+        """
+        cellType,width = self.cellTypes.item,self.width
+        return [neighbor for neighbor in self.getNeighbors(coords) if cellType(neighbor.y*width+neighbor.x) != MONSTER_CELL]
+    
+    def monsterNeighbors(self,coords):
+        """Returns the neighbors of the given coords that contain a monster."""
+        cellType,width = self.cellTypes.item,self.width
+        return [neighbor for neighbor in self.getNeighbors(coords) if cellType(neighbor.y*width+neighbor.x) == MONSTER_CELL]
+    
+    def foodNeighbors(self,coords):
+        """Returns the neighbors of the given coords that contain food."""
+        cellType,width = self.cellTypes.item,self.width
+        return [neighbor for neighbor in self.getNeighbors(coords) if cellType(neighbor.y*width+neighbor.x) == FOOD_CELL]
+    
+    def addMonster(self,coords,dna,hp,color,parent=None):
+        """
+        Creates a new monster at the given coords (replacing any food there)
+        and returns it, like Simulation.addMonster.
+        """
+        index = self._index(coords)
+        existing = self.cellTypes.item(index)
+        if existing == MONSTER_CELL:
+            raise Exception, "{0} already contains a monster.".format(coords)
+        genome = self.genomeRegistry.intern(dna)
+        self.cellTypes.itemset(index,MONSTER_CELL)
+        self.hp.itemset(index,hp)
+        self.colors[index] = color
+        self.genomeIds.itemset(index,genome.id)
+        self.uids.itemset(index,self._nextUid)
+        if existing == EMPTY_CELL and self.freeCells != None:
+            self.freeCells.remove(index)
+        if self.lineage != None:
+            self._lineageIds[self._nextUid] = self.lineage.born(parent.lineageId if parent != None else NO_PARENT,
+                                                                self.stepCount,genome.id)
+        self._nextUid += 1
+        self.genomeRegistry.born(genome)
+        if self.stats:
+            self.stats.born(hp,tuple(color),existing == FOOD_CELL)
+        if self._changeTrackers:
+            self.markChanged(coords)
+        return MonsterView(self,index)
+    
+    def moveMonster(self,monster,oldCoords,newCoords):
+        """
+        Moves a monster to a different location. If the location contains food,
+        the monster will eat it, gaining HP of configurable amount
+        FOOD_HP_INCREASE.
+        """
+        oldIndex = self._index(oldCoords)
+        newIndex = self._index(newCoords)
+        existing = self.cellTypes.item(newIndex)
+        if existing == MONSTER_CELL:
+            raise Exception # Trying to move a monster on top of another monster
+        hp = self.hp.item(oldIndex)
+        if existing == FOOD_CELL:
+            # The monster gets to eat the food.
+            hp += self.config.FOOD_HP_INCREASE
+            if self.stats:
+                self.stats.ate()
+                self.stats.hpChanged(hp - self.config.FOOD_HP_INCREASE,hp)
+        self.cellTypes.itemset(newIndex,MONSTER_CELL)
+        self.hp.itemset(newIndex,hp)
+        self.colors[newIndex] = self.colors[oldIndex]
+        self.genomeIds.itemset(newIndex,self.genomeIds.item(oldIndex))
+        self.uids.itemset(newIndex,self.uids.item(oldIndex))
+        self.cellTypes.itemset(oldIndex,EMPTY_CELL)
+        self.uids.itemset(oldIndex,0)
+        if self.freeCells != None:
+            self.freeCells.add(oldIndex)
+            if existing == EMPTY_CELL:
+                self.freeCells.remove(newIndex)
+        monster._index = newIndex
+        if self._changeTrackers:
+            self.markChanged(oldCoords)
+            self.markChanged(newCoords)
+    
+    def changeMonsterHP(self,monster,monsterCoords,offset,attacked=False):
+        """
+        Changes the monster's HP by the given offset, possibly killing it and
+        replacing it with food. attacked should be true if this is damage from
+        an attack (which only matters to the statistics).
+        """
+        index = self._index(monsterCoords)
+        hp = self.hp.item(index) + offset
+        self.hp.itemset(index,hp)
+        if self.stats:
+            if hp <= 0:
+                self.stats.died(hp - offset,tuple(self.colors[index].tolist()),attacked)
+            else:
+                self.stats.hpChanged(hp - offset,hp)
+        if hp <= 0:
+            self._removeDead(index)
+    
+    def _removeDead(self,index):
+        """
+        Replaces the monster in the given cell, which has just died, with FOOD.
+        (The HP is left as it is, so that views of the dead monster still see
+        that it is dead.)
+        """
+        uid = self.uids.item(index)
+        self._followed.discard(uid)
+        self._names.pop(uid,None)
+        if self.lineage != None:
+            self.lineage.died(self._lineageIds.pop(uid))
+        self.cellTypes.itemset(index,FOOD_CELL)
+        self.uids.itemset(index,0)
+        self.genomeRegistry.died(self.genomeRegistry.get(self.genomeIds.item(index)))
+        if self._changeTrackers:
+            self.markChanged(self._coords(index))
+    
+    def _emptyCells(self):
+        """Returns the indices of the empty cells, for regrowFood."""
+        return numpy.flatnonzero(self.cellTypes == EMPTY_CELL).tolist()
+    
+    def _growFood(self,cell):
+        """Puts food in the given empty cell (an index), for regrowFood."""
+        self.cellTypes.itemset(cell,FOOD_CELL)
+        self.freeCells.remove(cell)
+        if self.stats:
+            self.stats.grew()
+        if self._changeTrackers:
+            self.markChanged(self._coords(cell))
+    
+    def exportState(self):
+        """
+        Returns a snapshot of the board as a dict of copies of the arrays, plus
+        the uid counter, the names and uids of named and followed monsters,
+        the step count and the unused names. See the checkpoint module.
+        """
+        return {
+            "cellTypes": self.cellTypes.copy(),
+            "hp": self.hp.copy(),
+            "colors": self.colors.copy(),
+            "genomeIds": self.genomeIds.copy(),
+            "uids": self.uids.copy(),
+            "nextUid": self._nextUid,
+            "monsterNames": dict(self._names),
+            "followed": list(self._followed),
+            "stepCount": self.stepCount,
+            "namesList": self._exportNames(),
+        }
+    
+    def importState(self,state):
+        """
+        Replaces the (empty) board with the one in a dict returned by
+        exportState. The arrays are used as they are, without copying, so they
+        can be memory-mapped. The genomes they refer to must already be
+        interned in genomeRegistry.
+        """
+        self.cellTypes = state["cellTypes"]
+        self.hp = state["hp"]
+        self.colors = state["colors"]
+        self.genomeIds = state["genomeIds"]
+        self.uids = state["uids"]
+        genomeCounts = numpy.bincount(self.genomeIds[self.cellTypes == MONSTER_CELL])
+        for genomeId in numpy.flatnonzero(genomeCounts).tolist():
+            self.genomeRegistry.born(self.genomeRegistry.get(genomeId),int(genomeCounts[genomeId]))
+        self._nextUid = state["nextUid"]
+        self._names = dict(state["monsterNames"])
+        self._followed = set(state["followed"])
+        self.stepCount = state["stepCount"]
+        self._importNames(state["namesList"])
+        self._indexFreeCells()
+    
+    def toggleMonsterFollowed(self,monster):
+        """
+        Toggles whether or not the given monster is followed. If this is the
+        first time the monster has been followed, it will also be named.
+        """
+        monster.followed = not monster.followed
+        if not monster.name:
+            name = self._nextName()
+            monster.name = name
+            print "Monster {0} renamed {1}.".format(monster.uid,name)
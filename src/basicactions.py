@@ -7,58 +7,74 @@ Created on Sep 28, 2011
 @author: garrison
 '''
 
-from boardelements import Monster,FOOD
-from actions import monsterAction,CannotPerformActionException
+from actions import monsterAction,CannotPerformActionException,Neighborhood,alwaysPossible
 import random
 
-@monsterAction
-def wander(simulator,monster,monsterCoords):
+# Each action has a precondition function, which is checked before calling it
+# (see actions.monsterAction). The actions check their preconditions again
+# themselves (raising CannotPerformActionException), so that they can also be
+# called directly, without a neighborhood.
+
+def _canWander(simulator,monster,neighborhood):
+    return bool(neighborhood.empty)
+
+@monsterAction(precondition=_canWander)
+def wander(simulator,monster,monsterCoords,neighborhood=None):
     """
     Causes the monster to move into an adjacent empty space.
     Preconditions: An adjacent space is empty.
     """
-    neighbors = simulator.getNeighbors(monsterCoords)
-    emptyNeighbors = [neighbor for neighbor in neighbors if not isinstance(simulator.get(neighbor),Monster)]
+    if neighborhood == None:
+        neighborhood = Neighborhood(simulator,monsterCoords)
+    emptyNeighbors = neighborhood.empty
     if not emptyNeighbors:
         raise CannotPerformActionException
     else:
         chosenNeighbor = random.choice(emptyNeighbors)
         simulator.moveMonster(monster,monsterCoords,chosenNeighbor)
 
-@monsterAction
-def flee(simulator,monster,monsterCoords):
+def _canFlee(simulator,monster,neighborhood):
+    return bool(neighborhood.monsters and neighborhood.empty)
+
+@monsterAction(precondition=_canFlee)
+def flee(simulator,monster,monsterCoords,neighborhood=None):
     """
     Causes the monster to move into an adjacent empty space.
     Preconditions: An adjacant space is empty, and another adjacent space
     contains another monster.
     """
-    neighbors = simulator.getNeighbors(monsterCoords)
-    emptyNeighbors = [neighbor for neighbor in neighbors if not isinstance(simulator.get(neighbor),Monster)]
-    monsterNeighbors = [neighbor for neighbor in neighbors if isinstance(simulator.get(neighbor),Monster)]
+    if neighborhood == None:
+        neighborhood = Neighborhood(simulator,monsterCoords)
+    emptyNeighbors = neighborhood.empty
+    monsterNeighbors = neighborhood.monsters
     if not monsterNeighbors or not emptyNeighbors:
         raise CannotPerformActionException
     else:
         chosenNeighbor = random.choice(emptyNeighbors)
         simulator.moveMonster(monster,monsterCoords,chosenNeighbor)
 
-@monsterAction
-def attack(simulator,monster,monsterCoords):
+def _hasMonsterNeighbor(simulator,monster,neighborhood):
+    return bool(neighborhood.monsters)
+
+@monsterAction(precondition=_hasMonsterNeighbor)
+def attack(simulator,monster,monsterCoords,neighborhood=None):
     """
     Attacks an adjacent monster, causing damage given by the configurable value
     ATTACK_HP_DECREASE.
     Preconditions: At least one adjacent space contains another monster.
     """
-    neighbors = simulator.getNeighbors(monsterCoords)
-    monsterNeighbors = [neighbor for neighbor in neighbors if isinstance(simulator.get(neighbor),Monster)]
+    if neighborhood == None:
+        neighborhood = Neighborhood(simulator,monsterCoords)
+    monsterNeighbors = neighborhood.monsters
     if not monsterNeighbors:
         raise CannotPerformActionException
     else:
         chosenVictimCoords = random.choice(monsterNeighbors)
-        chosenVictim = simulator[chosenVictimCoords]
-        simulator.changeMonsterHP(chosenVictim,chosenVictimCoords,-simulator.config.ATTACK_HP_DECREASE)
+        chosenVictim = simulator.getMonster(chosenVictimCoords)
+        simulator.changeMonsterHP(chosenVictim,chosenVictimCoords,-simulator.config.ATTACK_HP_DECREASE,attacked=True)
 
-@monsterAction
-def idle(simulator,monster,monsterCoords):
+@monsterAction(precondition=alwaysPossible,inert=True)
+def idle(simulator,monster,monsterCoords,neighborhood=None):
     """
     Does absolutely nothing.
     Preconditions: None.
@@ -69,35 +85,42 @@ def idle(simulator,monster,monsterCoords):
     """
     pass
 
-@monsterAction
-def rest(simulator,monster,monsterCoords):
+def _canRest(simulator,monster,neighborhood):
+    return monster.hp < simulator.config.REST_MAX_HP
+
+@monsterAction(precondition=_canRest)
+def rest(simulator,monster,monsterCoords,neighborhood=None):
     """
     Increases the monster's HP by the configurable quantity REST_HP_INCREASE.
     Preconditions: The HP is below the configurable value REST_MAX_HP.
     """
     if monster.hp < simulator.config.REST_MAX_HP:
-        monster.hp += simulator.config.REST_HP_INCREASE
+        simulator.changeMonsterHP(monster,monsterCoords,simulator.config.REST_HP_INCREASE)
     else:
         raise CannotPerformActionException
 
-@monsterAction
-def heal(simulator,monster,monsterCoords):
+@monsterAction(precondition=_hasMonsterNeighbor)
+def heal(simulator,monster,monsterCoords,neighborhood=None):
     """
     Increases the HP of an adjacent monster by the configurable value
     HEAL_HP_INCREASE.
     Preconditions: There is at least one adjacent space containing a monster.
     """
-    neighbors = simulator.getNeighbors(monsterCoords)
-    monsterNeighbors = [neighbor for neighbor in neighbors if isinstance(simulator.get(neighbor),Monster)]
+    if neighborhood == None:
+        neighborhood = Neighborhood(simulator,monsterCoords)
+    monsterNeighbors = neighborhood.monsters
     if not monsterNeighbors:
         raise CannotPerformActionException
     else:
         chosenMonsterCoords = random.choice(monsterNeighbors)
-        chosenMonster = simulator[chosenMonsterCoords]
+        chosenMonster = simulator.getMonster(chosenMonsterCoords)
         simulator.changeMonsterHP(chosenMonster,chosenMonsterCoords,simulator.config.HEAL_HP_INCREASE)
 
-@monsterAction
-def eat(simulator,monster,monsterCoords):
+def _canEat(simulator,monster,neighborhood):
+    return bool(neighborhood.food)
+
+@monsterAction(precondition=_canEat)
+def eat(simulator,monster,monsterCoords,neighborhood=None):
     """
     Moves onto a space with food (thus consuming the food).
     Preconditions: There is at least one adjacent space containing food.
@@ -106,16 +129,20 @@ def eat(simulator,monster,monsterCoords):
     it happens to move onto a space with food. This action makes the monster
     always move to a food space if one is available.
     """
-    neighbors = simulator.getNeighbors(monsterCoords)
-    foodNeighbors = [neighbor for neighbor in neighbors if simulator.get(neighbor) == FOOD]
+    if neighborhood == None:
+        neighborhood = Neighborhood(simulator,monsterCoords)
+    foodNeighbors = neighborhood.food
     if not foodNeighbors:
         raise CannotPerformActionException
     else:
         chosenCoords = random.choice(foodNeighbors)
         simulator.moveMonster(monster,monsterCoords,chosenCoords)
 
-@monsterAction
-def divide(simulator,monster,monsterCoords):
+def _canDivide(simulator,monster,neighborhood):
+    return monster.hp >= simulator.config.DIVIDE_MIN_HP and bool(neighborhood.empty)
+
+@monsterAction(precondition=_canDivide)
+def divide(simulator,monster,monsterCoords,neighborhood=None):
     """
     Causes the monster to divide in two. The offspring will have a chance of
     mutation given by the configurable value MUTATION_RATE. If the monster
@@ -127,8 +154,9 @@ def divide(simulator,monster,monsterCoords):
     # TODO: This needs to be cleaned up and refactored.
     if monster.hp < simulator.config.DIVIDE_MIN_HP:
         raise CannotPerformActionException
-    neighbors = simulator.getNeighbors(monsterCoords)
-    emptyNeighbors = [neighbor for neighbor in neighbors if not isinstance(simulator.get(neighbor),Monster)]
+    if neighborhood == None:
+        neighborhood = Neighborhood(simulator,monsterCoords)
+    emptyNeighbors = neighborhood.empty
     if not emptyNeighbors:
         raise CannotPerformActionException
     else:
@@ -154,7 +182,6 @@ def divide(simulator,monster,monsterCoords):
         halfHP = monster.hp // 2
         simulator.changeMonsterHP(monster, monsterCoords, -halfHP)
         childHP = halfHP
-        if simulator.get(chosenNeighbor) == FOOD:
+        if simulator.isFood(chosenNeighbor):
             childHP += simulator.config.FOOD_HP_INCREASE
-        child = Monster(childDNA,childHP,childColor)
-        simulator[chosenNeighbor] = child
+        simulator.addMonster(chosenNeighbor,childDNA,childHP,childColor,monster)
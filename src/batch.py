@@ -0,0 +1,241 @@
+#!/usr/bin/python
+
+'''
+This module runs simulations without the GUI (and without pygame), as fast as
+possible, and reports how fast they ran. It is meant for long evolutions on
+machines without a display.
+
+Example usage (from the src folder):
+python batch.py --steps 10000 --seed 42
+python batch.py --time 3600 --set ENGINE=array --set BOARD_WIDTH=500
+python batch.py --time 86400 --checkpoint run.ckpt --checkpoint-every 1000
+python batch.py --time 86400 --resume run.ckpt --checkpoint run.ckpt --checkpoint-every 1000
+python batch.py --steps 10000 --telemetry run --telemetry-every 10
+python batch.py --steps 1000 --profile-actions
+python batch.py --steps 5000 --record run.trj --record-keyframe-every 200
+
+Created on Oct 18, 2026
+'''
+
+import argparse
+import ast
+import random
+import time
+from collections import namedtuple
+from utils.misc import Config
+from simulator import SimulationBase,createSimulation,populatedArea
+
+def parseOverride(overrideString):
+    """
+    Parses an override of the form "NAME=VALUE" into a (name,value) pair.
+    The value is read as a Python literal if possible (such as 500, 0.3 or
+    (255,0,0)), and is otherwise used as a plain string.
+    """
+    name,separator,valueString = overrideString.partition("=")
+    if not separator or not name.strip():
+        raise ValueError("Overrides must have the form NAME=VALUE, not {0!r}.".format(overrideString))
+    try:
+        value = ast.literal_eval(valueString.strip())
+    except (ValueError,SyntaxError):
+        value = valueString.strip()
+    return name.strip(),value
+
+def loadConfig(overrides={}):
+    """
+    Loads the simulation config (default_config.py, then config.py) and applies
+    the given overrides, which is a dict of option names to values.
+    
+    MAX_NUM_MONSTERS and MAX_NUM_FOOD default to the area of the board (in
+    other words, no limit), so if the board size (or populated area) is
+    overridden and they were left at the old area, they are changed to the
+    new area.
+    """
+    config = Config("default_config.py","config.py")
+    oldWidth,oldHeight = populatedArea(config)
+    config.update(overrides)
+    newWidth,newHeight = populatedArea(config)
+    oldArea,newArea = oldWidth*oldHeight,newWidth*newHeight
+    for limitName in ("MAX_NUM_MONSTERS","MAX_NUM_FOOD"):
+        if limitName not in overrides and config[limitName] == oldArea:
+            config[limitName] = newArea
+    return config
+
+
+class BatchStats(namedtuple("BatchStats",["steps","monstersProcessed","elapsed","population"])):
+    """
+    The results of runBatch: the number of steps run, the total number of
+    monster turns taken, the wall-clock time taken (in seconds) and the final
+    number of monsters.
+    """
+    __slots__ = ()
+    
+    @property
+    def stepsPerSecond(self):
+        return self.steps/self.elapsed if self.elapsed else 0.0
+    
+    @property
+    def monstersPerSecond(self):
+        return self.monstersProcessed/self.elapsed if self.elapsed else 0.0
+    
+    def __str__(self):
+        return ("{0} steps in {1:.2f}s: {2:.1f} steps/sec, {3:.0f} monsters/sec, "
+                "final population {4}").format(self.steps,self.elapsed,self.stepsPerSecond,
+                                               self.monstersPerSecond,self.population)
+
+
+def runBatch(simulation,maxSteps=None,timeLimit=None,progressInterval=None,checkpointer=None,telemetry=None):
+    """
+    Steps the given simulation until maxSteps steps have been run, timeLimit
+    seconds have passed, or every monster is dead (whichever comes first), and
+    returns a BatchStats. If neither maxSteps nor timeLimit is given, it only
+    stops when every monster is dead.
+    
+    If progressInterval is given, a progress line is printed roughly every
+    progressInterval seconds.
+    
+    If checkpointer (a checkpoint.PeriodicCheckpointer) is given, it is told
+    about every step, and saves a final checkpoint at the end. Likewise for
+    telemetry (a telemetry.TelemetryWriter), which samples the population
+    statistics.
+    """
+    steps = 0
+    monstersProcessed = 0
+    startTime = time.time()
+    nextProgressTime = startTime + progressInterval if progressInterval else None
+    while maxSteps == None or steps < maxSteps:
+        numProcessed = simulation.oneStep()
+        steps += 1
+        monstersProcessed += numProcessed
+        if checkpointer:
+            checkpointer.stepped(simulation)
+        if telemetry:
+            telemetry.stepped(simulation)
+        if numProcessed == 0:
+            break # Everything is dead. Nothing will ever happen again.
+        now = time.time()
+        if timeLimit != None and now - startTime >= timeLimit:
+            break
+        if nextProgressTime != None and now >= nextProgressTime:
+            print "step {0}: {1} monsters, {2:.1f} steps/sec".format(steps,numProcessed,steps/(now-startTime))
+            nextProgressTime = now + progressInterval
+    if checkpointer:
+        checkpointer.finish(simulation)
+    if telemetry:
+        telemetry.finish(simulation)
+    elapsed = time.time() - startTime
+    return BatchStats(steps,monstersProcessed,elapsed,simulation.countMonsters())
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Runs a simulation without the GUI and reports its throughput.")
+    parser.add_argument("--steps",type=int,help="the number of steps to run")
+    parser.add_argument("--time",type=float,help="the maximum number of seconds to run")
+    parser.add_argument("--seed",type=int,help="the random seed (for reproducible runs)")
+    parser.add_argument("--set",action="append",default=[],metavar="NAME=VALUE",dest="overrides",
+                        help="overrides a config option (can be given more than once)")
+    parser.add_argument("--progress",type=float,metavar="SECONDS",
+                        help="prints progress every SECONDS seconds")
+    parser.add_argument("--checkpoint",metavar="FILE",
+                        help="saves a checkpoint to FILE at the end (and periodically, with --checkpoint-every)")
+    parser.add_argument("--checkpoint-every",type=int,metavar="STEPS",
+                        help="saves a checkpoint every STEPS steps (in the background)")
+    parser.add_argument("--resume",metavar="FILE",
+                        help="resumes the simulation saved in the checkpoint FILE, instead of starting a new one "
+                             "(--seed is then ignored, and --set only affects options used while stepping)")
+    parser.add_argument("--telemetry",metavar="PREFIX",
+                        help="appends population statistics to PREFIX.csv, PREFIX_genomes.csv and PREFIX_colors.csv")
+    parser.add_argument("--telemetry-every",type=int,default=1,metavar="STEPS",
+                        help="samples the statistics every STEPS steps (default 1)")
+    parser.add_argument("--record",metavar="FILE",
+                        help="records every step to the trajectory FILE (and its index, FILE.idx), "
+                             "which the GUI can play back with main.py --replay FILE")
+    parser.add_argument("--record-keyframe-every",type=int,metavar="STEPS",
+                        help="records the whole board every STEPS steps (default 100)")
+    parser.add_argument("--profile-actions",nargs="?",const="",metavar="FILE",
+                        help="prints how often each action was attempted and performed, and how long it took "
+                             "(and writes the results to the CSV FILE, if given)")
+    options = parser.parse_args(args)
+    try:
+        overrides = dict(parseOverride(override) for override in options.overrides)
+    except ValueError as error:
+        parser.error(str(error))
+    if options.steps == None and options.time == None:
+        parser.error("at least one of --steps and --time is required")
+    if options.checkpoint_every and not options.checkpoint:
+        parser.error("--checkpoint-every requires --checkpoint")
+    if options.record_keyframe_every and not options.record:
+        parser.error("--record-keyframe-every requires --record")
+    
+    startTime = time.time()
+    if options.resume:
+        from checkpoint import loadCheckpoint
+        simulation = loadCheckpoint(options.resume,overrides.get("ENGINE"))
+        simulation.config.update(overrides)
+        print "Resumed a {0}x{1} simulation ({2} engine) at step {3} in {4:.2f}s.".format(
+            simulation.width,simulation.height,simulation.config.ENGINE,simulation.stepCount,time.time()-startTime)
+    else:
+        if options.seed != None:
+            random.seed(options.seed)
+        config = loadConfig(overrides)
+        simulation = createSimulation(config)
+        print "Created a {0}x{1} simulation ({2} engine) in {3:.2f}s.".format(
+            config.BOARD_WIDTH,config.BOARD_HEIGHT,config.get("ENGINE","dict"),time.time()-startTime)
+    checkpointer = None
+    if options.checkpoint:
+        from checkpoint import PeriodicCheckpointer
+        checkpointer = PeriodicCheckpointer(options.checkpoint,options.checkpoint_every or None)
+    telemetry = None
+    if options.telemetry:
+        if not isinstance(simulation,SimulationBase):
+            parser.error("the {0} engine doesn't support --telemetry".format(simulation.config.get("ENGINE")))
+        from telemetry import TelemetryWriter
+        telemetry = TelemetryWriter(options.telemetry,options.telemetry_every)
+    if options.record:
+        if not isinstance(simulation,SimulationBase):
+            parser.error("the {0} engine can't be recorded".format(simulation.config.get("ENGINE")))
+        simulation.enableRecording(options.record,options.record_keyframe_every)
+    profiler = None
+    if options.profile_actions != None:
+        if not isinstance(simulation,SimulationBase):
+            parser.error("the {0} engine doesn't support --profile-actions".format(simulation.config.get("ENGINE")))
+        if simulation.config.get("ENGINE") == "array" and simulation.config.get("BATCHED_ACTIONS"):
+            parser.error("--profile-actions doesn't support BATCHED_ACTIONS")
+        from actionprofiler import ActionProfiler
+        profiler = ActionProfiler()
+        profiler.enable()
+    try:
+        stats = runBatch(simulation,options.steps,options.time,options.progress,checkpointer,telemetry)
+        print stats
+        if options.record:
+            print "Recorded {0} steps to {1}.".format(simulation.recorder.numRecords - 1,options.record)
+            simulation.stopRecording()
+        if profiler:
+            profiler.disable()
+            print profiler.table()
+            if options.profile_actions:
+                profiler.writeCSV(options.profile_actions)
+        populationByGenome = simulation.genomeRegistry.populationByGenome()
+        for genome,count in sorted(populationByGenome.iteritems(),key=lambda item: -item[1])[:5]:
+            print "  {0}: {1}".format(genome.string,count)
+        monsterPool = getattr(simulation,"monsterPool",None)
+        if monsterPool != None:
+            print "Monster pool: {created} created, {reused} reused, {released} released, {free} free".format(
+                **monsterPool.statistics())
+        scheduler = getattr(simulation,"scheduler",None)
+        if scheduler != None:
+            print "Activity scheduling: {0} turns skipped, {1} monsters asleep".format(scheduler.numSkipped,len(scheduler))
+        lineage = getattr(simulation,"lineage",None)
+        if lineage != None:
+            ancestorId = lineage.mostRecentCommonAncestor()
+            if ancestorId == None:
+                print "The population has no common ancestor."
+            else:
+                ancestorId,parentId,birthStep,genomeId = lineage.record(ancestorId)
+                print "Most recent common ancestor: {0}, born at step {1}, dna={2}".format(
+                    ancestorId,birthStep,simulation.genomeRegistry.get(genomeId).string)
+    finally:
+        if simulation.config.get("ENGINE") == "parallel":
+            simulation.close() # Stops the worker processes.
+
+if __name__ == '__main__':
+    main()
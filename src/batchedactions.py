@@ -0,0 +1,106 @@
+'''
+This module contains the batched forms of the actions in basicactions (see
+actions.batchedAction), which ArraySimulation uses when the configurable value
+BATCHED_ACTIONS is true. Each performs an action for every monster which chose
+it in a step, with array operations instead of one call per monster. It
+requires NumPy.
+
+Created on Oct 18, 2026
+'''
+
+import numpy
+from actions import batchedAction
+from basicactions import wander,flee,attack,idle,rest,heal,eat,divide
+from arraysimulator import FOOD_CELL
+
+def _randomNeighbors(simulator,neighborhoods,mask):
+    """
+    Returns the cell indices of a neighbor picked at random for each monster,
+    from among the neighbors in the given mask (each monster must have one).
+    """
+    weights = simulator.rng.random_sample(mask.shape)
+    weights[~mask] = -1.0
+    return neighborhoods.cells[numpy.arange(len(mask)),weights.argmax(1)]
+
+def _hasEmptyNeighbor(simulator,indices,neighborhoods):
+    return neighborhoods.empty.any(1)
+
+def _hasMonsterNeighbor(simulator,indices,neighborhoods):
+    return neighborhoods.monsters.any(1)
+
+@batchedAction(wander,precondition=_hasEmptyNeighbor,moves=True)
+def wanderAll(simulator,indices,neighborhoods):
+    simulator.moveMonsters(indices,_randomNeighbors(simulator,neighborhoods,neighborhoods.empty))
+
+def _canFlee(simulator,indices,neighborhoods):
+    return neighborhoods.monsters.any(1) & neighborhoods.empty.any(1)
+
+@batchedAction(flee,precondition=_canFlee,moves=True)
+def fleeAll(simulator,indices,neighborhoods):
+    simulator.moveMonsters(indices,_randomNeighbors(simulator,neighborhoods,neighborhoods.empty))
+
+@batchedAction(attack,precondition=_hasMonsterNeighbor)
+def attackAll(simulator,indices,neighborhoods):
+    """All the damage is dealt at once, so attackers killed by each other still strike."""
+    victims = _randomNeighbors(simulator,neighborhoods,neighborhoods.monsters)
+    simulator.changeMonstersHP(victims,-simulator.config.ATTACK_HP_DECREASE,attacked=True)
+
+@batchedAction(idle,precondition=lambda simulator,indices,neighborhoods: numpy.ones(len(indices),bool))
+def idleAll(simulator,indices,neighborhoods):
+    pass
+
+def _canRest(simulator,indices,neighborhoods):
+    return simulator.hp[indices] < simulator.config.REST_MAX_HP
+
+@batchedAction(rest,precondition=_canRest)
+def restAll(simulator,indices,neighborhoods):
+    simulator.changeMonstersHP(indices,simulator.config.REST_HP_INCREASE)
+
+@batchedAction(heal,precondition=_hasMonsterNeighbor)
+def healAll(simulator,indices,neighborhoods):
+    patients = _randomNeighbors(simulator,neighborhoods,neighborhoods.monsters)
+    simulator.changeMonstersHP(patients,simulator.config.HEAL_HP_INCREASE)
+
+@batchedAction(eat,precondition=lambda simulator,indices,neighborhoods: neighborhoods.food.any(1),moves=True)
+def eatAll(simulator,indices,neighborhoods):
+    simulator.moveMonsters(indices,_randomNeighbors(simulator,neighborhoods,neighborhoods.food))
+
+def _canDivide(simulator,indices,neighborhoods):
+    return (simulator.hp[indices] >= simulator.config.DIVIDE_MIN_HP) & neighborhoods.empty.any(1)
+
+@batchedAction(divide,precondition=_canDivide,moves=True)
+def divideAll(simulator,indices,neighborhoods):
+    """
+    Each parent gives half its HP to a child in a random empty neighbor, like
+    divide. The children are then added one at a time, since a mutated child
+    needs its own genome.
+    
+    The parents' HP is checked again first, since attacks and heals earlier
+    in the step may have changed it since the monsters chose to divide.
+    """
+    config = simulator.config
+    rng = simulator.rng
+    targets = _randomNeighbors(simulator,neighborhoods,neighborhoods.empty)
+    eligible = simulator.hp[indices] >= config.DIVIDE_MIN_HP
+    indices,targets = indices[eligible],targets[eligible]
+    claimed = simulator.claimCells(targets)
+    parents,targets = indices[claimed],targets[claimed]
+    halfHPs = simulator.hp[parents] // 2
+    childHPs = halfHPs + numpy.where(simulator.cellTypes[targets] == FOOD_CELL,config.FOOD_HP_INCREASE,0)
+    simulator.changeMonstersHP(parents,-halfHPs)
+    mutations = rng.random_sample(len(parents)) < config.MUTATION_RATE
+    for parent,target,childHP,mutated in zip(parents.tolist(),targets.tolist(),childHPs.tolist(),mutations.tolist()):
+        monster = simulator.monsterAt(parent)
+        childDNA = monster.dna
+        childColor = monster.color
+        if mutated:
+            # Swap two adjacent DNA elements, and change one component of the color.
+            childDNA = list(childDNA)
+            swapIndex = rng.randint(len(childDNA)-1)
+            childDNA[swapIndex],childDNA[swapIndex+1] = childDNA[swapIndex+1],childDNA[swapIndex]
+            newColorList = list(childColor)
+            colorComponentToChange = rng.randint(3)
+            changeOffset = config.COLOR_CHANGE_OFFSET if rng.randint(2) else -config.COLOR_CHANGE_OFFSET
+            newColorList[colorComponentToChange] = min(255,max(0,newColorList[colorComponentToChange] + changeOffset))
+            childColor = tuple(newColorList)
+        simulator.addMonster(simulator.coordsAt(target),childDNA,childHP,childColor,monster)
@@ -0,0 +1,317 @@
+#!/usr/bin/python
+
+'''
+This module runs a reproducible benchmark suite: seeded scenarios over a
+matrix of engines, board sizes, densities, initial DNAs and (optionally)
+activity scheduling. For each one it
+measures how long the simulation takes to create, how fast it steps (during a
+warm-up and then in a steady state), how long a new headless process takes
+to start up and take its first step, how long drawing the board takes (on an
+offscreen surface, if pygame is available and the board isn't too big to
+draw) and the peak memory use.
+
+Every scenario runs in a fresh process, one at a time, so that its memory use
+is measured on its own. The results are written to a JSON file, which can be
+compared against an earlier one (a baseline) to find regressions.
+
+Example usage (from the src folder):
+python benchmark.py --output baseline.json
+python benchmark.py --sizes 60x25,500x500 --engines dict,array --output new.json --baseline baseline.json
+python benchmark.py --compare baseline.json new.json
+python benchmark.py --sizes 250x100 --densities 0.5:0.2 --dnas IDWAFEHR --hp 1000 --scheduling off,on --no-draw
+
+Created on Oct 18, 2026
+'''
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from batch import loadConfig
+from simulator import createSimulation
+
+DEFAULT_SIZES = [(60,25),(250,100),(500,500),(1000,1000),(2000,2000)]
+DEFAULT_DENSITIES = [(0.05,1.0),(0.01,0.2)] # (MONSTER_DENSITY,FOOD_DENSITY)
+DEFAULT_DNAS = ["DWIAFEHR","EDWAIFHR"]
+MAX_DRAW_PIXELS = 4096*4096 # Boards bigger than this (when drawn) aren't drawn.
+
+# Each metric, and whether a higher value is better.
+METRICS = [
+    ("coldStartSeconds",False),
+    ("initSeconds",False),
+    ("warmupStepsPerSecond",True),
+    ("steadyStepsPerSecond",True),
+    ("steadyMonstersPerSecond",True),
+    ("fullDrawSeconds",False),
+    ("incrementalDrawSeconds",False),
+    ("peakMemoryMB",False),
+]
+
+def scenarioKey(scenario):
+    """Returns a string identifying a scenario, used to match up results."""
+    key = "{engine} {width}x{height} monsters={monsterDensity} food={foodDensity} dna={dna} seed={seed}".format(**scenario)
+    # Results from before these options were added don't have them.
+    if scenario.get("initialHP") != None:
+        key += " hp={0}".format(scenario["initialHP"])
+    if scenario.get("scheduling"):
+        key += " scheduling"
+    return key
+
+def _peakMemoryMB():
+    """Returns the peak memory use of this process so far, in MB (or None if unknown)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, but OS X reports bytes.
+    return peak / (1024.0*1024.0) if sys.platform == "darwin" else peak / 1024.0
+
+def runScenario(scenario):
+    """
+    Runs one scenario (a dict of engine, width, height, monsterDensity,
+    foodDensity, dna, initialHP, scheduling, seed, warmupSteps, steadySteps
+    and draw) and returns its results: the scenario plus the metrics. Draw times are None if drawing
+    was skipped.
+    """
+    results = dict(scenario)
+    overrides = {
+        "ENGINE": scenario["engine"],
+        "BOARD_WIDTH": scenario["width"],
+        "BOARD_HEIGHT": scenario["height"],
+        "MONSTER_DENSITY": scenario["monsterDensity"],
+        "FOOD_DENSITY": scenario["foodDensity"],
+        "INITIAL_DNA": scenario["dna"],
+        "ACTIVITY_SCHEDULING": scenario["scheduling"],
+    }
+    if scenario["initialHP"] != None:
+        overrides["INITIAL_HP"] = scenario["initialHP"]
+    results["coldStartSeconds"] = _coldStartTime(scenario["seed"],overrides)
+    random.seed(scenario["seed"])
+    config = loadConfig(overrides)
+    startTime = time.time()
+    simulation = createSimulation(config)
+    results["initSeconds"] = time.time() - startTime
+    results["initialPopulation"] = simulation.countMonsters()
+    
+    startTime = time.time()
+    for stepNum in range(scenario["warmupSteps"]):
+        simulation.oneStep()
+    elapsed = time.time() - startTime
+    results["warmupStepsPerSecond"] = scenario["warmupSteps"]/elapsed if elapsed else None
+    
+    monstersProcessed = 0
+    startTime = time.time()
+    for stepNum in range(scenario["steadySteps"]):
+        monstersProcessed += simulation.oneStep()
+    elapsed = time.time() - startTime
+    results["steadyStepsPerSecond"] = scenario["steadySteps"]/elapsed if elapsed else None
+    results["steadyMonstersPerSecond"] = monstersProcessed/elapsed if elapsed else None
+    results["finalPopulation"] = simulation.countMonsters()
+    
+    # The memory is measured before drawing, which loads pygame and its images.
+    results["peakMemoryMB"] = _peakMemoryMB()
+    results["fullDrawSeconds"],results["incrementalDrawSeconds"] = _drawTimes(simulation,scenario)
+    return results
+
+def _coldStartTime(seed,overrides):
+    """
+    Returns how long it takes to run batch.py for one step with the given
+    seed and config overrides, in a new Python process: the time from a cold
+    start to the first step of a scripted run.
+    """
+    command = [sys.executable,"batch.py","--steps","1","--seed",str(seed)]
+    for name,value in sorted(overrides.items()):
+        command += ["--set","{0}={1!r}".format(name,value)]
+    with open(os.devnull,"w") as devnull:
+        startTime = time.time()
+        subprocess.check_call(command,stdout=devnull)
+        return time.time() - startTime
+
+def _drawTimes(simulation,scenario):
+    """
+    Returns the time SimulationApp.draw takes to draw the whole board, and
+    the average time it takes to draw the changes after a step, on an
+    offscreen surface. Returns (None,None) if drawing is off or impossible.
+    """
+    if not scenario["draw"]:
+        return None,None
+    os.environ.setdefault("SDL_VIDEODRIVER","dummy")
+    try:
+        import pygame
+        from pyevosimapp import SimulationApp
+    except ImportError:
+        return None,None
+    app = SimulationApp()
+    tileWidth = app.gfxConfig.TILE_WIDTH
+    boardSize = (simulation.width*tileWidth,simulation.height*tileWidth)
+    if boardSize[0]*boardSize[1] > MAX_DRAW_PIXELS:
+        return None,None
+    app.newSimulation(simulation)
+    surface = pygame.Surface(boardSize)
+    startTime = time.time()
+    app.draw(surface)
+    fullDrawSeconds = time.time() - startTime
+    numSteps = max(1,scenario["steadySteps"])
+    drawSeconds = 0.0
+    for stepNum in range(numSteps):
+        simulation.oneStep()
+        startTime = time.time()
+        app.draw(surface)
+        drawSeconds += time.time() - startTime
+    app.runner.stop()
+    return fullDrawSeconds,drawSeconds/numSteps
+
+def runSuite(scenarios):
+    """
+    Runs the given scenarios one at a time, each in a new process, printing
+    a line for each, and returns the list of results.
+    """
+    pool = multiprocessing.Pool(1,maxtasksperchild=1)
+    allResults = []
+    try:
+        for scenarioNum,results in enumerate(pool.imap(runScenario,scenarios)):
+            allResults.append(results)
+            print "[{0}/{1}] {2}: init {3:.2f}s, {4:.1f} steps/sec, peak {5} MB".format(
+                scenarioNum+1,len(scenarios),scenarioKey(results),results["initSeconds"],
+                results["steadyStepsPerSecond"] or 0.0,_format(results["peakMemoryMB"]))
+    except:
+        pool.terminate()
+        raise
+    else:
+        pool.close()
+    finally:
+        pool.join()
+    return allResults
+
+def _format(value):
+    return "-" if value == None else "{0:.4g}".format(value)
+
+def compareResults(baseline,current,threshold):
+    """
+    Compares two sets of results (as loaded from the JSON files), printing a
+    line for every metric of every scenario in both, and returns the number
+    of regressions: metrics which are worse than the baseline by more than
+    the given fraction.
+    """
+    baselineByKey = dict((scenarioKey(results),results) for results in baseline["results"])
+    numRegressions = 0
+    for results in current["results"]:
+        key = scenarioKey(results)
+        baselineResults = baselineByKey.get(key)
+        if baselineResults == None:
+            print "{0}: not in the baseline".format(key)
+            continue
+        print key
+        for metric,higherIsBetter in METRICS:
+            old,new = baselineResults.get(metric),results.get(metric)
+            if not old or new == None:
+                continue
+            change = (new-old)/old
+            worse = -change if higherIsBetter else change
+            flag = ""
+            if worse > threshold:
+                flag = "  REGRESSION"
+                numRegressions += 1
+            print "  {0:<24} {1:>10} -> {2:>10} ({3:+.1%}){4}".format(metric,_format(old),_format(new),change,flag)
+    return numRegressions
+
+def _loadResults(filename):
+    with open(filename) as resultsFile:
+        return json.load(resultsFile)
+
+def _parseSize(sizeString):
+    width,separator,height = sizeString.lower().partition("x")
+    if not separator:
+        raise ValueError("Sizes must have the form WIDTHxHEIGHT, not {0!r}.".format(sizeString))
+    return int(width),int(height)
+
+def _parseDensity(densityString):
+    monsterDensity,separator,foodDensity = densityString.partition(":")
+    if not separator:
+        raise ValueError("Densities must have the form MONSTERS:FOOD, not {0!r}.".format(densityString))
+    return float(monsterDensity),float(foodDensity)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Runs the benchmark suite, or compares two sets of results.")
+    parser.add_argument("--engines",default="dict",metavar="E1,E2,...",help="the engines to benchmark (default dict)")
+    parser.add_argument("--sizes",metavar="WxH,...",
+                        help="the board sizes (default {0})".format(",".join("{0}x{1}".format(*size) for size in DEFAULT_SIZES)))
+    parser.add_argument("--densities",metavar="M:F,...",
+                        help="the monster and food densities (default {0})".format(
+                            ",".join("{0}:{1}".format(*density) for density in DEFAULT_DENSITIES)))
+    parser.add_argument("--dnas",metavar="DNA,...",help="the initial DNAs (default {0})".format(",".join(DEFAULT_DNAS)))
+    parser.add_argument("--hp",type=int,metavar="HP",help="the initial HP of the monsters (default INITIAL_HP)")
+    parser.add_argument("--scheduling",default="off",metavar="off,on",
+                        help="whether to turn ACTIVITY_SCHEDULING off, on or both (default off)")
+    parser.add_argument("--seed",type=int,default=0,help="the random seed of every scenario (default 0)")
+    parser.add_argument("--warmup-steps",type=int,default=5,help="the number of warm-up steps (default 5)")
+    parser.add_argument("--steady-steps",type=int,default=20,help="the number of steady-state steps (default 20)")
+    parser.add_argument("--no-draw",action="store_true",help="skips the drawing benchmark")
+    parser.add_argument("--output",default="benchmark_results.json",
+                        help="the results file to write (default benchmark_results.json)")
+    parser.add_argument("--baseline",metavar="FILE",help="compares the results against the baseline FILE")
+    parser.add_argument("--threshold",type=float,default=0.1,
+                        help="the fraction by which a metric must be worse to count as a regression (default 0.1)")
+    parser.add_argument("--compare",nargs=2,metavar=("BASELINE","RESULTS"),
+                        help="only compares two existing results files")
+    options = parser.parse_args(args)
+    
+    if options.compare:
+        baselineFilename,resultsFilename = options.compare
+        numRegressions = compareResults(_loadResults(baselineFilename),_loadResults(resultsFilename),options.threshold)
+    else:
+        try:
+            sizes = [_parseSize(size) for size in options.sizes.split(",")] if options.sizes else DEFAULT_SIZES
+            densities = ([_parseDensity(density) for density in options.densities.split(",")]
+                         if options.densities else DEFAULT_DENSITIES)
+        except ValueError as error:
+            parser.error(str(error))
+        dnas = options.dnas.split(",") if options.dnas else DEFAULT_DNAS
+        schedulings = options.scheduling.split(",")
+        if not set(schedulings) <= set(["off","on"]):
+            parser.error("--scheduling must be off, on or off,on, not {0!r}.".format(options.scheduling))
+        scenarios = [{
+            "engine": engine,
+            "width": width,
+            "height": height,
+            "monsterDensity": monsterDensity,
+            "foodDensity": foodDensity,
+            "dna": dna,
+            "initialHP": options.hp,
+            "scheduling": scheduling == "on",
+            "seed": options.seed,
+            "warmupSteps": options.warmup_steps,
+            "steadySteps": options.steady_steps,
+            "draw": not options.no_draw,
+        } for engine,(width,height),(monsterDensity,foodDensity),dna,scheduling in
+            itertools.product(options.engines.split(","),sizes,densities,dnas,schedulings)]
+        results = {
+            "machine": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "processor": platform.processor(),
+                "cpus": multiprocessing.cpu_count(),
+            },
+            "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "results": runSuite(scenarios),
+        }
+        with open(options.output,"w") as resultsFile:
+            json.dump(results,resultsFile,indent=2,sort_keys=True)
+        print "Results are in {0}.".format(options.output)
+        if not options.baseline:
+            return
+        numRegressions = compareResults(_loadResults(options.baseline),results,options.threshold)
+    print "{0} regression(s).".format(numRegressions)
+    if numRegressions:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -16,19 +16,20 @@ class Monster(object):
     behavior is represented here. In the future this may or may not be the case.
     """
     
-    __slots__ = ("hp","dna","color","followed","name")
+    __slots__ = ("hp","genome","color","followed","name","lineageId")
     # Slots may improve performance a bit.
     
-    def __init__(self,dna,hp,color):
+    def __init__(self,genome,hp,color):
         """
         Creates a new monster.
-        dna is the monsters DNA represented as a list of action functions.
+        genome is the monster's DNA, represented as a Genome (an interned tuple
+        of action functions; see the genomes module).
         hp is the monster's starting health points, represented as an integer.
         color is the monster's color, represented as a 3-tuple of integers
         ranging from 0-255 (RGB values).
         """
         self.hp = hp
-        self.dna = dna # dna is a list of action functions.
+        self.genome = genome
         self.color = color
         
         self.followed = False
@@ -39,11 +40,19 @@ class Monster(object):
         self.name = None
         # The monster's name. Monsters have no name by default, but can be
         # given one later, to help keep them straight.
+        
+        self.lineageId = None
+        # The monster's id in the simulation's LineageTracker, if it has one.
+    
+    @property
+    def dna(self):
+        """The monster's DNA, a sequence of action functions (its Genome)."""
+        return self.genome
     
     @property
     def dnaString(self):
         """Formats the DNA as a string, such as "DWIAFEHR"."""
-        return "".join([action.letter for action in self.dna])
+        return self.genome.string
     
     @property
     def infoString(self):
@@ -60,3 +69,62 @@ class Monster(object):
     
     def __repr__(self):
         return "<Monster {0}>".format(self.infoString)
+
+
+class MonsterPool(object):
+    """
+    A free list of dead Monster objects, which the simulation reuses for new
+    monsters instead of creating new objects (which saves allocation and
+    garbage collection time on long runs).
+    
+    Monsters are released when they die, but only become available at the
+    end of the step (when recycle is called), since the engines recognize
+    a monster's turn by the identity of the object in its cell. At most
+    maxSize monsters are kept; any more are left to the garbage collector.
+    
+    created, reused and released count the monsters created by acquire, the
+    monsters it reused, and the monsters released.
+    """
+    def __init__(self,maxSize):
+        self.maxSize = maxSize
+        self.created = 0
+        self.reused = 0
+        self.released = 0
+        self._free = []
+        self._dead = [] # Monsters released during this step.
+    
+    @property
+    def size(self):
+        """The number of monsters ready to be reused."""
+        return len(self._free)
+    
+    def acquire(self,genome,hp,color):
+        """Returns a new monster, like Monster(genome,hp,color), reusing a dead one if possible."""
+        if self._free:
+            self.reused += 1
+            monster = self._free.pop()
+            # The same as Monster.__init__, but without the call.
+            monster.hp = hp
+            monster.genome = genome
+            monster.color = color
+            monster.followed = False
+            monster.name = None
+            monster.lineageId = None
+            return monster
+        self.created += 1
+        return Monster(genome,hp,color)
+    
+    def release(self,monster):
+        """Gives back a monster which has died."""
+        self.released += 1
+        self._dead.append(monster)
+    
+    def recycle(self):
+        """Makes the monsters released during this step available for reuse."""
+        free = self._free
+        free.extend(self._dead[:self.maxSize - len(free)])
+        self._dead = []
+    
+    def statistics(self):
+        """Returns the pool's counts as a dict, for reports."""
+        return {"created": self.created, "reused": self.reused, "released": self.released, "free": len(self._free)}
@@ -0,0 +1,217 @@
+'''
+This module saves simulations to checkpoint files and loads them again. It
+requires NumPy (for either engine).
+
+A checkpoint file is laid out as follows (all numbers little-endian):
+-A header: the magic string "PYEVOSIM", the format version (uint32), the
+ board width and height (uint32 each) and the length of the metadata (uint64).
+-The metadata, as UTF-8 JSON: the config, the genome table (id and DNA string
+ of every genome), the step count, the uid counter, the names and uids of
+ named and followed monsters, the unused names and the state of the random
+ number generator.
+-The board arrays, one after another, each starting on an 8-byte boundary:
+ cellTypes (uint8), hp (int32), colors (3 uint8 per cell), genomeIds (int32)
+ and uids (int64), with one entry per cell (index = y*width + x).
+
+Loading memory-maps the arrays (copy-on-write), so it takes almost no time
+even for very large boards: the array engine uses the mapped arrays directly,
+and pages are only read from disk as they are used.
+
+Created on Oct 18, 2026
+'''
+
+import json
+import os
+import random
+import struct
+import sys
+import threading
+import numpy
+import actions
+from utils.misc import Config
+from simulator import createSimulation
+
+MAGIC = "PYEVOSIM"
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct("<8sIIIQ")
+_ARRAYS = [ # name, dtype, values per cell
+    ("cellTypes","<u1",1),
+    ("hp","<i4",1),
+    ("colors","<u1",3),
+    ("genomeIds","<i4",1),
+    ("uids","<i8",1),
+]
+
+class CheckpointError(Exception):
+    """An exception raised when a file is not a usable checkpoint."""
+    pass
+
+def _jsonConfig(config):
+    """Returns the options of the given config which can be stored as JSON."""
+    jsonConfig = {}
+    for name,value in config.iteritems():
+        if name.isupper() and isinstance(value,(bool,int,long,float,basestring,tuple,list,type(None))):
+            jsonConfig[name] = value
+    return jsonConfig
+
+def takeSnapshot(simulation):
+    """
+    Returns a snapshot of the given simulation (its exported state, plus the
+    metadata to be written with it), which can later be written with
+    writeSnapshot. The snapshot is independent of the simulation, so the
+    simulation can keep running while the snapshot is written.
+    """
+    state = simulation.exportState()
+    metadata = {
+        "engine": simulation.config.get("ENGINE","dict"),
+        "config": _jsonConfig(simulation.config),
+        "genomes": sorted([genome.id,genome.string] for genome in simulation.genomeRegistry),
+        "stepCount": state["stepCount"],
+        "nextUid": state["nextUid"],
+        "monsterNames": sorted(state["monsterNames"].items()),
+        "followed": sorted(state["followed"]),
+        "namesList": state["namesList"],
+        "randomState": random.getstate(),
+    }
+    return (simulation.width,simulation.height,metadata,state)
+
+def writeSnapshot(snapshot,filename):
+    """
+    Writes a snapshot (from takeSnapshot) to the given file. The file is
+    written under a temporary name and then renamed, so an existing checkpoint
+    is never left half-overwritten (and a simulation memory-mapped from it
+    keeps working).
+    """
+    width,height,metadata,state = snapshot
+    metadataBytes = json.dumps(metadata).encode("utf-8")
+    tempFilename = filename + ".tmp"
+    with open(tempFilename,"wb") as checkpointFile:
+        checkpointFile.write(_HEADER.pack(MAGIC,FORMAT_VERSION,width,height,len(metadataBytes)))
+        checkpointFile.write(metadataBytes)
+        for name,dtype,valuesPerCell in _ARRAYS:
+            checkpointFile.write("\0" * (-checkpointFile.tell() % 8))
+            checkpointFile.write(numpy.ascontiguousarray(state[name],dtype).tostring())
+    os.rename(tempFilename,filename)
+
+def saveCheckpoint(simulation,filename):
+    """Saves the given simulation to the given checkpoint file."""
+    writeSnapshot(takeSnapshot(simulation),filename)
+
+def loadCheckpoint(filename,engine=None):
+    """
+    Loads a simulation from the given checkpoint file, and restores the state
+    of the random number generator. The simulation uses the engine it was
+    saved with, unless another engine ("dict" or "array") is given.
+    """
+    with open(filename,"rb") as checkpointFile:
+        header = checkpointFile.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            raise CheckpointError, "{0} is not a checkpoint file.".format(filename)
+        magic,version,width,height,metadataLength = _HEADER.unpack(header)
+        if magic != MAGIC:
+            raise CheckpointError, "{0} is not a checkpoint file.".format(filename)
+        if version != FORMAT_VERSION:
+            raise CheckpointError, "{0} has unsupported format version {1}.".format(filename,version)
+        metadata = json.loads(checkpointFile.read(metadataLength).decode("utf-8"))
+    
+    numCells = width*height
+    state = {}
+    offset = _HEADER.size + metadataLength
+    for name,dtype,valuesPerCell in _ARRAYS:
+        offset += -offset % 8
+        shape = (numCells,valuesPerCell) if valuesPerCell > 1 else (numCells,)
+        state[name] = numpy.memmap(filename,dtype=dtype,mode="c",offset=offset,shape=shape)
+        offset += numpy.dtype(dtype).itemsize*numCells*valuesPerCell
+    
+    config = Config()
+    for name,value in metadata["config"].iteritems():
+        # JSON turns tuples (such as colors) into lists, so turn them back.
+        config[str(name)] = tuple(value) if isinstance(value,list) else value
+    config["ENGINE"] = engine or metadata["engine"]
+    # Lineage isn't saved, so if it is tracked, it starts again from the monsters loaded.
+    trackLineage = config.get("TRACK_LINEAGE")
+    config["TRACK_LINEAGE"] = False
+    simulation = createSimulation(config,populate=False)
+    for genomeId,dnaString in metadata["genomes"]:
+        genome = simulation.genomeRegistry.intern([actions.DNA_MAP[letter] for letter in dnaString])
+        if genome.id != genomeId:
+            raise CheckpointError, "The genomes in {0} don't match the available actions.".format(filename)
+    state["nextUid"] = metadata["nextUid"]
+    state["monsterNames"] = dict(metadata["monsterNames"])
+    state["followed"] = metadata["followed"]
+    state["stepCount"] = metadata["stepCount"]
+    state["namesList"] = metadata["namesList"]
+    simulation.importState(state)
+    if trackLineage:
+        config["TRACK_LINEAGE"] = True
+        simulation.enableLineage()
+    
+    randomVersion,internalState,gaussNext = metadata["randomState"]
+    random.setstate((randomVersion,tuple(internalState),gaussNext))
+    return simulation
+
+
+class PeriodicCheckpointer(object):
+    """
+    Saves a checkpoint of a simulation every so many steps, stalling it as
+    little as possible: the simulation's state is copied and then written to
+    disk in a background thread while the simulation keeps running. If the
+    previous checkpoint is still being written when the next is due, the next
+    one waits for it.
+    
+    Copying the state is quick for the array engine, which only copies its
+    arrays, but the dict and chunked engines build the arrays cell by cell in
+    Python (see ObjectSimulationBase.exportState), which takes about half as
+    long as a step, so checkpointing them often slows them down noticeably.
+    
+    Call stepped after every step, and finish at the end. If writing a
+    checkpoint fails, the error is raised by the next call to save, wait or
+    finish.
+    """
+    def __init__(self,filename,interval=None):
+        """
+        Creates a checkpointer saving to the given file every interval steps
+        (or only when finish is called, if interval is None).
+        """
+        self.filename = filename
+        self.interval = interval
+        self._thread = None
+        self._error = None # The exc_info of a failed write, until it is raised.
+    
+    def stepped(self,simulation):
+        """Saves a checkpoint if one is due (judging by the simulation's step count)."""
+        if self.interval and simulation.stepCount % self.interval == 0:
+            self.save(simulation)
+    
+    def save(self,simulation):
+        """Starts saving a checkpoint of the simulation in the background."""
+        snapshot = takeSnapshot(simulation)
+        self.wait()
+        self._thread = threading.Thread(target=self._write,args=(snapshot,))
+        self._thread.start()
+    
+    def _write(self,snapshot):
+        """Writes the snapshot (in the background thread), keeping any error for wait to raise."""
+        try:
+            writeSnapshot(snapshot,self.filename)
+        except:
+            self._error = sys.exc_info()
+    
+    def wait(self):
+        """
+        Waits until any checkpoint being written is finished, and raises the
+        error if writing it failed.
+        """
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        if self._error:
+            errorType,error,errorTraceback = self._error
+            self._error = None
+            raise errorType,error,errorTraceback
+    
+    def finish(self,simulation):
+        """Saves a final checkpoint of the simulation, and waits for it to be written."""
+        self.save(simulation)
+        self.wait()
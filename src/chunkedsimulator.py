@@ -0,0 +1,249 @@
+'''
+This module provides ChunkedSimulation, an alternative simulation engine which
+stores the board sparsely, as square chunks of cells which are only created
+when something is put in them and are freed again when they become empty. It
+is selected by setting the configurable value ENGINE to "chunked".
+
+It is meant for very large (or unbounded) worlds which are mostly empty, or
+mostly static food: memory use is proportional to the occupied area, and
+each step only visits the chunks which contain monsters.
+
+Created on Oct 18, 2026
+'''
+
+from math import log
+import actions
+from boardelements import Monster,MonsterPool,FOOD
+from utils.coords import Coords,CARDINAL_DIRECTIONS
+from simulator import ObjectSimulationBase,initialDNA,populatedArea
+from scheduler import ActivityScheduler
+from genomes import GenomeRegistry
+from random import random as probcheck
+
+CHUNK_SHIFT = 6
+CHUNK_SIZE = 1 << CHUNK_SHIFT # The width and height of a chunk, in cells.
+_CHUNK_MASK = CHUNK_SIZE - 1
+
+class Chunk(object):
+    """
+    A CHUNK_SIZE by CHUNK_SIZE square of cells. cells is a flat list of the
+    contents of each cell (a Monster, FOOD or None), row by row. numOccupied
+    counts the cells which aren't None, and monsterIndices is the set of
+    indices (in cells) of the cells which hold monsters, so that the monsters
+    can be found without looking through every cell.
+    """
+    
+    __slots__ = ("cells","numOccupied","monsterIndices")
+    
+    def __init__(self):
+        self.cells = [None]*(CHUNK_SIZE*CHUNK_SIZE)
+        self.numOccupied = 0
+        self.monsterIndices = set()
+
+
+class ChunkedSimulation(ObjectSimulationBase):
+    """
+    This class represents the simulation as a whole, like Simulation, but
+    stores the board as a dict of Chunks keyed by chunk coords (the cell
+    coords divided by CHUNK_SIZE, rounded down), holding the same Monster
+    objects and FOOD as Simulation does.
+    
+    Either dimension of the board can be unbounded (None), in which case only
+    the area given by POPULATED_AREA is filled at the start.
+    
+    The monsters take their turns in a fixed order (chunk by chunk, row by row
+    within each chunk), so unlike Simulation, a seeded run always gives the
+    same results.
+    """
+    def __init__(self,config,populate=True):
+        """
+        Creates a simulation with the given config. Unless populate is false,
+        the board is randomly filled with monsters and food.
+        """
+        if config.WRAP_EDGES and (config.BOARD_WIDTH == None or config.BOARD_HEIGHT == None):
+            raise Exception, "Only a bounded board can wrap around."
+        ObjectSimulationBase.__init__(self)
+        self.width = config.BOARD_WIDTH
+        self.height = config.BOARD_HEIGHT
+        self.config = config
+        self.wrap = config.WRAP_EDGES
+        self.stepCount = 0 # The number of steps run so far.
+        self._neighborOffsets = [tuple(dir.offset) for dir in CARDINAL_DIRECTIONS]
+        self._chunks = {}
+        self._monsterChunks = set() # The keys of the chunks containing monsters.
+        poolSize = config.get("MONSTER_POOL_SIZE",0)
+        self.monsterPool = MonsterPool(poolSize) if poolSize else None # See MonsterPool.
+        if config.get("ACTIVITY_SCHEDULING"):
+            self.scheduler = ActivityScheduler(self)
+        self.genomeRegistry = GenomeRegistry()
+        startGenome = self.genomeRegistry.intern(initialDNA(config))
+        if populate:
+            self._populate(startGenome)
+            self._indexFreeCells()
+    
+    def _populate(self,startGenome):
+        """
+        Randomly places the starting monsters and food, with the same
+        probabilities and limits as Simulation, over the populated area.
+        
+        If FOOD_DENSITY is 0, the monsters are placed by drawing the gaps
+        between them from a geometric distribution, so that filling a huge,
+        sparse world only takes time proportional to the number of monsters.
+        """
+        config = self.config
+        areaWidth,areaHeight = populatedArea(config)
+        totalMonsters = 0
+        totalFood = 0
+        if config.FOOD_DENSITY == 0:
+            numCells = areaWidth*areaHeight
+            density = config.MONSTER_DENSITY
+            position = -1
+            while density > 0 and totalMonsters < config.MAX_NUM_MONSTERS:
+                if density < 1:
+                    position += int(log(1.0 - probcheck()) / log(1.0 - density))
+                position += 1
+                if position >= numCells:
+                    break
+                self._setCell((position // areaHeight, position % areaHeight),
+                              Monster(startGenome, config.INITIAL_HP, config.INITIAL_COLOR))
+                totalMonsters += 1
+        else:
+            for x in xrange(areaWidth):
+                for y in xrange(areaHeight):
+                    if probcheck() < config.MONSTER_DENSITY and totalMonsters < config.MAX_NUM_MONSTERS:
+                        self._setCell((x,y),Monster(startGenome, config.INITIAL_HP, config.INITIAL_COLOR))
+                        totalMonsters += 1
+                    elif probcheck() < config.FOOD_DENSITY and totalFood < config.MAX_NUM_FOOD:
+                        self._setCell((x,y),FOOD)
+                        totalFood += 1
+        self.genomeRegistry.born(startGenome,totalMonsters)
+    
+    def _setCell(self,coords,element):
+        """
+        Sets the contents of the given cell (to a Monster, FOOD or None),
+        creating its chunk if need be, and freeing it if it becomes empty.
+        """
+        x,y = coords
+        key = (x >> CHUNK_SHIFT, y >> CHUNK_SHIFT)
+        chunk = self._chunks.get(key)
+        if chunk == None:
+            if element == None:
+                return
+            chunk = self._chunks[key] = Chunk()
+        index = ((y & _CHUNK_MASK) << CHUNK_SHIFT) | (x & _CHUNK_MASK)
+        old = chunk.cells[index]
+        chunk.cells[index] = element
+        if self.freeCells != None and (old == None) != (element == None):
+            if element == None:
+                self.freeCells.add(y*self.width + x)
+            else:
+                self.freeCells.remove(y*self.width + x)
+        if old != None:
+            chunk.numOccupied -= 1
+            if isinstance(old,Monster):
+                chunk.monsterIndices.discard(index)
+                if not chunk.monsterIndices:
+                    self._monsterChunks.discard(key)
+        if element != None:
+            chunk.numOccupied += 1
+            if isinstance(element,Monster):
+                chunk.monsterIndices.add(index)
+                self._monsterChunks.add(key)
+        elif chunk.numOccupied == 0:
+            del self._chunks[key]
+    
+    @property
+    def numChunks(self):
+        """The number of chunks currently allocated."""
+        return len(self._chunks)
+    
+    def checkWithinBounds(self,coords):
+        """Returns true if the given coords are within the board's bounds."""
+        x,y = coords
+        return (self.width == None or 0 <= x < self.width) and (self.height == None or 0 <= y < self.height)
+    
+    def getNeighbors(self,coords):
+        x,y = coords
+        width,height = self.width,self.height
+        if self.wrap:
+            neighbors = []
+            for dx,dy in self._neighborOffsets:
+                neighbor = Coords((x+dx) % width, (y+dy) % height)
+                if neighbor != coords and neighbor not in neighbors:
+                    neighbors.append(neighbor)
+            return neighbors
+        return [Coords(x+dx,y+dy) for dx,dy in self._neighborOffsets
+                if (width == None or 0 <= x+dx < width) and (height == None or 0 <= y+dy < height)]
+    
+    def get(self,coords,default=None):
+        """
+        Returns the contents of the given coords like Simulation.get: a
+        Monster, FOOD, or default if the cell is empty.
+        """
+        x,y = coords
+        chunk = self._chunks.get((x >> CHUNK_SHIFT, y >> CHUNK_SHIFT))
+        if chunk == None:
+            return default
+        element = chunk.cells[((y & _CHUNK_MASK) << CHUNK_SHIFT) | (x & _CHUNK_MASK)]
+        return default if element == None else element
+    
+    def iteritems(self):
+        """Iterates over (coords,element) for every non-empty cell, like dict.iteritems."""
+        for (chunkX,chunkY),chunk in self._chunks.items():
+            baseX,baseY = chunkX << CHUNK_SHIFT, chunkY << CHUNK_SHIFT
+            for index,element in enumerate(chunk.cells):
+                if element != None:
+                    yield Coords(baseX + (index & _CHUNK_MASK), baseY + (index >> CHUNK_SHIFT)),element
+    
+    def items(self):
+        return list(self.iteritems())
+    
+    def oneStep(self):
+        """
+        Executes one step of the simulation, like Simulation.oneStep, visiting
+        only the chunks which contain monsters.
+        
+        The monsters move chunk by chunk (in order of chunk coords), and row
+        by row within each chunk. Monsters which die before their turn (or are
+        born during the step) do not get a turn, and sleeping monsters skip
+        theirs, as in Simulation.oneStep.
+        
+        Returns the number of monsters that took a turn.
+        """
+        self.stepCount += 1
+        turns = []
+        for key in sorted(self._monsterChunks):
+            chunk = self._chunks[key]
+            baseX,baseY = key[0] << CHUNK_SHIFT, key[1] << CHUNK_SHIFT
+            for index in sorted(chunk.monsterIndices):
+                turns.append((Coords(baseX + (index & _CHUNK_MASK), baseY + (index >> CHUNK_SHIFT)),chunk.cells[index]))
+        hpLossPerTurn = self.config.HP_LOSS_PER_TURN
+        scheduler = self.scheduler
+        numProcessed = 0
+        for coords,monster in turns:
+            if self.get(coords) is monster:
+                numProcessed += 1
+                if scheduler != None and scheduler.skipTurn(monster,coords):
+                    continue
+                self.changeMonsterHP(monster, coords, -hpLossPerTurn)
+                if monster.hp > 0:
+                    action = actions.performFirstApplicableAction(self,monster,coords)
+                    if scheduler != None and (action == None or action.inert):
+                        scheduler.sleep(monster,coords)
+        if self.monsterPool != None:
+            self.monsterPool.recycle()
+        self.regrowFood()
+        if scheduler != None and (self.stats or self.recorder != None):
+            scheduler.settle()
+        if self.recorder != None:
+            self.recorder.stepped(self)
+        return numProcessed
+    
+    def _cellCoords(self,index):
+        """Returns the coords of the cell with the given index."""
+        return Coords(index % self.width, index // self.width)
+    
+    def _emptyCells(self):
+        """Returns the indices (y*width+x) of the empty cells, for regrowFood."""
+        width = self.width
+        return [y*width + x for y in xrange(self.height) for x in xrange(width) if self.get((x,y)) == None]
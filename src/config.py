@@ -1,8 +1,33 @@
 # Simulation configuration
 
+ENGINE = "dict"
+# The simulation engine to use. "dict" is the original engine, which stores the
+# board as a dict of Coords. "array" stores the board in dense NumPy arrays,
+# which is much smaller for large boards (but requires NumPy). It is only
+# faster with BATCHED_ACTIONS; otherwise it steps more slowly than "dict".
+# "chunked" stores the board sparsely, in 64x64 chunks which only exist while
+# something is in them, and only steps the chunks with monsters in them. It is
+# meant for huge (or unbounded) boards which are mostly empty or static food.
+# "parallel" splits the board into horizontal stripes, each stepped by its own
+# process (using the array engine), for huge boards on machines with many
+# cores. It can only be used headless (such as with batch.py).
+
+NUM_WORKERS = None
+# The number of processes used by the parallel engine. None means one per core.
+
 BOARD_WIDTH = 60  # The width of the board in tiles.
 BOARD_HEIGHT = 25 # The height of the board in tiles.
 
+WRAP_EDGES = False
+# If True, the board wraps around at the edges (like a torus), so monsters on
+# the left edge are next to the right edge, and the top edge next to the bottom.
+
+POPULATED_AREA = None
+# The (width,height) of the area, starting at the top left corner, which is
+# randomly filled with monsters and food at the start. None means the whole
+# board. It is required for an unbounded board (BOARD_WIDTH or BOARD_HEIGHT
+# None), which only the dict and chunked engines support.
+
 INITIAL_DNA = "DWIAFEHR"
 # INITIAL_DNA is the DNA sequence with which all monsters begin.
 # Note that certain beginning DNA sequences are doomed to fail, specifically
@@ -36,3 +61,45 @@ COLOR_CHANGE_OFFSET = 30
 # (It will randomly choose one component of the RGB color representation and
 # add or subtract this number to it, ensuring that the resulting number is still
 # between 0 and 255.)
+
+TRACK_LINEAGE = False
+# If True, the simulation records which monster every monster was born from
+# (see the lineage module), so the ancestry of a monster and the most recent
+# common ancestor of the population can be found. The parallel engine doesn't
+# support it.
+
+MONSTER_POOL_SIZE = 0
+# The maximum number of dead monsters kept to be reused for new ones by the
+# dict and chunked engines, which saves allocation and garbage collection time
+# on long runs. 0 turns this off. (The other engines don't create a monster
+# object per monster, so it doesn't affect them.)
+
+FOOD_REGROWTH_RATE = 0
+# The average number of pieces of food which grow in empty cells each step
+# (fractions are allowed: 0.5 means one every other step). 0 means food never
+# regrows, so food only comes from the start and from dead monsters. Requires
+# a bounded board, and isn't supported by the parallel engine.
+
+FOOD_REGROWTH_PATTERN = "uniform"
+# Where food regrows: "uniform" (anywhere), "gradient" (more on the left),
+# "patches" (mostly in a checkerboard of 16x16 patches) or "waves" (in
+# diagonal bands).
+
+ACTIVITY_SCHEDULING = False
+# If True, the dict and chunked engines skip the turns of monsters which did
+# nothing last turn (because their first applicable action was idle, or no
+# action was applicable) for as long as nothing around them changes, taking
+# away the HP they lose all at once later on. The results are exactly the
+# same either way; populations which are mostly idle or boxed in step faster
+# (about twice as fast when nearly all of them idle), but busy ones step
+# slower, because of the bookkeeping. (The other engines ignore it.)
+
+BATCHED_ACTIONS = False
+# If True, the array engine steps all the monsters together, with array
+# operations: every monster loses its HP, then chooses its action from the
+# board as it is at that point, and then all the monsters which chose the same
+# action perform it at once (see actions.batchedAction). Monsters don't see
+# each other's moves within a step, and when several want to move into the
+# same cell, the one nearest the top left corner gets it. This is a different
+# simulation from the usual one-monster-at-a-time steps, but much faster on
+# big boards. (The other engines ignore it.)
@@ -0,0 +1,132 @@
+'''
+This module defines Genome, the interned form of monster DNA, and
+GenomeRegistry, which interns genomes and keeps count of how many living
+monsters carry each one.
+
+Created on Oct 18, 2026
+'''
+
+import math
+import actions
+
+class Genome(tuple):
+    """
+    A genome is an immutable DNA sequence: a tuple of action functions. It
+    should never be constructed directly, only through GenomeRegistry.intern,
+    so that there is only one Genome object for each distinct DNA sequence.
+    
+    Besides being a tuple, a genome has two attributes:
+    id is an integer identifying the genome (see GenomeRegistry).
+    string is the DNA string, such as "DWIAFEHR".
+    """
+    def __new__(cls,dna,genomeId):
+        genome = tuple.__new__(cls,dna)
+        genome.id = genomeId
+        genome.string = "".join([action.letter for action in dna])
+        return genome
+    
+    def __repr__(self):
+        return "<Genome {0} ({1})>".format(self.string,self.id)
+
+
+class GenomeRegistry(object):
+    """
+    This class interns genomes and counts the living monsters carrying each
+    one. The simulation tells it whenever a monster is born or dies, so the
+    population of every genome is always known without looking at the board.
+    
+    Genome ids are stable: a genome which is a permutation of the whole
+    alphabet (which any DNA descended from a full INITIAL_DNA is, since
+    mutations only swap actions) gets its rank among all the permutations of
+    the alphabet, in lexicographic order, so its id is between 0 and n!-1.
+    Any other genome gets an id from n! upwards, in the order it was first
+    seen.
+    """
+    def __init__(self,alphabet=None):
+        """
+        Creates an empty registry. alphabet is the sequence of actions used to
+        rank genomes, which defaults to actions.ALL_ACTIONS.
+        """
+        if alphabet == None:
+            alphabet = actions.ALL_ACTIONS
+        self._positions = dict((action,position) for position,action in enumerate(alphabet))
+        self._numPermutations = math.factorial(len(self._positions))
+        self._nextExtraId = self._numPermutations
+        self._genomes = {} # The interned genomes, keyed by their DNA tuples.
+        self._genomesById = {}
+        self._counts = {}  # The number of living monsters, keyed by genome id (only if nonzero).
+        self.totalCount = 0
+    
+    def _rank(self,dna):
+        """
+        Returns the rank of the given DNA among the permutations of the
+        alphabet, or None if it isn't a permutation of the alphabet.
+        """
+        positions = [self._positions.get(action) for action in dna]
+        if len(positions) != len(self._positions) or len(set(positions)) != len(positions) or None in positions:
+            return None
+        rank = 0
+        for i,position in enumerate(positions):
+            smallerLater = sum(1 for laterPosition in positions[i+1:] if laterPosition < position)
+            rank += smallerLater*math.factorial(len(positions)-1-i)
+        return rank
+    
+    def intern(self,dna):
+        """
+        Returns the Genome for the given DNA (any sequence of action functions),
+        creating it if this is the first time it's been seen.
+        """
+        if isinstance(dna,Genome) and self._genomesById.get(dna.id) is dna:
+            return dna # Already interned here.
+        key = dna if isinstance(dna,tuple) else tuple(dna)
+        genome = self._genomes.get(key)
+        if genome == None:
+            genomeId = self._rank(key)
+            if genomeId == None:
+                genomeId = self._nextExtraId
+                self._nextExtraId += 1
+            genome = Genome(key,genomeId)
+            self._genomes[key] = genome
+            self._genomesById[genomeId] = genome
+        return genome
+    
+    def get(self,genomeId):
+        """Returns the (already interned) genome with the given id."""
+        return self._genomesById[genomeId]
+    
+    def __iter__(self):
+        """Iterates over every interned genome, living or not."""
+        return self._genomesById.itervalues()
+    
+    def __len__(self):
+        return len(self._genomesById)
+    
+    def born(self,genome,number=1):
+        """Records the birth of the given number of monsters with the given genome."""
+        self._counts[genome.id] = self._counts.get(genome.id,0) + number
+        self.totalCount += number
+    
+    def died(self,genome,number=1):
+        """Records the death of the given number of monsters with the given genome."""
+        count = self._counts[genome.id] - number
+        if count:
+            self._counts[genome.id] = count
+        else:
+            del self._counts[genome.id]
+        self.totalCount -= number
+    
+    def clearCounts(self):
+        """Forgets every living monster (but not the interned genomes)."""
+        self._counts.clear()
+        self.totalCount = 0
+    
+    def count(self,genome):
+        """Returns the number of living monsters with the given genome."""
+        return self._counts.get(genome.id,0)
+    
+    def populationByGenome(self):
+        """
+        Returns a dict of the number of living monsters with each genome (only
+        including genomes with living monsters).
+        """
+        return dict((self._genomesById[genomeId],count) for genomeId,count in self._counts.iteritems())
@@ -11,5 +11,36 @@ COLOR_KEY = (0,127,127)
 
 MAX_FRAMERATE = 5
 # The maximum framerate, in frames per second.
-# Set this higher to increase the rate of simulation. Note that setting it low
-# will also affect the responsiveness of the GUI.
+# Set this higher to increase the rate of simulation (unless BACKGROUND_STEPPING
+# is on). Note that setting it low will also affect the responsiveness of the
+# GUI.
+
+BACKGROUND_STEPPING = False
+# If True, the simulation is stepped in a background thread instead of once
+# per frame, so it can run faster than MAX_FRAMERATE (and a slow step doesn't
+# freeze the GUI). The display then shows the board as it is at each frame.
+
+STEPS_PER_SECOND = None
+# The target rate of simulation with BACKGROUND_STEPPING, in steps per second.
+# None means as fast as possible.
+
+TILE_CACHE_SIZE = 4096
+# The maximum number of monster tiles (one per combination of color and
+# whether the monster is followed) kept ready to draw. If there are more, the
+# least recently used ones are thrown away and drawn again when needed.
+
+RENDER_MODE = "tiles"
+# How the board is drawn. "tiles" draws every monster and piece of food with
+# its sprite, and after the first frame only redraws the cells that changed.
+# "array" draws the whole board every frame as colored squares (with a marker
+# on followed monsters), scaled up from one pixel per cell. It takes about the
+# same time whatever the population, so it is much faster for big, busy
+# boards. It requires NumPy.
+
+FOOD_COLOR = (160,60,40)
+# The color of food with RENDER_MODE = "array".
+
+REPLAY_STEPS_PER_SECOND = 10
+# The rate at which a trajectory file (main.py --replay) is played back to
+# begin with, in steps per second. It can be changed while replaying with F
+# (faster) and S (slower).
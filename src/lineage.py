@@ -0,0 +1,125 @@
+'''
+This module keeps track of who descends from whom.
+
+A LineageTracker is attached to a simulation (with enableLineage), which tells
+it whenever a monster is born or dies. Every monster gets a lineage id, and
+its parent's lineage id, the step it was born in and its genome id are
+appended to compact arrays. Records which are no longer the ancestor of any
+living monster are pruned from time to time, so the arrays stay about as big
+as the family tree of the living population.
+
+Created on Oct 18, 2026
+'''
+
+from array import array
+from bisect import bisect_left
+
+NO_PARENT = -1 # The parent id of monsters which weren't born from another one.
+
+class LineageTracker(object):
+    """
+    Records the family tree of a simulation's monsters. Lineage ids are
+    handed out in increasing order and never reused, so the records (in the
+    arrays ids, parentIds, birthSteps and genomeIds, which are kept in order
+    of id) can be found by bisection.
+    
+    After pruning, only the records of living monsters and their ancestors
+    are kept. Pruning happens whenever the number of records reaches twice
+    the number kept by the last pruning (and at least minPruneSize), so it
+    takes constant time per birth on average.
+    """
+    def __init__(self,minPruneSize=4096):
+        self.ids = array("l")
+        self.parentIds = array("l")
+        self.birthSteps = array("l")
+        self.genomeIds = array("l")
+        self.living = set() # The lineage ids of the living monsters.
+        self.minPruneSize = minPruneSize
+        self.numPruned = 0
+        self._nextId = 0
+        self._pruneSize = minPruneSize
+    
+    def born(self,parentId,step,genomeId):
+        """
+        Records the birth of a monster (with NO_PARENT as the parentId for a
+        monster without one) and returns its new lineage id.
+        """
+        lineageId = self._nextId
+        self._nextId += 1
+        self.ids.append(lineageId)
+        self.parentIds.append(parentId)
+        self.birthSteps.append(step)
+        self.genomeIds.append(genomeId)
+        self.living.add(lineageId)
+        if len(self.ids) >= self._pruneSize:
+            self.prune()
+        return lineageId
+    
+    def died(self,lineageId):
+        """Records the death of a monster."""
+        self.living.discard(lineageId)
+    
+    def _row(self,lineageId):
+        """Returns the index of the record of the given lineage id (which must not have been pruned)."""
+        row = bisect_left(self.ids,lineageId)
+        if row == len(self.ids) or self.ids[row] != lineageId:
+            raise KeyError(lineageId)
+        return row
+    
+    def prune(self):
+        """Throws away the records of monsters with no living descendants."""
+        ids,parentIds = self.ids,self.parentIds
+        keep = [False]*len(ids)
+        for lineageId in self.living:
+            row = self._row(lineageId)
+            while not keep[row]:
+                keep[row] = True
+                parentId = parentIds[row]
+                if parentId == NO_PARENT:
+                    break
+                row = self._row(parentId)
+        oldLength = len(ids)
+        for name in ("ids","parentIds","birthSteps","genomeIds"):
+            oldArray = getattr(self,name)
+            setattr(self,name,array("l",(value for value,kept in zip(oldArray,keep) if kept)))
+        self.numPruned += oldLength - len(self.ids)
+        self._pruneSize = max(self.minPruneSize,2*len(self.ids))
+    
+    def record(self,lineageId):
+        """Returns the (lineageId, parentId, birthStep, genomeId) of the given lineage id."""
+        row = self._row(lineageId)
+        return (lineageId,self.parentIds[row],self.birthSteps[row],self.genomeIds[row])
+    
+    def ancestry(self,lineageId):
+        """
+        Returns the records (as returned by record) of the given monster and
+        all its ancestors, from the monster itself back to its oldest known
+        ancestor.
+        """
+        records = []
+        while lineageId != NO_PARENT:
+            records.append(self.record(lineageId))
+            lineageId = records[-1][1]
+        return records
+    
+    def mostRecentCommonAncestor(self):
+        """
+        Returns the lineage id of the most recent common ancestor of all the
+        living monsters (which may be a living monster itself, if all the
+        others descend from it), or None if there is none: if they descend
+        from more than one of the starting monsters, or if there are none.
+        """
+        self.prune()
+        if not self.living:
+            return None
+        children = {} # Maps lineage ids to one of their children (the only one, where it matters).
+        numChildren = {}
+        for lineageId,parentId in zip(self.ids,self.parentIds):
+            numChildren[parentId] = numChildren.get(parentId,0) + 1
+            children[parentId] = lineageId
+        if numChildren.get(NO_PARENT) != 1:
+            return None
+        lineageId = children[NO_PARENT]
+        while lineageId not in self.living and numChildren.get(lineageId) == 1:
+            lineageId = children[lineageId]
+        return lineageId
@@ -6,8 +6,12 @@ Created on Sep 29, 2011
 @author: garrison
 '''
 
+import argparse
 from pyevosimapp import SimulationApp
 
 if __name__ == '__main__':
-    SimulationApp.run()
-
+    parser = argparse.ArgumentParser(description="Runs the simulation in a window.")
+    parser.add_argument("--replay",metavar="FILE",
+                        help="plays back the trajectory FILE (recorded with batch.py --record) instead")
+    options = parser.parse_args()
+    SimulationApp.run(replayFilename=options.replay)
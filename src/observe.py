@@ -0,0 +1,70 @@
+#!/usr/bin/python
+
+'''
+This module runs a simulation without the GUI, and serves it to viewers on a
+local socket (see the observer module) until it is interrupted with Ctrl-C.
+
+Example usage (from the src folder):
+python observe.py --port 8765 --seed 42
+python observe.py --port 8765 --rate 20 --paused --set ENGINE=chunked
+python observe.py --port 8765 --resume run.ckpt
+
+Created on Oct 18, 2026
+'''
+
+import argparse
+import random
+import time
+from batch import loadConfig,parseOverride
+from simulator import createSimulation
+from runner import SimulationRunner
+from observer import ObserverServer,KEYFRAME_INTERVAL,MAX_QUEUED_FRAMES
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Runs a simulation without the GUI, and serves it to viewers.")
+    parser.add_argument("--port",type=int,default=0,help="the port to listen on (default: any free port)")
+    parser.add_argument("--seed",type=int,help="the random seed (for reproducible runs)")
+    parser.add_argument("--set",action="append",default=[],metavar="NAME=VALUE",dest="overrides",
+                        help="overrides a config option (can be given more than once)")
+    parser.add_argument("--resume",metavar="FILE",
+                        help="serves the simulation saved in the checkpoint FILE, instead of a new one")
+    parser.add_argument("--rate",type=float,metavar="STEPS",help="steps at most STEPS steps per second")
+    parser.add_argument("--paused",action="store_true",help="starts paused (until a viewer resumes it)")
+    parser.add_argument("--keyframe-every",type=int,default=KEYFRAME_INTERVAL,metavar="STEPS",
+                        help="sends every viewer a keyframe every STEPS steps (default {0})".format(KEYFRAME_INTERVAL))
+    parser.add_argument("--max-queued-frames",type=int,default=MAX_QUEUED_FRAMES,metavar="FRAMES",
+                        help="drops a viewer's frames when more than FRAMES are waiting (default {0})".format(MAX_QUEUED_FRAMES))
+    options = parser.parse_args(args)
+    try:
+        overrides = dict(parseOverride(override) for override in options.overrides)
+    except ValueError as error:
+        parser.error(str(error))
+    
+    if options.resume:
+        from checkpoint import loadCheckpoint
+        simulation = loadCheckpoint(options.resume,overrides.get("ENGINE"))
+        simulation.config.update(overrides)
+    else:
+        if options.seed != None:
+            random.seed(options.seed)
+        simulation = createSimulation(loadConfig(overrides))
+    runner = SimulationRunner(simulation,options.rate)
+    server = ObserverServer(runner,options.port,keyframeInterval=options.keyframe_every,
+                            maxQueuedFrames=options.max_queued_frames)
+    server.start()
+    print "Serving a {0}x{1} simulation on {2}:{3}. Press Ctrl-C to stop.".format(
+        simulation.width,simulation.height,*server.address)
+    if not options.paused:
+        runner.resume()
+    try:
+        while True:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        runner.stop()
+    print "Stopped at step {0}.".format(simulation.stepCount)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,418 @@
+'''
+This module lets viewers watch (and control) a running simulation over a
+local TCP socket, so a headless run can be watched from another process.
+
+ObserverServer serves a simulation stepped by a runner.SimulationRunner. The
+protocol is lines of JSON in both directions. The server sends frames:
+    {"type": "keyframe", "step": S, "width": W, "height": H, "cells": [[x, y, cell], ...]}
+    {"type": "delta", "step": S, "cells": [[x, y, cell], ...]}
+A keyframe lists every non-empty cell, and a delta only the cells which
+changed in the step, where a cell is null (empty), 0 (food), [r, g, b] (a
+monster of that color) or [r, g, b, 1] (a followed monster). A viewer gets a
+keyframe when it attaches, and every viewer gets one every keyframeInterval
+steps.
+
+Viewers send commands, and get a reply to each (in between the frames):
+    {"command": "pause"}, {"command": "resume"}
+    {"command": "step", "count": N} (only while paused; count defaults to 1)
+    {"command": "query", "x": X, "y": Y} (replies with the monster there, or null)
+    {"command": "status"}
+A reply has "type": "reply" (or "error", with a "message") and the name of
+the command.
+
+The frames are made once per step, however many viewers there are, and
+written to each viewer by a thread of its own, so a slow viewer doesn't slow
+the stepping down: if too many of its frames are waiting to be sent, they are
+thrown away, and it gets a keyframe once it has caught up.
+
+ObserverClient is a minimal viewer, which keeps a copy of the board up to
+date and can send commands (which makes it handy for scripts and testing).
+
+Created on Oct 18, 2026
+'''
+
+import json
+import Queue
+import socket
+import threading
+import time
+from collections import deque
+from boardelements import FOOD
+from simulator import SimulationBase
+
+KEYFRAME_INTERVAL = 100
+MAX_QUEUED_FRAMES = 8
+ACCEPT_TIMEOUT = 0.5 # How often (in seconds) the server checks whether it has been closed.
+
+class ObserverError(Exception):
+    """An exception raised when the observer server replies to a command with an error."""
+    pass
+
+def encodeCell(element):
+    """Returns a board element (FOOD, a monster, or None) as it is sent in frames."""
+    if element == None:
+        return None
+    if element == FOOD:
+        return 0
+    if element.followed:
+        return list(element.color) + [1]
+    return list(element.color)
+
+def _encodeLine(message):
+    return json.dumps(message,separators=(",",":")) + "\n"
+
+
+class ObserverServer(object):
+    """
+    Serves a simulation, stepped by the given SimulationRunner, to viewers
+    connecting to the given port (0 picks a free one; the actual address is
+    in address once created) on the local machine. Call start to start
+    accepting viewers, and close to disconnect them all and stop.
+    
+    The simulation's changes are only tracked while a viewer is attached.
+    close must not be called inside runner.locked().
+    """
+    def __init__(self,runner,port=0,host="127.0.0.1",keyframeInterval=KEYFRAME_INTERVAL,maxQueuedFrames=MAX_QUEUED_FRAMES):
+        if not isinstance(runner.simulation,SimulationBase):
+            raise Exception, "The {0} engine can't be observed.".format(runner.simulation.config.get("ENGINE"))
+        self.runner = runner
+        self.keyframeInterval = keyframeInterval
+        self.maxQueuedFrames = maxQueuedFrames
+        self._viewers = [] # Only changed while the runner is locked.
+        self._changedCells = None # Tracked while there are viewers.
+        self._closed = False
+        self._socket = socket.socket(socket.AF_INET,socket.SOCK_STREAM)
+        self._socket.setsockopt(socket.SOL_SOCKET,socket.SO_REUSEADDR,1)
+        self._socket.bind((host,port))
+        self._socket.listen(5)
+        self._socket.settimeout(ACCEPT_TIMEOUT)
+        self.address = self._socket.getsockname()
+        self._thread = threading.Thread(target=self._accept)
+        self._thread.daemon = True
+    
+    @property
+    def numViewers(self):
+        return len(self._viewers)
+    
+    def start(self):
+        """Starts accepting viewers (in a background thread)."""
+        self.runner.addListener(self._stepped)
+        self._thread.start()
+    
+    def close(self):
+        """Stops accepting viewers, and disconnects the attached ones."""
+        self._closed = True
+        if self._thread.is_alive():
+            self._thread.join()
+            self.runner.removeListener(self._stepped)
+        self._socket.close()
+        for viewer in list(self._viewers):
+            viewer.close()
+    
+    def _accept(self):
+        while not self._closed:
+            try:
+                connection,address = self._socket.accept()
+            except socket.timeout:
+                continue
+            connection.settimeout(None)
+            viewer = _Viewer(self,connection,self.maxQueuedFrames)
+            self._attach(viewer)
+            viewer.start()
+    
+    def _attach(self,viewer):
+        with self.runner.locked() as simulation:
+            if not self._viewers:
+                self._changedCells = simulation.trackChanges()
+            self._viewers.append(viewer)
+            viewer.queueFrame(self._keyframe(simulation),True)
+    
+    def _detach(self,viewer):
+        with self.runner.locked() as simulation:
+            if viewer not in self._viewers:
+                return
+            self._viewers.remove(viewer)
+            if not self._viewers:
+                simulation.untrackChanges(self._changedCells)
+                self._changedCells = None
+    
+    def _stepped(self,simulation):
+        """Sends the frame for the step just taken to every viewer. (This is a runner listener.)"""
+        if not self._viewers:
+            return
+        everyoneNeedsKeyframe = simulation.stepCount % self.keyframeInterval == 0
+        keyframe = delta = None
+        for viewer in self._viewers:
+            if viewer.needsKeyframe and viewer.busy:
+                # It's still behind, so a keyframe would only be thrown away too.
+                viewer.numDropped += 1
+            elif everyoneNeedsKeyframe or viewer.needsKeyframe:
+                if keyframe == None:
+                    keyframe = self._keyframe(simulation)
+                viewer.queueFrame(keyframe,True)
+            else:
+                if delta == None:
+                    delta = self._delta(simulation)
+                viewer.queueFrame(delta,False)
+        self._changedCells.clear()
+    
+    def _keyframe(self,simulation):
+        cells = [[x,y,encodeCell(element)] for (x,y),element in simulation.iteritems()]
+        return _encodeLine({"type": "keyframe", "step": simulation.stepCount,
+                            "width": simulation.width, "height": simulation.height, "cells": cells})
+    
+    def _delta(self,simulation):
+        cells = [[coords[0],coords[1],encodeCell(simulation.get(coords))] for coords in self._changedCells]
+        return _encodeLine({"type": "delta", "step": simulation.stepCount, "cells": cells})
+    
+    def handleCommand(self,request):
+        """Carries out a command (a dict, as sent by a viewer) and returns the reply."""
+        command = request.get("command") if isinstance(request,dict) else None
+        handler = getattr(self,"_command_"+command,None) if isinstance(command,basestring) else None
+        if handler == None:
+            return {"type": "error", "command": command, "message": "Unknown command {0!r}.".format(command)}
+        reply = {"type": "reply", "command": command}
+        try:
+            reply.update(handler(request))
+        except KeyError as error:
+            return {"type": "error", "command": command, "message": "The {0!r} argument is missing.".format(error.args[0])}
+        except (ObserverError,ValueError,TypeError) as error:
+            return {"type": "error", "command": command, "message": str(error)}
+        return reply
+    
+    def _command_pause(self,request):
+        self.runner.pause()
+        return {}
+    
+    def _command_resume(self,request):
+        self.runner.resume()
+        return {}
+    
+    def _command_step(self,request):
+        count = int(request.get("count",1))
+        if self.runner.running:
+            raise ObserverError("Only a paused simulation can be stepped.")
+        for stepNum in range(count):
+            self.runner.stepOnce()
+        return {"step": self.runner.simulation.stepCount}
+    
+    def _command_query(self,request):
+        x,y = int(request["x"]),int(request["y"])
+        with self.runner.locked() as simulation:
+            if (simulation.width != None and not 0 <= x < simulation.width
+                    or simulation.height != None and not 0 <= y < simulation.height):
+                raise ObserverError("({0}, {1}) is outside the board.".format(x,y))
+            monster = simulation.getMonster((x,y))
+            if monster == None:
+                return {"x": x, "y": y, "monster": None}
+            return {"x": x, "y": y, "monster": {
+                "name": monster.name,
+                "dna": monster.dna.string,
+                "hp": monster.hp,
+                "color": list(monster.color),
+                "followed": monster.followed,
+                "lineageId": monster.lineageId,
+            }}
+    
+    def _command_status(self,request):
+        with self.runner.locked() as simulation:
+            return {"step": simulation.stepCount, "running": self.runner.running,
+                    "population": simulation.countMonsters(), "viewers": len(self._viewers)}
+
+
+class _Viewer(object):
+    """
+    An attached viewer: one thread reads its commands and carries them out,
+    and another writes the frames and replies queued for it.
+    """
+    def __init__(self,server,connection,maxQueuedFrames):
+        self.server = server
+        self.connection = connection
+        self.maxQueuedFrames = maxQueuedFrames
+        self.needsKeyframe = True # Deltas are no use to it until it gets a keyframe.
+        self.numDropped = 0 # The number of frames thrown away because it was too slow.
+        self._frames = deque()
+        self._replies = deque()
+        self._condition = threading.Condition()
+        self._sending = False
+        self._closed = False
+    
+    @property
+    def busy(self):
+        """Whether anything is being sent to the viewer, or waiting to be."""
+        return self._sending or bool(self._frames) or bool(self._replies)
+    
+    def start(self):
+        for target in (self._read,self._write):
+            thread = threading.Thread(target=target)
+            thread.daemon = True
+            thread.start()
+    
+    def queueFrame(self,line,keyframe):
+        """
+        Queues a frame (an encoded line) to be sent. A keyframe replaces any
+        frames still waiting, which it makes unnecessary. If too many frames
+        are waiting, they are dropped, and the viewer needs a keyframe before
+        it can be sent deltas again.
+        """
+        with self._condition:
+            if keyframe:
+                self.numDropped += len(self._frames)
+                self._frames.clear()
+                self.needsKeyframe = False
+            elif len(self._frames) >= self.maxQueuedFrames:
+                self.numDropped += len(self._frames) + 1
+                self._frames.clear()
+                self.needsKeyframe = True
+                return
+            self._frames.append(line)
+            self._condition.notify()
+    
+    def queueReply(self,reply):
+        """Queues a reply (a dict) to be sent, ahead of any waiting frames. Replies are never dropped."""
+        with self._condition:
+            self._replies.append(_encodeLine(reply))
+            self._condition.notify()
+    
+    def close(self):
+        """Disconnects the viewer."""
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify()
+        try:
+            self.connection.shutdown(socket.SHUT_RDWR)
+        except socket.error:
+            pass # Already disconnected.
+        self.connection.close()
+        self.server._detach(self)
+    
+    def _read(self):
+        try:
+            for line in self.connection.makefile("r"):
+                if not line.strip():
+                    continue
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    reply = {"type": "error", "command": None, "message": "Commands must be lines of JSON."}
+                else:
+                    reply = self.server.handleCommand(request)
+                self.queueReply(reply)
+        except socket.error:
+            pass
+        finally:
+            self.close()
+    
+    def _write(self):
+        while True:
+            with self._condition:
+                while not self._closed and not self._replies and not self._frames:
+                    self._condition.wait()
+                if self._closed:
+                    return
+                line = self._replies.popleft() if self._replies else self._frames.popleft()
+                self._sending = True
+            try:
+                self.connection.sendall(line)
+            except socket.error:
+                self.close()
+                return
+            finally:
+                self._sending = False
+
+
+class ObserverClient(object):
+    """
+    A minimal viewer for an ObserverServer. A background thread reads the
+    frames, keeping cells (a dict of (x,y) to the encoded contents of every
+    non-empty cell, as in the frames) and step up to date.
+    
+    Example usage:
+    client = ObserverClient(port)
+    client.command("pause")
+    client.command("step",count=10)
+    client.waitForStep(10)
+    print client.command("query",x=3,y=4)["monster"]
+    client.close()
+    """
+    def __init__(self,port,host="127.0.0.1"):
+        self.connection = socket.create_connection((host,port))
+        self.cells = {}
+        self.width = self.height = None
+        self.step = None # The step of the last frame received.
+        self.numFrames = 0
+        self.numKeyframes = 0
+        self._condition = threading.Condition() # Notified whenever a frame has been applied.
+        self._replies = Queue.Queue()
+        self._commandLock = threading.Lock()
+        self._thread = threading.Thread(target=self._read)
+        self._thread.daemon = True
+        self._thread.start()
+    
+    def command(self,name,timeout=10,**arguments):
+        """
+        Sends a command, with the given arguments, and returns the reply
+        (raising ObserverError if it was an error).
+        """
+        request = dict(arguments,command=name)
+        with self._commandLock:
+            self.connection.sendall(_encodeLine(request))
+            try:
+                reply = self._replies.get(timeout=timeout)
+            except Queue.Empty:
+                raise ObserverError("No reply to {0!r}.".format(name))
+        if reply["type"] == "error":
+            raise ObserverError(reply["message"])
+        return reply
+    
+    def waitForStep(self,step,timeout=10):
+        """Waits until a frame for the given step (or a later one) has been received, and returns whether it was."""
+        deadline = time.time() + timeout
+        with self._condition:
+            while self.step < step and self._thread.is_alive():
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            return self.step >= step
+    
+    def close(self):
+        try:
+            self.connection.shutdown(socket.SHUT_RDWR)
+        except socket.error:
+            pass # Already disconnected.
+        self.connection.close()
+        self._thread.join()
+    
+    def _read(self):
+        try:
+            for line in self.connection.makefile("r"):
+                message = json.loads(line)
+                if message["type"] == "keyframe":
+                    with self._condition:
+                        self.cells = dict(((x,y),cell) for x,y,cell in message["cells"])
+                        self.width,self.height = message["width"],message["height"]
+                        self._applied(message)
+                        self.numKeyframes += 1
+                elif message["type"] == "delta":
+                    with self._condition:
+                        for x,y,cell in message["cells"]:
+                            if cell == None:
+                                self.cells.pop((x,y),None)
+                            else:
+                                self.cells[x,y] = cell
+                        self._applied(message)
+                else:
+                    self._replies.put(message)
+        except socket.error:
+            pass
+        finally:
+            with self._condition:
+                self._condition.notify_all()
+    
+    def _applied(self,frame):
+        self.step = frame["step"]
+        self.numFrames += 1
+        self._condition.notify_all()
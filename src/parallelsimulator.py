@@ -0,0 +1,403 @@
+'''
+This module provides ParallelSimulation, an alternative simulation engine which
+splits one board into horizontal stripes and steps each stripe in its own
+worker process. It is selected by setting the configurable value ENGINE to
+"parallel", and requires NumPy (each worker runs an ArraySimulation).
+
+Each worker keeps a copy of the row just above and just below its stripe (the
+halo rows), so that its monsters can see, eat, attack, heal, move into and
+divide into the cells across the stripe's edges.
+
+Edge conflicts are ruled out by stepping in two phases. In the first phase,
+every worker gives turns only to the monsters in the top half of its stripe;
+in the second, only to those in the bottom half. A monster's turn can only
+touch cells one row away, so while the top halves are stepping, the only
+cells outside its stripe that a worker can change (its halo row above) are in
+the bottom half of the stripe above, which nothing else can touch during that
+phase; and likewise for the second phase. After each phase, the halo row a
+worker may have changed is sent back to its owner, which takes it as it is
+(including any monsters which were handed over by moving or dividing across
+the edge), along with a fresh copy of the worker's own edge row. Stripes must
+therefore be at least MIN_STRIPE_HEIGHT rows high.
+
+Monsters are identified by uids (which each worker allocates from its own
+range), so a monster gets exactly one turn per step even if it crosses a
+stripe edge.
+
+Created on Oct 18, 2026
+'''
+
+import multiprocessing
+import random
+import traceback
+import numpy
+import actions
+from arraysimulator import ArraySimulation,MONSTER_CELL
+from genomes import GenomeRegistry
+from utils.coords import Coords
+from utils.misc import Config
+
+MIN_STRIPE_HEIGHT = 4
+
+_ROW_ARRAYS = ("cellTypes","hp","colors","genomeIds","uids")
+_UID_RANGE = 1 << 40 # The number of uids set aside for each worker.
+
+def _exportRows(simulation,rows):
+    """
+    Returns copies of the given rows of an ArraySimulation, as a dict of
+    arrays plus a table of the DNA strings of the genome ids they refer to.
+    """
+    width = simulation.width
+    indices = (numpy.asarray(rows)[:,None]*width + numpy.arange(width)).ravel()
+    payload = dict((name,getattr(simulation,name)[indices]) for name in _ROW_ARRAYS)
+    genomeIds = numpy.unique(payload["genomeIds"][payload["cellTypes"] == MONSTER_CELL]).tolist()
+    payload["genomes"] = dict((genomeId,simulation.genomeRegistry.get(genomeId).string) for genomeId in genomeIds)
+    return payload
+
+def _importRows(simulation,firstRow,payload):
+    """
+    Overwrites the rows of an ArraySimulation starting at firstRow with rows
+    from _exportRows (possibly from another simulation, with other genome
+    ids), keeping its genome counts up to date.
+    """
+    registry = simulation.genomeRegistry
+    start = firstRow*simulation.width
+    end = start + len(payload["cellTypes"])
+    _countGenomes(simulation,start,end,registry.died)
+    genomeIds = payload["genomeIds"].copy()
+    isMonster = payload["cellTypes"] == MONSTER_CELL
+    for genomeId,dnaString in payload["genomes"].iteritems():
+        localId = registry.intern([actions.DNA_MAP[letter] for letter in dnaString]).id
+        if localId != genomeId:
+            genomeIds[isMonster & (payload["genomeIds"] == genomeId)] = localId
+    for name in _ROW_ARRAYS:
+        getattr(simulation,name)[start:end] = genomeIds if name == "genomeIds" else payload[name]
+    _countGenomes(simulation,start,end,registry.born)
+
+def _countGenomes(simulation,start,end,record):
+    """
+    Calls record(genome,number) with the number of monsters of each genome in
+    the given range of cell indices.
+    """
+    monsterIds = simulation.genomeIds[start:end][simulation.cellTypes[start:end] == MONSTER_CELL]
+    genomeCounts = numpy.bincount(monsterIds)
+    for genomeId in numpy.flatnonzero(genomeCounts).tolist():
+        record(simulation.genomeRegistry.get(genomeId),int(genomeCounts[genomeId]))
+
+
+class StripeSimulation(ArraySimulation):
+    """
+    The simulation run by one worker: an ArraySimulation of its stripe plus
+    its halo rows, which only wraps around in the directions it is told to
+    (since the halo rows take the place of vertical wrapping).
+    """
+    def __init__(self,config,height,wrapX,wrapY):
+        localConfig = Config()
+        localConfig.update(config)
+        localConfig["BOARD_HEIGHT"] = height
+        ArraySimulation.__init__(self,localConfig,populate=False)
+        self.wrapX = wrapX
+        self.wrapY = wrapY
+    
+    def getNeighbors(self,coords):
+        x,y = coords
+        width,height = self.width,self.height
+        neighbors = []
+        for dx,dy in self._neighborOffsets:
+            neighborX,neighborY = x+dx,y+dy
+            if self.wrapX:
+                neighborX %= width
+            elif not 0 <= neighborX < width:
+                continue
+            if self.wrapY:
+                neighborY %= height
+            elif not 0 <= neighborY < height:
+                continue
+            neighbor = Coords(neighborX,neighborY)
+            if neighbor != coords and neighbor not in neighbors:
+                neighbors.append(neighbor)
+        return neighbors
+
+
+class _Worker(object):
+    """
+    The state of one worker process: its StripeSimulation, and where its
+    stripe is within it. The owned rows are [top,top+numRows) of the local
+    board; if there is a halo row above, it is row 0, and if there is one
+    below, it is row top+numRows.
+    """
+    def __init__(self,config,numRows,haloAbove,haloBelow,wrap,payload,seed,uidStart):
+        random.seed(seed)
+        self.top = 1 if haloAbove else 0
+        self.numRows = numRows
+        self.haloAbove = haloAbove
+        self.haloBelow = haloBelow
+        soleStripe = not haloAbove and not haloBelow
+        self.simulation = StripeSimulation(config,numRows+haloAbove+haloBelow,wrap,wrap and soleStripe)
+        _importRows(self.simulation,0,payload)
+        self.simulation._nextUid = uidStart
+        self._bottomTurns = None
+    
+    def _turns(self,firstRow,endRow):
+        """Returns the indices and uids of the monsters in the given local rows."""
+        width = self.simulation.width
+        cellTypes = self.simulation.cellTypes[firstRow*width:endRow*width]
+        indices = numpy.flatnonzero(cellTypes == MONSTER_CELL) + firstRow*width
+        return indices.tolist(),self.simulation.uids[indices].tolist()
+    
+    def stepTop(self,fromAbove):
+        """
+        Runs the first phase of a step: applies the message from the stripe
+        above (sent at the end of its second phase), then gives turns to the
+        monsters in the top half of the stripe. Returns the number of turns
+        taken and the message for the stripe above.
+        """
+        simulation = self.simulation
+        top,bottom = self.top,self.top+self.numRows
+        if fromAbove != None:
+            myFirstRow,itsLastRow = fromAbove
+            _importRows(simulation,top,myFirstRow)
+            _importRows(simulation,0,itsLastRow)
+        middle = top + self.numRows//2
+        topIndices,topUids = self._turns(top,middle)
+        self._bottomTurns = self._turns(middle,bottom)
+        simulation.stepCount += 1
+        numProcessed = simulation._takeTurns(topIndices,topUids)
+        toAbove = None
+        if self.haloAbove:
+            toAbove = (_exportRows(simulation,[0]),_exportRows(simulation,[top]))
+        return numProcessed,toAbove
+    
+    def stepBottom(self,fromBelow):
+        """
+        Runs the second phase of a step: applies the message from the stripe
+        below (sent at the end of its first phase), then gives turns to the
+        monsters in the bottom half of the stripe. Returns the number of turns
+        taken and the message for the stripe below.
+        """
+        simulation = self.simulation
+        bottom = self.top + self.numRows
+        if fromBelow != None:
+            myLastRow,itsFirstRow = fromBelow
+            _importRows(simulation,bottom-1,myLastRow)
+            _importRows(simulation,bottom,itsFirstRow)
+        numProcessed = simulation._takeTurns(*self._bottomTurns)
+        toBelow = None
+        if self.haloBelow:
+            toBelow = (_exportRows(simulation,[bottom]),_exportRows(simulation,[bottom-1]))
+        return numProcessed,toBelow
+    
+    def countMonsters(self):
+        """Returns the number of monsters in the stripe (not counting the halo rows)."""
+        width = self.simulation.width
+        return int(numpy.count_nonzero(
+            self.simulation.cellTypes[self.top*width:(self.top+self.numRows)*width] == MONSTER_CELL))
+    
+    def exportRows(self):
+        """Returns the stripe's own rows, as from _exportRows."""
+        return _exportRows(self.simulation,range(self.top,self.top+self.numRows))
+
+def _runWorker(connection,workerArgs):
+    """
+    The main function of a worker process. It answers (methodName,args)
+    requests from the connection with ("ok",result) or ("error",traceback),
+    until it is sent None.
+    """
+    try:
+        worker = _Worker(*workerArgs)
+        connection.send(("ok",None))
+        while True:
+            request = connection.recv()
+            if request == None:
+                break
+            methodName,args = request
+            connection.send(("ok",getattr(worker,methodName)(*args)))
+    except Exception:
+        connection.send(("error",traceback.format_exc()))
+
+
+class ParallelSimulation(object):
+    """
+    This class runs one simulation over several worker processes, one per
+    horizontal stripe of the board. (See the module docstring for how.)
+    
+    Until its first step, the board is held in an ordinary ArraySimulation,
+    which is how it is populated (or filled by importState); the workers are
+    started when it first steps. The monsters take their turns in a fixed
+    order for a given number of workers, so seeded runs give the same results
+    as long as NUM_WORKERS is the same.
+    
+    Only the methods needed for running headless (such as with batch.py or
+    checkpoints) are provided: in particular, the board can't be drawn.
+    Since it starts processes of its own, it can't be used inside
+    sweep.py's worker processes either.
+    """
+    def __init__(self,config,populate=True):
+        """
+        Creates a simulation with the given config. Unless populate is false,
+        the board is randomly filled with monsters and food.
+        """
+        self._board = ArraySimulation(config,populate)
+        self.config = config
+        self.width = self._board.width
+        self.height = self._board.height
+        self.stepCount = 0 # The number of steps run so far.
+        self._connections = None
+        self._processes = None
+        self._fromAbove = None
+        self._genomeRegistry = GenomeRegistry()
+    
+    @property
+    def numWorkers(self):
+        """The number of worker processes used (given by NUM_WORKERS, or one per core)."""
+        numWorkers = self.config.get("NUM_WORKERS") or multiprocessing.cpu_count()
+        return max(1,min(numWorkers,self.height // MIN_STRIPE_HEIGHT))
+    
+    def _start(self):
+        """Splits the board into stripes and starts a worker process for each."""
+        numWorkers = self.numWorkers
+        board = self._board
+        wrap = board.wrap
+        uidStart = board._nextUid # Each worker allocates uids from its own range, after this.
+        self._connections = []
+        self._processes = []
+        for workerNum in range(numWorkers):
+            firstRow = self.height*workerNum // numWorkers
+            endRow = self.height*(workerNum+1) // numWorkers
+            haloAbove = numWorkers > 1 and (workerNum > 0 or wrap)
+            haloBelow = numWorkers > 1 and (workerNum < numWorkers-1 or wrap)
+            rows = range(firstRow,endRow)
+            if haloAbove:
+                rows.insert(0,(firstRow-1) % self.height)
+            if haloBelow:
+                rows.append(endRow % self.height)
+            workerArgs = (self.config,endRow-firstRow,haloAbove,haloBelow,wrap,_exportRows(board,rows),
+                          random.getrandbits(32),uidStart + workerNum*_UID_RANGE)
+            connection,workerConnection = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_runWorker,args=(workerConnection,workerArgs))
+            process.daemon = True
+            process.start()
+            self._connections.append(connection)
+            self._processes.append(process)
+        self._board = None
+        self._fromAbove = [None]*numWorkers
+        self._callAll(None)
+    
+    def _callAll(self,methodName,argsList=None):
+        """
+        Calls the given method on every worker (with the corresponding args
+        from argsList) and returns a list of the results. If methodName is
+        None, it only waits for every worker to be ready.
+        """
+        if methodName != None:
+            for workerNum,connection in enumerate(self._connections):
+                connection.send((methodName,argsList[workerNum] if argsList else ()))
+        results = []
+        for connection in self._connections:
+            status,result = connection.recv()
+            if status == "error":
+                raise Exception, "A worker process failed:\n" + result
+            results.append(result)
+        return results
+    
+    def close(self):
+        """Stops the worker processes (after which the simulation can't be used)."""
+        if self._connections:
+            for connection in self._connections:
+                connection.send(None)
+            for process in self._processes:
+                process.join()
+            self._connections = None
+    
+    def oneStep(self):
+        """
+        Executes one step of the simulation, in two phases (see the module
+        docstring).
+        
+        Returns the number of monsters that took a turn.
+        """
+        if self._board != None:
+            self._start()
+        self.stepCount += 1
+        numWorkers = len(self._connections)
+        results = self._callAll("stepTop",[(fromAbove,) for fromAbove in self._fromAbove])
+        fromBelow = [None]*numWorkers
+        for workerNum,(numProcessed,toAbove) in enumerate(results):
+            if toAbove != None:
+                fromBelow[(workerNum-1) % numWorkers] = toAbove
+        numProcessed = sum(result[0] for result in results)
+        results = self._callAll("stepBottom",[(message,) for message in fromBelow])
+        self._fromAbove = [None]*numWorkers
+        for workerNum,(bottomProcessed,toBelow) in enumerate(results):
+            numProcessed += bottomProcessed
+            if toBelow != None:
+                self._fromAbove[(workerNum+1) % numWorkers] = toBelow
+        return numProcessed
+    
+    def countMonsters(self):
+        """Returns the number of monsters on the board."""
+        if self._board != None:
+            return self._board.countMonsters()
+        return sum(self._callAll("countMonsters"))
+    
+    @property
+    def genomeRegistry(self):
+        """
+        The genome registry, with the number of living monsters of each
+        genome. Once the workers have started, this is gathered from them
+        every time it is used, so it is not kept up to date by itself.
+        """
+        if self._board != None:
+            return self._board.genomeRegistry
+        self._gatherRows()
+        return self._genomeRegistry
+    
+    def _gatherRows(self):
+        """
+        Returns the whole board, as an ArraySimulation-style state dict of
+        arrays whose genome ids refer to self._genomeRegistry, whose counts
+        are brought up to date.
+        """
+        registry = self._genomeRegistry
+        registry.clearCounts()
+        state = dict((name,[]) for name in _ROW_ARRAYS)
+        for payload in self._callAll("exportRows"):
+            genomeIds = payload["genomeIds"].copy()
+            isMonster = payload["cellTypes"] == MONSTER_CELL
+            for genomeId,dnaString in payload["genomes"].iteritems():
+                genome = registry.intern([actions.DNA_MAP[letter] for letter in dnaString])
+                genomeMask = isMonster & (payload["genomeIds"] == genomeId)
+                genomeIds[genomeMask] = genome.id
+                registry.born(genome,int(numpy.count_nonzero(genomeMask)))
+            payload["genomeIds"] = genomeIds
+            for name in _ROW_ARRAYS:
+                state[name].append(payload[name])
+        return dict((name,numpy.concatenate(arrays)) for name,arrays in state.iteritems())
+    
+    def exportState(self):
+        """
+        Returns the state of the board as a dict, in the same form as
+        ArraySimulation.exportState. (Monster names aren't kept by this
+        engine.) See the checkpoint module.
+        """
+        if self._board != None:
+            state = self._board.exportState()
+            state["stepCount"] = self.stepCount
+            return state
+        state = self._gatherRows()
+        state.update({
+            "nextUid": int(state["uids"].max()) + 1,
+            "monsterNames": {},
+            "followed": [],
+            "stepCount": self.stepCount,
+            "namesList": None,
+        })
+        return state
+    
+    def importState(self,state):
+        """
+        Fills the (empty) board from a dict returned by exportState, before
+        the workers have started.
+        """
+        self._board.importState(state)
+        self.stepCount = state["stepCount"]
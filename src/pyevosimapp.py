@@ -5,12 +5,16 @@ Created on Sep 28, 2011
 '''
 
 from utils.coords import Coords
-from boardelements import Monster,FOOD
-from simulator import Simulation
+from boardelements import FOOD
+from simulator import createSimulation
+from trajectory import ReplaySimulation
+from runner import SimulationRunner
+from tilecache import TileCache
 from constants import APPNAME,VERSION
 from utils.pygameutils import PygameApp
 from utils.misc import Config
 import pygame
+import time
 
 CAPTION = APPNAME+" v"+VERSION
 
@@ -20,24 +24,61 @@ class SimulationApp(PygameApp):
     
     It can be easily used as follows:
     SimulationApp.run()
+    
+    If a replayFilename is given, it plays back that trajectory file (see the
+    trajectory module) instead of running a new simulation. The replay is
+    always stepped in the background, at REPLAY_STEPS_PER_SECOND to begin
+    with, and can be sped up (F), slowed down (S) or moved to any recorded
+    step: a step back or forward (left and right), a keyframe interval back
+    or forward (down and up), or the beginning or end (home and end).
     """
-    def __init__(self):
-        self.gfxConfig = Config("gfxconfig.py")
+    def __init__(self,replayFilename=None):
+        self.gfxConfig = Config.load("gfxconfig.py")
+        self.replayFilename = replayFilename
         PygameApp.__init__(self,displaySize=(1,1),maxFramerate=self.gfxConfig.MAX_FRAMERATE,caption=CAPTION,defaultColorKey=self.gfxConfig.COLOR_KEY)
         self.newSimulation()
         self.monsterImage = self.loadImage("monster.png")
         self.followedMonsterImage = self.loadImage("followedmonster.png")
         self.foodImage = self.loadImage("meat.png")
+        self.tileCache = TileCache(self.gfxConfig.TILE_WIDTH,self.monsterImage,self.followedMonsterImage,
+                                   self.gfxConfig.get("TILE_CACHE_SIZE",4096))
     
-    def newSimulation(self):
+    def newSimulation(self,simulation=None):
         """
         Creates a new simulation (loading or reloading the config files). This
         is called when the app is first started, but also when F2 is pressed.
+        If a simulation is given, it is shown instead (with its own config).
+        When replaying, the trajectory file is loaded (again) instead.
         """
-        self.simConfig = Config("default_config.py","config.py")
-        self.simulation = Simulation(self.simConfig)
+        if getattr(self,"runner",None):
+            self.runner.stop()
+        if simulation == None and self.replayFilename != None:
+            simulation = ReplaySimulation(self.replayFilename)
+        if simulation == None:
+            self.simConfig = Config.load("default_config.py","config.py")
+            self.simulation = createSimulation(self.simConfig)
+        else:
+            self.simConfig = simulation.config
+            self.simulation = simulation
+        self._changedCells = self.simulation.trackChanges()
+        self._replaying = isinstance(self.simulation,ReplaySimulation)
+        if self._replaying:
+            self.runner = SimulationRunner(self.simulation,self.gfxConfig.get("REPLAY_STEPS_PER_SECOND",10))
+            self._backgroundStepping = True
+        else:
+            self.runner = SimulationRunner(self.simulation,self.gfxConfig.get("STEPS_PER_SECOND"))
+            self._backgroundStepping = self.gfxConfig.get("BACKGROUND_STEPPING",False)
         tileWidth = self.gfxConfig.TILE_WIDTH
-        self.displaySize = (self.simConfig.BOARD_WIDTH*tileWidth,self.simConfig.BOARD_HEIGHT*tileWidth)
+        boardSize = (self.simulation.width*tileWidth,self.simulation.height*tileWidth)
+        self.displaySize = boardSize
+        self._boardSurface = pygame.Surface(boardSize).convert()
+        self._fullRedrawNeeded = True
+        self._renderMode = self.gfxConfig.get("RENDER_MODE","tiles")
+        if self._renderMode == "array":
+            # One pixel per cell, scaled up to the board surface when drawn. (The
+            # surfaces have the same 32-bit format, which surfarray and scale need.)
+            self._gridSurface = pygame.Surface((self.simulation.width,self.simulation.height),0,32)
+            self._boardSurface = pygame.Surface(boardSize,0,self._gridSurface)
         self.autoplaying = False
     
     @property
@@ -49,58 +90,181 @@ class SimulationApp(PygameApp):
         self._autoplaying = newValue
         if newValue == True:
             self.caption = CAPTION+" (running)"
+            if self._backgroundStepping:
+                self.runner.resume()
+                self._rateStartTime = time.time()
+                self._rateStartStep = self.runner.stepCount
         else:
+            self.runner.pause()
             self.caption = CAPTION
     
     def step(self):
         """
-        Called every frame. Updates the simulation if it is autoplaying.
+        Called every frame. Updates the simulation if it is autoplaying (unless
+        it is being stepped in the background, in which case this only shows
+        the actual rate of stepping in the caption, about once a second).
         """
-        if self.autoplaying:
-            self.simulation.oneStep()
+        if not self.autoplaying:
+            return
+        if not self._backgroundStepping:
+            self.runner.stepOnce()
+            return
+        now = time.time()
+        if now - self._rateStartTime >= 1.0:
+            stepsPerSecond = (self.runner.stepCount - self._rateStartStep)/(now - self._rateStartTime)
+            self.caption = CAPTION+" (running, {0:.0f} steps/sec)".format(stepsPerSecond)
+            self._rateStartTime = now
+            self._rateStartStep = self.runner.stepCount
     
     def draw(self,screen):
-        # Draw stuff
+        """
+        Draws the board. The board is kept drawn on a separate surface: the
+        first time, the whole board is drawn, but after that only the cells the
+        simulation reports as changed are redrawn, and only their rects are
+        updated on the display. Each element is drawn with a single blit (of a
+        tile from tileCache, for monsters), and the blits are submitted in one
+        batch.
+        
+        If RENDER_MODE (in gfxconfig.py) is "array", the whole board is drawn
+        every frame instead, by _drawGrid.
+        
+        The simulation is locked while it is drawn, so that a background step
+        can't change it halfway through.
+        """
+        with self.runner.locked():
+            return self._drawBoard(screen)
+    
+    def _drawBoard(self,screen):
+        if self._renderMode == "array":
+            return self._drawGrid(screen)
+        tileWidth = self.gfxConfig.TILE_WIDTH
+        boardSurface = self._boardSurface
+        blits = []
+        if self._fullRedrawNeeded:
+            boardSurface.fill(self.gfxConfig.BACKGROUND_COLOR)
+            for coords,boardElement in self.simulation.iteritems():
+                blits.append((self._elementImage(boardElement),(coords[0]*tileWidth,coords[1]*tileWidth)))
+            boardSurface.blits(blits,0)
+            self._changedCells.clear()
+            self._fullRedrawNeeded = False
+            screen.blit(boardSurface,(0,0))
+            return None # Update the whole display.
+        dirtyRects = []
+        for coords in self._changedCells:
+            tileRect = pygame.Rect(coords[0]*tileWidth,coords[1]*tileWidth,tileWidth,tileWidth)
+            boardSurface.fill(self.gfxConfig.BACKGROUND_COLOR,tileRect)
+            boardElement = self.simulation.get(coords)
+            if boardElement != None:
+                blits.append((self._elementImage(boardElement),tileRect))
+            dirtyRects.append(tileRect)
+        boardSurface.blits(blits,0)
+        screen.blits([(boardSurface,tileRect,tileRect) for tileRect in dirtyRects],0)
+        self._changedCells.clear()
+        return dirtyRects
+    
+    def _drawGrid(self,screen):
+        """
+        Draws the whole board from the simulation's colorGrid: the array is
+        copied into a surface with one pixel per cell, which is scaled up to
+        the board surface in one go, and then only the followed monsters get
+        a sprite (a marker) drawn over them. This takes about the same time
+        however many monsters there are, but doesn't draw their sprites.
+        """
+        from pygame import surfarray # This requires NumPy, so it's only imported in this mode.
         tileWidth = self.gfxConfig.TILE_WIDTH
-        screen.fill(self.gfxConfig.BACKGROUND_COLOR)
-        for coords,boardElement in self.simulation.iteritems():
-            drawCoords = coords * tileWidth
-            if boardElement == FOOD:
-                screen.blit(self.foodImage,drawCoords)
-            elif isinstance(boardElement,Monster):
-                fillRect = pygame.Rect(drawCoords,(tileWidth,tileWidth))
-                screen.fill(boardElement.color,fillRect)
-                if boardElement.followed:
-                    screen.blit(self.followedMonsterImage,drawCoords)
-                else:
-                    screen.blit(self.monsterImage,drawCoords)
+        boardSurface = self._boardSurface
+        grid = self.simulation.colorGrid(self.gfxConfig.BACKGROUND_COLOR,self.gfxConfig.get("FOOD_COLOR",(160,60,40)))
+        surfarray.blit_array(self._gridSurface,grid)
+        pygame.transform.scale(self._gridSurface,boardSurface.get_size(),boardSurface)
+        for x,y in self.simulation.followedCoords():
+            boardSurface.blit(self.followedMonsterImage,(x*tileWidth,y*tileWidth))
+        self._changedCells.clear()
+        screen.blit(boardSurface,(0,0))
+        return None # Update the whole display.
+    
+    def _elementImage(self,boardElement):
+        """Returns the image to draw for a board element (FOOD or a monster)."""
+        if boardElement == FOOD:
+            return self.foodImage
+        return self.tileCache.get(boardElement.color,boardElement.followed)
     
     def on_quit(self,event):
         self.quit()
     def on_keyDown_escape(self,event):
         self.quit()
     
+    def quit(self):
+        self.runner.stop()
+        PygameApp.quit(self)
+    
     def on_keyDown_space(self,event):
         if not self.autoplaying:
-            self.simulation.oneStep()
+            self.runner.stepOnce()
     
     def on_keyDown_f2(self,event):
         self.newSimulation()
     
+    def seek(self,step):
+        """Moves a replay to the given step (or the nearest one recorded)."""
+        if not self._replaying:
+            return
+        with self.runner.locked():
+            self.simulation.seek(step)
+            print "Step {0} of {1}.".format(self.simulation.stepCount,self.simulation.lastStep)
+    
+    def on_keyDown_left(self,event):
+        if self._replaying:
+            self.seek(self.simulation.stepCount - 1)
+    def on_keyDown_right(self,event):
+        if self._replaying:
+            self.seek(self.simulation.stepCount + 1)
+    def on_keyDown_down(self,event):
+        if self._replaying:
+            self.seek(self.simulation.stepCount - self.simulation.reader.keyframeInterval)
+    def on_keyDown_up(self,event):
+        if self._replaying:
+            self.seek(self.simulation.stepCount + self.simulation.reader.keyframeInterval)
+    def on_keyDown_home(self,event):
+        if self._replaying:
+            self.seek(self.simulation.firstStep)
+    def on_keyDown_end(self,event):
+        if self._replaying:
+            self.seek(self.simulation.lastStep)
+    
+    def on_keyDown_f(self,event):
+        """Doubles the speed of a replay."""
+        if self._replaying and self.runner.stepsPerSecond:
+            self.runner.stepsPerSecond *= 2
+            print "Replaying at {0:g} steps/sec.".format(self.runner.stepsPerSecond)
+    def on_keyDown_s(self,event):
+        """Halves the speed of a replay."""
+        if self._replaying and self.runner.stepsPerSecond:
+            self.runner.stepsPerSecond /= 2.0
+            print "Replaying at {0:g} steps/sec.".format(self.runner.stepsPerSecond)
+    
     def on_keyDown_return(self,event):
         self.autoplaying = not self.autoplaying
     
     def on_mouseButtonDown_left(self,event):
         """
-        Outputs information about the monster under the cursor.
+        Outputs information about the monster under the cursor (and, if it is
+        followed and lineage is tracked, its ancestry).
         Only works when not autoplaying.
         """
         if not self.autoplaying:
             screenCoords = Coords.make(event.pos)
             boardCoords = screenCoords // self.gfxConfig.TILE_WIDTH
-            boardElement = self.simulation.get(boardCoords)
-            if isinstance(boardElement,Monster):
-                print "<{0}, {1}>".format(boardElement.infoString,boardCoords)
+            with self.runner.locked():
+                monster = self.simulation.getMonster(boardCoords)
+                ancestry = None
+                if monster and monster.followed and self.simulation.lineage != None:
+                    ancestry = self.simulation.lineage.ancestry(monster.lineageId)
+            if monster:
+                print "<{0}, {1}>".format(monster.infoString,boardCoords)
+            if ancestry:
+                for lineageId,parentId,birthStep,genomeId in ancestry:
+                    print "  {0}: born at step {1}, dna={2}".format(
+                        lineageId,birthStep,self.simulation.genomeRegistry.get(genomeId).string)
     
     def on_mouseButtonDown_right(self,event):
         """
@@ -111,6 +275,8 @@ class SimulationApp(PygameApp):
         if not self.autoplaying:
             screenCoords = Coords.make(event.pos)
             boardCoords = screenCoords // self.gfxConfig.TILE_WIDTH
-            boardElement = self.simulation.get(boardCoords)
-            if isinstance(boardElement,Monster):
-                self.simulation.toggleMonsterFollowed(boardElement)
+            with self.runner.locked():
+                monster = self.simulation.getMonster(boardCoords)
+                if monster:
+                    self.simulation.toggleMonsterFollowed(monster)
+                    self.simulation.markChanged(boardCoords)
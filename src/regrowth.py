@@ -0,0 +1,102 @@
+'''
+This module supports food regrowth: FreeCellIndex, the set of empty cells
+which new food is placed in, and the spatial patterns which can make food grow
+more in some places than in others.
+
+Created on Oct 18, 2026
+'''
+
+import math
+from random import randrange,random as probcheck
+
+MAX_PLACEMENT_TRIES = 20
+# The number of empty cells tried (and rejected by the pattern) before giving
+# up on placing one piece of food.
+
+class FreeCellIndex(object):
+    """
+    A set of cells (as indices, y*width+x) which supports adding, removing
+    and picking a random cell, all in constant time: the cells are kept in a
+    list, with a dict of their positions in it, and a removed cell is
+    replaced by the last one.
+    """
+    def __init__(self,cells=()):
+        self._cells = list(cells)
+        self._positions = dict((cell,position) for position,cell in enumerate(self._cells))
+    
+    def __len__(self):
+        return len(self._cells)
+    
+    def __contains__(self,cell):
+        return cell in self._positions
+    
+    def add(self,cell):
+        """Adds a cell (if it isn't already in the set)."""
+        if cell not in self._positions:
+            self._positions[cell] = len(self._cells)
+            self._cells.append(cell)
+    
+    def remove(self,cell):
+        """Removes a cell (if it is in the set)."""
+        position = self._positions.pop(cell,None)
+        if position == None:
+            return
+        last = self._cells.pop()
+        if position < len(self._cells):
+            self._cells[position] = last
+            self._positions[last] = position
+    
+    def pick(self):
+        """Returns a random cell from the set (which must not be empty), without removing it."""
+        return self._cells[randrange(len(self._cells))]
+
+
+# The spatial patterns of regrowth. Each maps the x and y of a cell (and the
+# width and height of the board) to the probability, from 0 to 1, that food
+# placed there is kept: a cell is picked at random from the empty ones, and
+# kept or rejected according to the pattern.
+def _uniform(x,y,width,height):
+    return 1.0
+
+def _gradient(x,y,width,height):
+    """Food grows most on the left edge, and not at all on the right."""
+    return 1.0 - float(x)/width
+
+def _patches(x,y,width,height):
+    """Food grows in a checkerboard of fertile 16x16 patches."""
+    return 1.0 if (x//16 + y//16) % 2 == 0 else 0.1
+
+def _waves(x,y,width,height):
+    """Food grows in bands, like rivers, running diagonally across the board."""
+    return 0.5 + 0.5*math.sin((x + y)*2*math.pi/32)
+
+PATTERNS = {
+    "uniform": _uniform,
+    "gradient": _gradient,
+    "patches": _patches,
+    "waves": _waves,
+}
+
+def numToSpawn(rate):
+    """
+    Returns how many pieces of food to spawn this step, given the average
+    number per step (which may have a fractional part, used as a probability).
+    """
+    number = int(rate)
+    if probcheck() < rate - number:
+        number += 1
+    return number
+
+def pickCell(freeCells,pattern,width,height):
+    """
+    Returns an empty cell (an index) picked from freeCells according to the
+    given pattern function, or None if there is none (or too many were
+    rejected).
+    """
+    for tryNum in range(MAX_PLACEMENT_TRIES):
+        if not freeCells:
+            return None
+        cell = freeCells.pick()
+        if pattern is _uniform or probcheck() < pattern(cell % width,cell // width,width,height):
+            return cell
+    return None
@@ -0,0 +1,123 @@
+'''
+This module provides SimulationRunner, which steps a simulation in a
+background thread, so that the simulation can run faster (or slower) than the
+GUI's framerate without freezing it.
+
+Created on Oct 18, 2026
+'''
+
+import threading
+import time
+from contextlib import contextmanager
+
+class SimulationRunner(object):
+    """
+    Steps a simulation in a background thread while it is running, either as
+    fast as possible or at a target number of steps per second.
+    
+    Anything else that looks at or changes the simulation (such as drawing it)
+    must do so inside a "with runner.locked():" block. That waits for the
+    current step to finish and holds off the next one, so the board is always
+    seen in a consistent state between steps.
+    """
+    def __init__(self,simulation,stepsPerSecond=None):
+        """
+        Creates a paused runner for the given simulation. If stepsPerSecond is
+        None, it runs as fast as possible.
+        """
+        self.simulation = simulation
+        self.stepsPerSecond = stepsPerSecond
+        self.stepCount = 0 # The number of steps run by this runner.
+        self._lock = threading.Lock()
+        self._runningEvent = threading.Event()
+        self._numWaiting = 0 # The number of threads in locked(), guarded by _waitingCondition.
+        self._waitingCondition = threading.Condition(threading.Lock())
+        self._stopped = False
+        self._listeners = []
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+    
+    @property
+    def running(self):
+        return self._runningEvent.is_set()
+    
+    def resume(self):
+        """Starts stepping the simulation in the background."""
+        self._runningEvent.set()
+    
+    def pause(self):
+        """Stops stepping the simulation (after the current step)."""
+        self._runningEvent.clear()
+    
+    def addListener(self,listener):
+        """
+        Adds a function listener(simulation), which will be called after every
+        step, before the simulation is unlocked. It should be quick, since the
+        next step waits for it.
+        """
+        with self._lock:
+            self._listeners.append(listener)
+    
+    def removeListener(self,listener):
+        """Removes a listener added by addListener."""
+        with self._lock:
+            self._listeners.remove(listener)
+    
+    def stepOnce(self):
+        """Runs one step right away (which is mainly useful while paused)."""
+        with self.locked():
+            self._step()
+    
+    def _step(self):
+        """Runs one step and tells the listeners. The lock must be held."""
+        self.simulation.oneStep()
+        self.stepCount += 1
+        for listener in self._listeners:
+            listener(self.simulation)
+    
+    def stop(self):
+        """Stops the background thread for good, and waits for it to finish."""
+        self._stopped = True
+        self._runningEvent.set()
+        self._thread.join()
+    
+    @contextmanager
+    def locked(self):
+        """
+        A context manager which waits for the current step to finish, and
+        keeps the simulation from stepping while the body of the with
+        statement runs.
+        """
+        with self._waitingCondition:
+            self._numWaiting += 1
+        try:
+            with self._lock:
+                yield self.simulation
+        finally:
+            with self._waitingCondition:
+                self._numWaiting -= 1
+                if not self._numWaiting:
+                    self._waitingCondition.notify_all()
+    
+    def _run(self):
+        nextStepTime = time.time()
+        while True:
+            self._runningEvent.wait()
+            if self._stopped:
+                return
+            with self._waitingCondition:
+                while self._numWaiting:
+                    # Let whoever is waiting for the lock have it first. (The
+                    # lock isn't fair, so otherwise this thread could starve
+                    # them by taking it straight back after every step.)
+                    self._waitingCondition.wait()
+            with self._lock:
+                self._step()
+            if self.stepsPerSecond:
+                nextStepTime += 1.0/self.stepsPerSecond
+                delay = nextStepTime - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    nextStepTime = time.time() # Too slow; don't try to catch up.
@@ -0,0 +1,169 @@
+'''
+This module provides ActivityScheduler, which lets the engines skip the turns
+of monsters which can't do anything.
+
+Created on Oct 18, 2026
+'''
+
+from bisect import bisect_right
+
+HP_THRESHOLD_OPTIONS = ("REST_MAX_HP","DIVIDE_MIN_HP")
+# The configurable values at which the preconditions of the basic actions
+# change, as a monster's own HP goes up or down. Apart from the HP, the
+# preconditions only depend on what is in the neighboring cells. (An action
+# whose precondition depends on anything else must add its threshold here.)
+
+class _Sleeper(object):
+    """
+    A sleeping monster. Its HP was last brought up to date in step
+    settledStep; it has skipped its turns since, up to and including step
+    lastStep. In step dueStep it must take its turn again, because losing
+    its HP for that turn kills it or takes it past a threshold.
+    """
+    
+    __slots__ = ("monster","hpLoss","settledStep","lastStep","dueStep")
+    
+    def __init__(self,monster,hpLoss,step,dueStep):
+        self.monster = monster
+        self.hpLoss = hpLoss
+        self.settledStep = step
+        self.lastStep = step
+        self.dueStep = dueStep
+
+
+class ActivityScheduler(object):
+    """
+    Keeps track of the inert monsters: the ones whose first applicable action
+    was inert (like idle), or which had no applicable action at all. Such a
+    monster does nothing in its turn but lose HP_LOSS_PER_TURN, and it will go
+    on doing nothing until one of its neighboring cells changes, something
+    else changes its HP (an attack or a heal), or its HP crosses one of the
+    thresholds in HP_THRESHOLD_OPTIONS or runs out.
+    
+    Until then, the monster sleeps: the engine skips its turns altogether,
+    and its HP is only brought up to date (all the skipped turns' loss at
+    once) when it is needed. The step in which the loss would kill the
+    monster or take it past a threshold is worked out when it goes to sleep,
+    and in that step it takes its turn as usual, at its usual place in the
+    order, so a death turns the monster into food exactly when it would have
+    without the scheduler.
+    
+    A sleeping monster's hp is out of date. It is brought up to date when the
+    monster is woken, which happens at the start of its due turn, when one of
+    its neighboring cells changes, when its HP is changed or when it is
+    looked up with getMonster. Code which reads the HP of the whole board
+    between steps (statistics, recordings, exports) must call settle first;
+    the engines do so for their own statistics and recordings.
+    
+    The changed cells are collected with the simulation's trackChanges, and
+    the sleepers next to them are woken all at once, just before the next
+    sleeper's turn. Since preconditions don't use random numbers, and inert
+    actions don't either, a seeded run gives the same results with the
+    scheduler as without it.
+    
+    Monsters whose DNA contains an action without a precondition are never
+    put to sleep, since such an action can't be checked without trying it.
+    Nor are any monsters if HP_LOSS_PER_TURN isn't positive.
+    """
+    def __init__(self,simulation):
+        self._simulation = simulation
+        self._getNeighbors = simulation.getNeighbors
+        self.asleep = {} # Maps coords to the _Sleeper there (not to be changed from outside).
+        self._changedCells = simulation.trackChanges()
+        thresholds = [simulation.config.get(name) for name in HP_THRESHOLD_OPTIONS]
+        self._thresholds = sorted(set(threshold for threshold in thresholds if threshold != None))
+        self._checkable = {} # Maps genome ids to whether all their actions have preconditions.
+        self.numSkipped = 0 # The number of turns skipped so far.
+    
+    def __len__(self):
+        """Returns the number of monsters asleep."""
+        return len(self.asleep)
+    
+    def skipTurn(self,monster,coords):
+        """
+        Returns true if the given monster (whose turn it is, before it has
+        lost any HP) is asleep and not due, in which case its turn is over.
+        Otherwise, the monster is woken up (if need be) and must take its turn
+        as usual.
+        """
+        asleep = self.asleep
+        if coords not in asleep:
+            return False
+        if self._changedCells:
+            self._wakeNeighborsOfChanged()
+        sleeper = asleep.get(coords)
+        if sleeper == None:
+            return False
+        step = self._simulation.stepCount
+        if step < sleeper.dueStep:
+            sleeper.lastStep = step
+            self.numSkipped += 1
+            return True
+        self.wake(coords)
+        return False
+    
+    def sleep(self,monster,coords):
+        """
+        Puts the given monster to sleep, after its first applicable action
+        turned out to be inert (or it had none), and works out its due step.
+        """
+        hpLoss = self._simulation.config.HP_LOSS_PER_TURN
+        if hpLoss <= 0:
+            return
+        genome = monster.genome
+        checkable = self._checkable.get(genome.id)
+        if checkable == None:
+            checkable = all(action.precondition != None for action in genome)
+            self._checkable[genome.id] = checkable
+        if not checkable:
+            return
+        thresholds = self._thresholds
+        index = bisect_right(thresholds,monster.hp)
+        lowest = max(thresholds[index-1],1) if index > 0 else 1
+        # The first turn after which the HP would be below lowest.
+        turnsLeft = (monster.hp - lowest) // hpLoss + 1
+        step = self._simulation.stepCount
+        self.asleep[coords] = _Sleeper(monster,hpLoss,step,step + turnsLeft)
+    
+    def wake(self,coords):
+        """
+        Wakes the monster at the given coords, if it is asleep, bringing its HP
+        up to date. The engines call this before changing a monster's HP.
+        """
+        sleeper = self.asleep.pop(coords,None)
+        if sleeper != None:
+            self._settle(sleeper)
+    
+    def settle(self):
+        """
+        Brings the HP of every sleeping monster up to date (without waking
+        them), after waking the ones next to changed cells.
+        """
+        if self._changedCells:
+            self._wakeNeighborsOfChanged()
+        for sleeper in self.asleep.itervalues():
+            self._settle(sleeper)
+    
+    def _settle(self,sleeper):
+        """Takes away the HP lost in the turns the given sleeper has skipped since it was last settled."""
+        numTurns = sleeper.lastStep - sleeper.settledStep
+        if numTurns:
+            monster = sleeper.monster
+            oldHP = monster.hp
+            monster.hp = oldHP - numTurns*sleeper.hpLoss
+            sleeper.settledStep = sleeper.lastStep
+            stats = self._simulation.stats
+            if stats:
+                stats.hpChanged(oldHP,monster.hp)
+    
+    def _wakeNeighborsOfChanged(self):
+        """Wakes the monsters next to the cells which have changed since this was last called."""
+        asleep = self.asleep
+        changedCells = self._changedCells
+        if asleep:
+            getNeighbors = self._getNeighbors
+            for coords in changedCells:
+                for neighbor in getNeighbors(coords):
+                    if neighbor in asleep:
+                        self.wake(neighbor)
+        changedCells.clear()
@@ -6,61 +6,373 @@ Created on Sep 28, 2011
 
 from utils.board import Board
 import actions
-from boardelements import Monster,FOOD
+from boardelements import Monster,MonsterPool,FOOD
+from genomes import GenomeRegistry
+from telemetry import PopulationStats
+from lineage import LineageTracker,NO_PARENT
+from regrowth import FreeCellIndex,PATTERNS,numToSpawn,pickCell
+from scheduler import ActivityScheduler
 from random import shuffle,random as probcheck
 
-class Simulation(Board):
+def createSimulation(config,populate=True):
     """
-    This class represents the simulation as a whole (including the board).
-    It's unfortunately a non-homogenous data structure. The keys are always
-    Coords, but the values can be Monsters or FOOD. In the future it would
-    be very good to make this structure homogenous, and elsewhere stop using
-    isinstance to check if something's a monster. For now... oh well.
+    Creates a new simulation using the engine named by the configurable value
+    ENGINE. "dict" is the original engine (Simulation, below), which is kept as
+    the reference implementation. "array" is the NumPy-backed ArraySimulation,
+    which is intended for much larger boards. "chunked" is the sparse
+    ChunkedSimulation, which is intended for huge (or unbounded) boards which
+    are mostly empty. "parallel" is ParallelSimulation, which steps stripes of
+    one board in several processes.
+    
+    If populate is false, the board starts out empty. If the configurable
+    value TRACK_LINEAGE is true, lineage tracking is enabled.
     """
-    def __init__(self,config):
-        Board.__init__(self,config.BOARD_WIDTH,config.BOARD_HEIGHT)
-        self.config = config
+    engine = config.get("ENGINE","dict")
+    if engine == "dict":
+        simulation = Simulation(config,populate)
+    elif engine == "array":
+        from arraysimulator import ArraySimulation # Only this engine needs NumPy.
+        simulation = ArraySimulation(config,populate)
+    elif engine == "chunked":
+        from chunkedsimulator import ChunkedSimulation
+        simulation = ChunkedSimulation(config,populate)
+    elif engine == "parallel":
+        from parallelsimulator import ParallelSimulation
+        simulation = ParallelSimulation(config,populate)
+    else:
+        raise Exception, "Unknown simulation engine {0!r}.".format(engine)
+    if config.get("TRACK_LINEAGE"):
+        if not isinstance(simulation,SimulationBase):
+            raise Exception, "The {0} engine can't track lineage.".format(engine)
+        simulation.enableLineage()
+    if config.get("FOOD_REGROWTH_RATE") and not isinstance(simulation,SimulationBase):
+        raise Exception, "The {0} engine doesn't support food regrowth.".format(engine)
+    return simulation
+
+_allNames = None # The names from names.txt, once they have been read.
+
+def loadNames():
+    """
+    Returns the list of names from names.txt (used to name followed monsters),
+    in random order. The file is only read the first time.
+    """
+    global _allNames
+    if _allNames == None:
         with open("names.txt") as namesFile:
-            self._namesList = [line.replace("\n","") for line in namesFile.readlines()]
-        shuffle(self._namesList)
-        initialDNAString = config.INITIAL_DNA
-        if initialDNAString:
-            startDNA = [actions.DNA_MAP[char] for char in initialDNAString.upper()]
-        else:
-            startDNA = list(actions.ALL_ACTIONS) # Copy the list
-            shuffle(startDNA)
-        
-        totalMonsters = 0
-        totalFood = 0
-        for x in range(self.width):
-            for y in range(self.height):
-                if probcheck() < config.MONSTER_DENSITY and totalMonsters < config.MAX_NUM_MONSTERS:
-                    self[x,y] = Monster(startDNA, config.INITIAL_HP, config.INITIAL_COLOR)
-                    totalMonsters += 1
-                elif probcheck() < config.FOOD_DENSITY and totalFood < config.MAX_NUM_FOOD:
-                    self[x,y] = FOOD
-                    totalFood += 1
+            _allNames = [line.replace("\n","") for line in namesFile.readlines()]
+    namesList = list(_allNames)
+    shuffle(namesList)
+    return namesList
+
+def populatedArea(config):
+    """
+    Returns the width and height of the area (starting at the top left corner
+    of the board) which is randomly filled with monsters and food at the
+    start: the configurable value POPULATED_AREA, or the whole board if that
+    is None.
+    """
+    area = config.get("POPULATED_AREA")
+    if area == None:
+        if config.BOARD_WIDTH == None or config.BOARD_HEIGHT == None:
+            raise Exception, "An unbounded board requires a POPULATED_AREA."
+        return config.BOARD_WIDTH,config.BOARD_HEIGHT
+    return tuple(area)
+
+def initialDNA(config):
+    """
+    Returns the DNA (a list of action functions) given by the configurable
+    value INITIAL_DNA, or a random ordering of all the actions if it is empty.
+    """
+    initialDNAString = config.INITIAL_DNA
+    if initialDNAString:
+        return [actions.DNA_MAP[char] for char in initialDNAString.upper()]
+    else:
+        startDNA = list(actions.ALL_ACTIONS) # Copy the list
+        shuffle(startDNA)
+        return startDNA
+
+class SimulationBase(object):
+    """
+    This class holds the functionality shared by the simulation engines
+    (Simulation, ArraySimulation and ChunkedSimulation) which doesn't depend
+    on how the board is stored. At the moment, that's keeping track of which
+    cells change, of population statistics and lineage, and of the names
+    given to followed monsters. It also regrows food, and records the
+    simulation to a trajectory file if asked to.
     
-    def oneStep(self):
+    For food regrowth, an engine must provide _emptyCells and _growFood, call
+    _indexFreeCells once its board is populated (or imported), and keep
+    freeCells up to date (once it exists) whenever a cell becomes empty or
+    stops being empty.
+    """
+    def __init__(self):
+        self._changeTrackers = []
+        self.stats = None # The PopulationStats, if enableStats has been called.
+        self.lineage = None # The LineageTracker, if enableLineage has been called.
+        self.freeCells = None # The FreeCellIndex of empty cells, if food regrows.
+        self.recorder = None # The TrajectoryRecorder, if enableRecording has been called.
+        self.scheduler = None # The ActivityScheduler, if the engine uses one.
+        self._namesList = None # The unused names, loaded when the first monster is named.
+    
+    def trackChanges(self):
         """
-        Executes one step of the simulation. Each monster performs one action,
-        the first applicable action in its DNA. (In other words, the first
-        action that does not throw a CannotPerformActionException.)
+        Returns a new set, to which the coords of every cell whose contents
+        change will be added from now on (until untrackChanges is called with
+        it). The owner of the set should remove the coords it has dealt with,
+        for instance by clearing it after redrawing.
+        """
+        changedCells = set()
+        self._changeTrackers.append(changedCells)
+        return changedCells
+    
+    def untrackChanges(self,changedCells):
+        """Stops adding changed cells to the given set, from trackChanges."""
+        self._changeTrackers.remove(changedCells)
+    
+    def markChanged(self,coords):
+        """
+        Records that the given cell has changed. The engines call this whenever
+        a monster appears, moves or dies; it should also be called after
+        changing a monster's appearance (such as whether it's followed).
+        """
+        for changedCells in self._changeTrackers:
+            changedCells.add(coords)
+    
+    def enableStats(self,hpBinWidth=50,numHPBins=10):
+        """
+        Starts keeping population statistics (a telemetry.PopulationStats,
+        counting what is on the board now) in self.stats, which the engine
+        keeps up to date from then on, and returns them. If they are already
+        being kept, the existing ones are returned.
+        """
+        if self.stats == None:
+            if self.scheduler != None:
+                self.scheduler.settle()
+            stats = PopulationStats(hpBinWidth,numHPBins)
+            stats.count(self)
+            self.stats = stats
+        return self.stats
+    
+    def enableLineage(self,minPruneSize=4096):
+        """
+        Starts tracking lineage (with a lineage.LineageTracker, in
+        self.lineage) and returns the tracker. The monsters on the board now
+        are recorded as having no parents; from then on, the engine records
+        every birth and death. If lineage is already being tracked, the
+        existing tracker is returned.
+        """
+        if self.lineage == None:
+            lineage = LineageTracker(minPruneSize)
+            for coords,element in self.iteritems():
+                if element != FOOD:
+                    element.lineageId = lineage.born(NO_PARENT,self.stepCount,element.dna.id)
+            self.lineage = lineage
+        return self.lineage
+    
+    def enableRecording(self,filename,keyframeInterval=None):
+        """
+        Starts recording the simulation to the given trajectory file (with a
+        trajectory.TrajectoryRecorder, in self.recorder) and returns the
+        recorder. The board as it is now is recorded as a keyframe; from then
+        on, the engine records every step. If the simulation is already being
+        recorded, that recording is stopped first.
+        """
+        from trajectory import TrajectoryRecorder,KEYFRAME_INTERVAL
+        self.stopRecording()
+        if self.scheduler != None:
+            self.scheduler.settle()
+        self.recorder = TrajectoryRecorder(self,filename,keyframeInterval or KEYFRAME_INTERVAL)
+        return self.recorder
+    
+    def stopRecording(self):
+        """Stops recording the simulation (if it is being recorded), and closes the trajectory file."""
+        if self.recorder != None:
+            self.recorder.close()
+            self.recorder = None
+    
+    def regrowFood(self):
+        """
+        Grows food in empty cells, FOOD_REGROWTH_RATE pieces per step on
+        average, placed according to FOOD_REGROWTH_PATTERN (see the regrowth
+        module), and returns the number grown. The engines call this at the
+        end of every step.
         
-        The order in which the monsters move is, for now, non-deterministic,
-        as it is based on the "order" of the keys in the underlying dict.
+        The empty cells are picked from freeCells, which the engine builds when
+        the board is populated (or, for a board filled some other way, which
+        is built here the first time food grows).
         """
-        for coords,element in self.items():
+        config = self.config
+        rate = config.get("FOOD_REGROWTH_RATE",0)
+        if not rate:
+            return 0
+        width,height = self.width,self.height
+        if self.freeCells == None:
+            self._indexFreeCells()
+        patternName = config.get("FOOD_REGROWTH_PATTERN","uniform")
+        try:
+            pattern = PATTERNS[patternName]
+        except KeyError:
+            raise Exception, "Unknown food regrowth pattern {0!r}.".format(patternName)
+        numGrown = 0
+        for foodNum in range(numToSpawn(rate)):
+            cell = pickCell(self.freeCells,pattern,width,height)
+            if cell == None:
+                break
+            self._growFood(cell)
+            numGrown += 1
+        return numGrown
+    
+    def _indexFreeCells(self):
+        """
+        Builds freeCells by scanning the board for empty cells, if food
+        regrows. The engines call this once the board is populated, so that
+        the scan doesn't happen in the middle of a run.
+        """
+        if not self.config.get("FOOD_REGROWTH_RATE",0):
+            return
+        if self.width == None or self.height == None:
+            raise Exception, "Food can only regrow on a bounded board."
+        self.freeCells = FreeCellIndex(self._emptyCells())
+    
+    def colorGrid(self,backgroundColor,foodColor):
+        """
+        Returns the colors of the cells of the (bounded) board, as a NumPy
+        array of bytes with shape (width, height, 3), the layout used by
+        pygame.surfarray: backgroundColor for empty cells, foodColor for food
+        and each monster's own color.
+        """
+        import numpy
+        grid = numpy.empty((self.width,self.height,3),numpy.uint8)
+        grid[:,:] = backgroundColor
+        for (x,y),element in self.iteritems():
+            grid[x,y] = foodColor if element == FOOD else element.color
+        return grid
+    
+    def followedCoords(self):
+        """Returns a list of the coords of the followed monsters."""
+        return [coords for coords,element in self.iteritems() if element != FOOD and element.followed]
+    
+    def _nextName(self):
+        """Returns the next unused name for a followed monster."""
+        if self._namesList == None:
+            self._namesList = loadNames()
+        return self._namesList.pop(0)
+    
+    def _exportNames(self):
+        """Returns a copy of the unused names (or None if they haven't been loaded), for exportState."""
+        return list(self._namesList) if self._namesList != None else None
+    
+    def _importNames(self,namesList):
+        """Restores the unused names from _exportNames."""
+        self._namesList = list(namesList) if namesList != None else None
+
+
+class ObjectSimulationBase(SimulationBase):
+    """
+    This class holds the functionality shared by the engines which keep a
+    Monster object (or FOOD) in each occupied cell, Simulation and
+    ChunkedSimulation: the query methods used by actions, and adding, moving
+    and killing monsters, exporting and importing the board, and following
+    monsters.
+    
+    An engine must provide get (which returns a Monster, FOOD or None),
+    iteritems, getNeighbors, _setCell and _cellCoords.
+    """
+    def _setCell(self,coords,element):
+        """
+        Sets the contents of the given cell (in-bounds Coords) to a Monster,
+        FOOD or None (which it must only be given for an occupied cell), and
+        keeps freeCells up to date.
+        """
+        raise NotImplementedError
+    
+    def _cellCoords(self,index):
+        """Returns the coords of the cell with the given index (y*width+x) on a bounded board."""
+        raise NotImplementedError
+    
+    def countMonsters(self):
+        """Returns the number of monsters on the board."""
+        return self.genomeRegistry.totalCount
+    
+    def getMonster(self,coords):
+        """
+        Returns the monster at the given coords, or None if there isn't one.
+        (If it is asleep, it is woken, so that its HP is up to date.)
+        """
+        element = self.get(coords)
+        if isinstance(element,Monster):
+            if self.scheduler != None:
+                self.scheduler.wake(coords)
+            return element
+        else:
+            return None
+    
+    def isFood(self,coords):
+        """Returns true if the given coords contain food."""
+        return self.get(coords) == FOOD
+    
+    def scanNeighbors(self,coords):
+        """
+        Sorts the neighbors of the given coords in one pass, returning three
+        lists: the neighbors without a monster (which may contain food), the
+        neighbors with a monster, and the neighbors with food.
+        """
+        empty = []
+        monsters = []
+        food = []
+        for neighbor in self.getNeighbors(coords):
+            element = self.get(neighbor)
             if isinstance(element,Monster):
-                monster = element
-                self.changeMonsterHP(monster, coords, -self.config.HP_LOSS_PER_TURN)
-                if monster.hp > 0:
-                    for action in monster.dna:
-                        try:
-                            action(self,monster,coords)
-                            break
-                        except actions.CannotPerformActionException:
-                            pass
+                monsters.append(neighbor)
+            else:
+                empty.append(neighbor)
+                if element == FOOD:
+                    food.append(neighbor)
+        return empty,monsters,food
+    
+    def emptyNeighbors(self,coords):
+        """
+        Returns the neighbors of the given coords that do not contain a monster.
+        (They may contain food.)
+        """
+        return [neighbor for neighbor in self.getNeighbors(coords) if not isinstance(self.get(neighbor),Monster)]
+    
+    def monsterNeighbors(self,coords):
+        """Returns the neighbors of the given coords that contain a monster."""
+        return [neighbor for neighbor in self.getNeighbors(coords) if isinstance(self.get(neighbor),Monster)]
+    
+    def foodNeighbors(self,coords):
+        """Returns the neighbors of the given coords that contain food."""
+        return [neighbor for neighbor in self.getNeighbors(coords) if self.get(neighbor) == FOOD]
+    
+    def addMonster(self,coords,dna,hp,color,parent=None):
+        """
+        Creates a new monster at the given coords (replacing any food there)
+        and returns it. dna can be any sequence of action functions. parent
+        is the monster it was born from, if any (which only matters to the
+        lineage).
+        
+        Like the other methods used by actions, this takes in-bounds Coords
+        (such as the ones from getNeighbors) without checking them.
+        """
+        existing = self.get(coords)
+        if isinstance(existing,Monster):
+            raise Exception, "{0} already contains a monster.".format(coords)
+        genome = self.genomeRegistry.intern(dna)
+        if self.monsterPool != None:
+            monster = self.monsterPool.acquire(genome,hp,color)
+        else:
+            monster = Monster(genome,hp,color)
+        self._setCell(coords,monster)
+        self.genomeRegistry.born(genome)
+        if self.stats:
+            self.stats.born(hp,color,existing == FOOD)
+        if self.lineage != None:
+            monster.lineageId = self.lineage.born(parent.lineageId if parent != None else NO_PARENT,
+                                                  self.stepCount,genome.id)
+        if self._changeTrackers:
+            self.markChanged(coords)
+        return monster
     
     def moveMonster(self,monster,oldCoords,newCoords):
         """
@@ -72,20 +384,120 @@ class Simulation(Board):
         if existing == FOOD:
             # The monster gets to eat the food.
             monster.hp += self.config.FOOD_HP_INCREASE
+            if self.stats:
+                self.stats.ate()
+                self.stats.hpChanged(monster.hp - self.config.FOOD_HP_INCREASE,monster.hp)
         elif existing:
             raise Exception # Trying to move a monster on top of another monster
-        del self[oldCoords]
-        self[newCoords] = monster
+        self._setCell(oldCoords,None)
+        self._setCell(newCoords,monster)
+        if self._changeTrackers:
+            self.markChanged(oldCoords)
+            self.markChanged(newCoords)
     
-    def changeMonsterHP(self,monster,monsterCoords,offset):
+    def changeMonsterHP(self,monster,monsterCoords,offset,attacked=False):
         """
         Changes the monster's HP by the given offset, possibly killing it and
-        replacing it with food.
+        replacing it with food. attacked should be true if this is damage from
+        an attack (which only matters to the statistics).
         """
+        scheduler = self.scheduler
+        if scheduler != None and monsterCoords in scheduler.asleep:
+            scheduler.wake(monsterCoords)
         monster.hp += offset
+        if self.stats:
+            if monster.hp <= 0:
+                self.stats.died(monster.hp - offset,monster.color,attacked)
+            else:
+                self.stats.hpChanged(monster.hp - offset,monster.hp)
         if monster.hp <= 0:
             # The monster is dead. Replace it with FOOD!
-            self[monsterCoords] = FOOD
+            self._setCell(monsterCoords,FOOD)
+            self.genomeRegistry.died(monster.genome)
+            if self.lineage != None:
+                self.lineage.died(monster.lineageId)
+            if self.monsterPool != None:
+                self.monsterPool.release(monster)
+            if self._changeTrackers:
+                self.markChanged(monsterCoords)
+    
+    def _growFood(self,cell):
+        """Puts food in the given empty cell (an index), for regrowFood."""
+        coords = self._cellCoords(cell)
+        self._setCell(coords,FOOD) # This removes it from freeCells.
+        if self.stats:
+            self.stats.grew()
+        if self._changeTrackers:
+            self.markChanged(coords)
+    
+    def exportState(self):
+        """
+        Returns the state of the board as a dict, in the same array-based form
+        as ArraySimulation.exportState (so this requires NumPy, and a bounded
+        board). Monsters are given uids in the order iteritems finds them. See
+        the checkpoint module.
+        """
+        import numpy
+        from arraysimulator import FOOD_CELL,MONSTER_CELL
+        if self.scheduler != None:
+            self.scheduler.settle()
+        if self.width == None or self.height == None:
+            raise Exception, "Only a bounded board can be exported."
+        numCells = self.width*self.height
+        state = {
+            "cellTypes": numpy.zeros(numCells,numpy.uint8),
+            "hp": numpy.zeros(numCells,numpy.int32),
+            "colors": numpy.zeros((numCells,3),numpy.uint8),
+            "genomeIds": numpy.zeros(numCells,numpy.int32),
+            "uids": numpy.zeros(numCells,numpy.int64),
+            "monsterNames": {},
+            "followed": [],
+            "stepCount": self.stepCount,
+            "namesList": self._exportNames(),
+        }
+        uid = 0
+        for coords,element in self.iteritems():
+            index = coords.y*self.width + coords.x
+            if element == FOOD:
+                state["cellTypes"][index] = FOOD_CELL
+            else:
+                uid += 1
+                state["cellTypes"][index] = MONSTER_CELL
+                state["hp"][index] = element.hp
+                state["colors"][index] = element.color
+                state["genomeIds"][index] = element.genome.id
+                state["uids"][index] = uid
+                if element.name:
+                    state["monsterNames"][uid] = element.name
+                if element.followed:
+                    state["followed"].append(uid)
+        state["nextUid"] = uid + 1
+        return state
+    
+    def importState(self,state):
+        """
+        Fills the (empty) board from a dict returned by exportState. The
+        genomes it refers to must already be interned in genomeRegistry.
+        """
+        import numpy
+        from arraysimulator import FOOD_CELL
+        cellTypes,uids = state["cellTypes"],state["uids"]
+        followed = set(state["followed"])
+        for index in numpy.flatnonzero(cellTypes).tolist():
+            coords = self._cellCoords(index)
+            if cellTypes[index] == FOOD_CELL:
+                self._setCell(coords,FOOD)
+            else:
+                genome = self.genomeRegistry.get(int(state["genomeIds"][index]))
+                monster = Monster(genome,int(state["hp"][index]),tuple(state["colors"][index].tolist()))
+                uid = int(uids[index])
+                monster.name = state["monsterNames"].get(uid)
+                monster.followed = uid in followed
+                self._setCell(coords,monster)
+                self.genomeRegistry.born(genome)
+        self.stepCount = state["stepCount"]
+        self._importNames(state["namesList"])
+        self._indexFreeCells()
     
     def toggleMonsterFollowed(self,monster):
         """
@@ -94,7 +506,114 @@ class Simulation(Board):
         """
         monster.followed = not monster.followed
         if not monster.name:
-            name = self._namesList.pop(0)
+            name = self._nextName()
             monster.name = name
             print "Monster {0} renamed {1}.".format(id(monster),name)
-    
\ No newline at end of file
+
+
+class Simulation(Board,ObjectSimulationBase):
+    """
+    This class represents the simulation as a whole (including the board).
+    It's unfortunately a non-homogenous data structure. The keys are always
+    Coords, but the values can be Monsters or FOOD. In the future it would
+    be very good to make this structure homogenous, and elsewhere stop using
+    isinstance to check if something's a monster. For now... oh well.
+    
+    Every monster's DNA is interned in genomeRegistry, which also counts the
+    living monsters with each genome.
+    
+    Actions should not inspect the board directly, but use the query methods
+    (getMonster, isFood, emptyNeighbors, etc.) so that they also work with the
+    other engines, such as ArraySimulation.
+    """
+    def __init__(self,config,populate=True):
+        """
+        Creates a simulation with the given config. Unless populate is false,
+        the board is randomly filled with monsters and food.
+        """
+        Board.__init__(self,config.BOARD_WIDTH,config.BOARD_HEIGHT,wrap=config.WRAP_EDGES)
+        ObjectSimulationBase.__init__(self)
+        self.config = config
+        self.stepCount = 0 # The number of steps run so far.
+        poolSize = config.get("MONSTER_POOL_SIZE",0)
+        self.monsterPool = MonsterPool(poolSize) if poolSize else None # See MonsterPool.
+        if config.get("ACTIVITY_SCHEDULING"):
+            self.scheduler = ActivityScheduler(self)
+        self.genomeRegistry = GenomeRegistry()
+        startGenome = self.genomeRegistry.intern(initialDNA(config))
+        if populate:
+            self._populate(startGenome)
+            self._indexFreeCells()
+    
+    def _populate(self,startGenome):
+        """Randomly places the starting monsters and food."""
+        config = self.config
+        totalMonsters = 0
+        totalFood = 0
+        areaWidth,areaHeight = populatedArea(config)
+        for x in range(areaWidth):
+            for y in range(areaHeight):
+                if probcheck() < config.MONSTER_DENSITY and totalMonsters < config.MAX_NUM_MONSTERS:
+                    self[x,y] = Monster(startGenome, config.INITIAL_HP, config.INITIAL_COLOR)
+                    totalMonsters += 1
+                elif probcheck() < config.FOOD_DENSITY and totalFood < config.MAX_NUM_FOOD:
+                    self[x,y] = FOOD
+                    totalFood += 1
+        self.genomeRegistry.born(startGenome,totalMonsters)
+    
+    def oneStep(self):
+        """
+        Executes one step of the simulation. Each monster performs one action,
+        the first applicable action in its DNA. (See
+        actions.performFirstApplicableAction.)
+        
+        The order in which the monsters move is, for now, non-deterministic,
+        as it is based on the "order" of the keys in the underlying dict.
+        Monsters which die before their turn (or are born during the step) do
+        not get a turn. With ACTIVITY_SCHEDULING on, the turns of sleeping
+        monsters are skipped (see scheduler.ActivityScheduler).
+        
+        Returns the number of monsters that took a turn.
+        """
+        self.stepCount += 1
+        hpLossPerTurn = self.config.HP_LOSS_PER_TURN
+        scheduler = self.scheduler
+        numProcessed = 0
+        for coords,element in self.items():
+            if isinstance(element,Monster) and self.get(coords) is element:
+                monster = element
+                numProcessed += 1
+                if scheduler != None and scheduler.skipTurn(monster,coords):
+                    continue
+                self.changeMonsterHP(monster, coords, -hpLossPerTurn)
+                if monster.hp > 0:
+                    action = actions.performFirstApplicableAction(self,monster,coords)
+                    if scheduler != None and (action == None or action.inert):
+                        scheduler.sleep(monster,coords)
+        if self.monsterPool != None:
+            self.monsterPool.recycle()
+        self.regrowFood()
+        if scheduler != None and (self.stats or self.recorder != None):
+            scheduler.settle()
+        if self.recorder != None:
+            self.recorder.stepped(self)
+        return numProcessed
+    
+    def _setCell(self,coords,element):
+        """Sets the contents of the given cell, like ObjectSimulationBase._setCell."""
+        if element == None:
+            self.deleteUnchecked(coords)
+            if self.freeCells != None:
+                self.freeCells.add(coords[1]*self.width + coords[0])
+        else:
+            if self.freeCells != None and coords not in self:
+                self.freeCells.remove(coords[1]*self.width + coords[0])
+            self.setUnchecked(coords,element)
+    
+    def _cellCoords(self,index):
+        """Returns the canonical Coords of the cell with the given index."""
+        return self._cells[index]
+    
+    def _emptyCells(self):
+        """Returns the indices (y*width+x) of the empty cells, for regrowFood."""
+        return [index for index,coords in enumerate(self._cells) if coords not in self]
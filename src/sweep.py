@@ -0,0 +1,224 @@
+#!/usr/bin/python
+
+'''
+This module runs parameter sweeps: many headless simulations, over a grid or a
+random sample of config overrides and several seeds, spread over a pool of
+processes (one per core by default).
+
+Each finished run is written as one line of JSON to the results file as soon
+as it finishes. A sweep can be resumed after being interrupted by running the
+same command again: runs which already have a line in the results file are
+skipped.
+
+Example usage (from the src folder):
+python sweep.py --grid MUTATION_RATE=0.05,0.1,0.2 --grid HP_LOSS_PER_TURN=10,20 --seeds 5 --steps 2000
+python sweep.py --sample 100 --range FOOD_HP_INCREASE=50:200 --range MUTATION_RATE=0.0:0.5 --steps 2000
+
+Created on Oct 18, 2026
+'''
+
+import argparse
+import ast
+import itertools
+import json
+import multiprocessing
+import os
+import random
+from batch import parseOverride,loadConfig,runBatch
+from simulator import createSimulation
+
+def parseValues(valuesString):
+    """
+    Parses a comma-separated list of values, such as "0.1,0.2" or
+    "(255,0,0),(0,0,255)". Values which aren't Python literals are used as
+    plain strings.
+    """
+    try:
+        return list(ast.literal_eval("[" + valuesString + "]"))
+    except (ValueError,SyntaxError):
+        return [value.strip() for value in valuesString.split(",")]
+
+def parseRange(rangeString):
+    """
+    Parses a range of the form "LOW:HIGH". If both ends are integers, values
+    will be sampled from the integers in the range (inclusive); otherwise,
+    from the real numbers in it.
+    """
+    low,separator,high = rangeString.partition(":")
+    if not separator:
+        raise ValueError("Ranges must have the form LOW:HIGH, not {0!r}.".format(rangeString))
+    return ast.literal_eval(low.strip()),ast.literal_eval(high.strip())
+
+def gridOverrides(grid):
+    """
+    Returns a list of override dicts, one for every combination of the values
+    in grid (a list of (name,values) pairs).
+    """
+    names = [name for name,values in grid]
+    return [dict(zip(names,combination)) for combination in itertools.product(*[values for name,values in grid])]
+
+def sampleOverrides(grid,ranges,numSamples,sampleSeed):
+    """
+    Returns a list of numSamples override dicts, each with a random choice from
+    every value list in grid and a random value from every range in ranges
+    (a list of (name,(low,high)) pairs). The same sampleSeed always gives the
+    same samples, which is what makes sampled sweeps resumable.
+    """
+    rng = random.Random(sampleSeed)
+    samples = []
+    for sampleNum in range(numSamples):
+        overrides = {}
+        for name,values in grid:
+            overrides[name] = rng.choice(values)
+        for name,(low,high) in ranges:
+            if isinstance(low,int) and isinstance(high,int):
+                overrides[name] = rng.randint(low,high)
+            else:
+                overrides[name] = rng.uniform(low,high)
+        samples.append(overrides)
+    return samples
+
+def runKey(overrides,seed,maxSteps,timeLimit):
+    """
+    Returns a string identifying a run, used to recognize runs which are
+    already in the results file. Runs with different step or time limits are
+    different runs.
+    """
+    return json.dumps([sorted(overrides.items()),seed,maxSteps,timeLimit])
+
+def runOne(run):
+    """
+    Runs one simulation and returns its summary as a dict. run is a tuple of
+    (overrides,seed,maxSteps,timeLimit). This is what the worker processes do.
+    """
+    overrides,seed,maxSteps,timeLimit = run
+    random.seed(seed)
+    simulation = createSimulation(loadConfig(overrides))
+    stats = runBatch(simulation,maxSteps,timeLimit)
+    populationByGenome = simulation.genomeRegistry.populationByGenome()
+    topGenomes = sorted(populationByGenome.iteritems(),key=lambda item: -item[1])[:5]
+    return {
+        "overrides": overrides,
+        "seed": seed,
+        "maxSteps": maxSteps,
+        "timeLimit": timeLimit,
+        "steps": stats.steps,
+        "elapsed": stats.elapsed,
+        "stepsPerSecond": stats.stepsPerSecond,
+        "monstersProcessed": stats.monstersProcessed,
+        "population": stats.population,
+        "numGenomes": len(populationByGenome),
+        "topGenomes": [[genome.string,count] for genome,count in topGenomes],
+    }
+
+def finishedRunKeys(resultsFilename):
+    """
+    Returns the set of keys of the runs in the given results file (if it
+    exists). A partly written last line, left by an interrupted sweep, is
+    ignored, and so are results without their step and time limits (from
+    before those were written), since they can't be matched up.
+    """
+    keys = set()
+    if os.path.exists(resultsFilename):
+        with open(resultsFilename) as resultsFile:
+            for line in resultsFile:
+                try:
+                    result = json.loads(line)
+                except ValueError:
+                    continue
+                if "maxSteps" in result:
+                    keys.add(runKey(result["overrides"],result["seed"],result["maxSteps"],result["timeLimit"]))
+    return keys
+
+def runSweep(overridesList,seeds,resultsFilename,maxSteps=None,timeLimit=None,processes=None):
+    """
+    Runs a simulation for every combination of the given overrides and seeds
+    (skipping those already in the results file) over a pool of processes,
+    appending each summary to the results file as it finishes. processes
+    defaults to the number of cores.
+    Returns the number of runs performed.
+    """
+    finishedKeys = finishedRunKeys(resultsFilename)
+    runs = [(overrides,seed,maxSteps,timeLimit) for overrides in overridesList for seed in seeds
+            if runKey(overrides,seed,maxSteps,timeLimit) not in finishedKeys]
+    skipped = len(overridesList)*len(seeds) - len(runs)
+    if skipped:
+        print "Skipping {0} runs which are already finished.".format(skipped)
+    if not runs:
+        return 0
+    pool = multiprocessing.Pool(processes)
+    try:
+        with open(resultsFilename,"a") as resultsFile:
+            for runNum,result in enumerate(pool.imap_unordered(runOne,runs)):
+                resultsFile.write(json.dumps(result,sort_keys=True) + "\n")
+                resultsFile.flush()
+                print "[{0}/{1}] seed {2}, {3}: population {4} after {5} steps".format(
+                    runNum+1,len(runs),result["seed"],result["overrides"],result["population"],result["steps"])
+        pool.close()
+    except KeyboardInterrupt:
+        pool.terminate()
+        print "Interrupted. Run the same command again to resume."
+        raise
+    except Exception:
+        # A run failed in a worker process; its error is re-raised here.
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+    return len(runs)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Runs headless simulations over a grid or sample of config overrides.")
+    parser.add_argument("--grid",action="append",default=[],metavar="NAME=V1,V2,...",
+                        help="a config option and the values to try (can be given more than once)")
+    parser.add_argument("--range",action="append",default=[],metavar="NAME=LOW:HIGH",dest="ranges",
+                        help="a config option and the range to sample it from (requires --sample)")
+    parser.add_argument("--sample",type=int,metavar="N",
+                        help="runs N random samples of the grid and ranges, instead of the whole grid")
+    parser.add_argument("--sample-seed",type=int,default=0,
+                        help="the random seed used to pick the samples (default 0)")
+    parser.add_argument("--set",action="append",default=[],metavar="NAME=VALUE",dest="overrides",
+                        help="overrides a config option for every run (can be given more than once)")
+    parser.add_argument("--seeds",type=int,default=1,metavar="N",
+                        help="runs every configuration with N seeds (default 1)")
+    parser.add_argument("--first-seed",type=int,default=0,help="the first of the seeds (default 0)")
+    parser.add_argument("--steps",type=int,help="the number of steps per run")
+    parser.add_argument("--time",type=float,help="the maximum number of seconds per run")
+    parser.add_argument("--processes",type=int,help="the number of worker processes (default: one per core)")
+    parser.add_argument("--output",default="sweep_results.jsonl",
+                        help="the results file, which is appended to (default sweep_results.jsonl)")
+    options = parser.parse_args(args)
+    try:
+        fixedOverrides = dict(parseOverride(override) for override in options.overrides)
+        grid = [(name,parseValues(values)) for name,values in
+                (gridString.split("=",1) for gridString in options.grid if "=" in gridString)]
+        if len(grid) != len(options.grid):
+            raise ValueError("Grid options must have the form NAME=V1,V2,...")
+        ranges = [(name,parseRange(rangeString)) for name,rangeString in
+                  (rangeString.split("=",1) for rangeString in options.ranges if "=" in rangeString)]
+        if len(ranges) != len(options.ranges):
+            raise ValueError("Range options must have the form NAME=LOW:HIGH")
+    except (ValueError,SyntaxError) as error:
+        parser.error(str(error))
+    if options.steps == None and options.time == None:
+        parser.error("at least one of --steps and --time is required")
+    if ranges and options.sample == None:
+        parser.error("--range requires --sample")
+    
+    if options.sample != None:
+        overridesList = sampleOverrides(grid,ranges,options.sample,options.sample_seed)
+    else:
+        overridesList = gridOverrides(grid)
+    for overrides in overridesList:
+        overrides.update(fixedOverrides)
+    defaultEngine = loadConfig().get("ENGINE")
+    if any(overrides.get("ENGINE",defaultEngine) == "parallel" for overrides in overridesList):
+        # Its worker processes can't be started from the sweep's worker processes.
+        parser.error("sweeps don't support the parallel engine")
+    seeds = range(options.first_seed,options.first_seed+options.seeds)
+    numRuns = runSweep(overridesList,seeds,options.output,options.steps,options.time,options.processes)
+    print "Finished {0} runs. Results are in {1}.".format(numRuns,options.output)
+
+if __name__ == '__main__':
+    main()
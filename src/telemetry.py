@@ -0,0 +1,188 @@
+'''
+This module keeps population statistics and writes them to a telemetry stream.
+
+PopulationStats is attached to a simulation (with enableStats), which keeps it
+up to date as monsters are born, change HP, eat and die, so the statistics are
+always known without looking at the board. TelemetryWriter samples them every
+so many steps and appends them to a set of CSV files.
+
+Created on Oct 18, 2026
+'''
+
+import csv
+from boardelements import FOOD
+
+class PopulationStats(object):
+    """
+    Population statistics, kept up to date by the simulation they are
+    attached to:
+    food is the number of cells with food.
+    hpHistogram is the number of monsters with HP in each bin: bin i holds
+    HP from i*hpBinWidth+1 to (i+1)*hpBinWidth, except that the last bin
+    holds all HP above that.
+    colorCounts is a dict of the number of monsters of each color (only
+    including colors with living monsters).
+    births, starvationDeaths and attackDeaths count the monsters born, dead
+    of HP loss over time and killed by attacks since the last call to
+    resetCounters.
+    (The number of monsters of each genome is kept by the genome registry.)
+    """
+    def __init__(self,hpBinWidth=50,numHPBins=10):
+        self.hpBinWidth = hpBinWidth
+        self.numHPBins = numHPBins
+        self.food = 0
+        self.hpHistogram = [0]*numHPBins
+        self.colorCounts = {}
+        self.resetCounters()
+    
+    def resetCounters(self):
+        """Sets births and deaths back to zero."""
+        self.births = 0
+        self.starvationDeaths = 0
+        self.attackDeaths = 0
+    
+    def _hpBin(self,hp):
+        return min(max(hp-1,0) // self.hpBinWidth, self.numHPBins-1)
+    
+    def count(self,simulation):
+        """Counts the monsters and food already on the board of the given simulation."""
+        for coords,element in simulation.iteritems():
+            if element == FOOD:
+                self.food += 1
+            else:
+                self.hpHistogram[self._hpBin(element.hp)] += 1
+                self.colorCounts[element.color] = self.colorCounts.get(element.color,0) + 1
+    
+    def born(self,hp,color,onFood):
+        """Records the birth of a monster (in a cell which had food, if onFood is true)."""
+        self.births += 1
+        if onFood:
+            self.food -= 1
+        self.hpHistogram[self._hpBin(hp)] += 1
+        self.colorCounts[color] = self.colorCounts.get(color,0) + 1
+    
+    def hpChanged(self,oldHP,newHP):
+        """Records a change of a living monster's HP (so both are positive)."""
+        # This is called for nearly every turn, so it avoids calling _hpBin.
+        oldBin = (oldHP-1) // self.hpBinWidth
+        newBin = (newHP-1) // self.hpBinWidth
+        if oldBin != newBin:
+            lastBin = self.numHPBins-1
+            self.hpHistogram[oldBin if oldBin < lastBin else lastBin] -= 1
+            self.hpHistogram[newBin if newBin < lastBin else lastBin] += 1
+    
+    def ate(self):
+        """Records that a monster ate food."""
+        self.food -= 1
+    
+    def grew(self):
+        """Records that food grew in an empty cell."""
+        self.food += 1
+    
+    def died(self,hp,color,attacked):
+        """
+        Records the death of a monster which had the given HP before it died
+        (and which leaves food behind).
+        """
+        if attacked:
+            self.attackDeaths += 1
+        else:
+            self.starvationDeaths += 1
+        self.food += 1
+        self.hpHistogram[self._hpBin(hp)] -= 1
+        count = self.colorCounts[color] - 1
+        if count:
+            self.colorCounts[color] = count
+        else:
+            del self.colorCounts[color]
+
+
+class TelemetryWriter(object):
+    """
+    Appends samples of a simulation's PopulationStats to three CSV files,
+    every interval steps:
+    PREFIX.csv has one row per sample, with the columns step, population,
+    births, starvationDeaths, attackDeaths (all since the previous sample),
+    food, and one column per HP histogram bin.
+    PREFIX_genomes.csv has a row (step, genome, count) for each genome with
+    living monsters at each sample.
+    PREFIX_colors.csv has a row (step, red, green, blue, count) for each color
+    of living monsters at each sample.
+    
+    The rows are buffered, and only written every flushEvery samples (and by
+    finish). Existing files are appended to, so a resumed run continues the
+    same stream.
+    
+    Call stepped after every step, and finish at the end, like
+    checkpoint.PeriodicCheckpointer.
+    """
+    def __init__(self,prefix,interval=1,flushEvery=100,hpBinWidth=50,numHPBins=10):
+        self.prefix = prefix
+        self.interval = interval
+        self.flushEvery = flushEvery
+        self.hpBinWidth = hpBinWidth
+        self.numHPBins = numHPBins
+        self._rows = []
+        self._genomeRows = []
+        self._colorRows = []
+        self._numBuffered = 0
+        self._stats = None
+    
+    def attach(self,simulation):
+        """
+        Starts keeping statistics for the given simulation. (stepped does
+        this by itself the first time it is called.) The engine must keep
+        statistics (the parallel engine doesn't).
+        """
+        if not hasattr(simulation,"enableStats"):
+            raise Exception, "The {0} engine doesn't keep population statistics.".format(simulation.config.get("ENGINE"))
+        self._stats = simulation.enableStats(self.hpBinWidth,self.numHPBins)
+    
+    def stepped(self,simulation):
+        """Takes a sample if one is due (judging by the simulation's step count)."""
+        if self._stats == None:
+            self.attach(simulation)
+        if simulation.stepCount % self.interval == 0:
+            self.sample(simulation)
+    
+    def sample(self,simulation):
+        """Takes a sample of the simulation's statistics now."""
+        stats = self._stats
+        step = simulation.stepCount
+        self._rows.append([step,simulation.countMonsters(),stats.births,stats.starvationDeaths,
+                           stats.attackDeaths,stats.food] + stats.hpHistogram)
+        stats.resetCounters()
+        for genome,count in simulation.genomeRegistry.populationByGenome().iteritems():
+            self._genomeRows.append((step,genome.string,count))
+        for color,count in stats.colorCounts.iteritems():
+            self._colorRows.append((step,) + tuple(color) + (count,))
+        self._numBuffered += 1
+        if self._numBuffered >= self.flushEvery:
+            self.flush()
+    
+    def flush(self):
+        """Writes the buffered samples to the files."""
+        hpColumns = ["hp{0}-{1}".format(i*self.hpBinWidth+1,(i+1)*self.hpBinWidth) for i in range(self.numHPBins-1)]
+        hpColumns.append("hp{0}+".format((self.numHPBins-1)*self.hpBinWidth+1))
+        self._append(self.prefix + ".csv",
+                     ["step","population","births","starvationDeaths","attackDeaths","food"] + hpColumns,self._rows)
+        self._append(self.prefix + "_genomes.csv",["step","genome","count"],self._genomeRows)
+        self._append(self.prefix + "_colors.csv",["step","red","green","blue","count"],self._colorRows)
+        self._rows = []
+        self._genomeRows = []
+        self._colorRows = []
+        self._numBuffered = 0
+    
+    def _append(self,filename,header,rows):
+        """Appends rows to a CSV file, writing the header first if the file is new."""
+        with open(filename,"ab") as telemetryFile:
+            writer = csv.writer(telemetryFile)
+            if telemetryFile.tell() == 0:
+                writer.writerow(header)
+            writer.writerows(rows)
+    
+    def finish(self,simulation):
+        """Takes a final sample (unless one was just taken) and writes everything out."""
+        if self._stats != None and simulation.stepCount % self.interval != 0:
+            self.sample(simulation)
+        self.flush()
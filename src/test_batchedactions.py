@@ -0,0 +1,41 @@
+'''
+Tests for the batched actions, run from the src folder with
+"python -m unittest test_batchedactions". They require NumPy.
+
+Created on Oct 18, 2026
+'''
+
+import unittest
+import actions
+from batch import loadConfig
+from arraysimulator import ArraySimulation
+from utils.coords import Coords
+
+class DivideAllTest(unittest.TestCase):
+    """
+    On a board one row high, a monster which can only divide starts in the
+    second cell with an empty cell to its right, so it chooses to divide.
+    (Mutation is turned off, since it can't swap the actions of a DNA one
+    action long.)
+    """
+    def setUp(self):
+        self.config = loadConfig({"BOARD_WIDTH":3,"BOARD_HEIGHT":1,"BATCHED_ACTIONS":True,"MUTATION_RATE":0})
+        self.simulation = ArraySimulation(self.config,populate=False)
+        self.parentHP = self.config.DIVIDE_MIN_HP + self.config.HP_LOSS_PER_TURN
+        self.simulation.addMonster(Coords(1,0),[actions.DNA_MAP["D"]],self.parentHP,(127,127,127))
+    
+    def testDivides(self):
+        self.simulation.addMonster(Coords(0,0),[actions.DNA_MAP["I"]],100,(127,127,127))
+        self.simulation.oneStep()
+        halfHP = self.config.DIVIDE_MIN_HP // 2
+        self.assertEqual(self.simulation.hp.tolist(),[100 - self.config.HP_LOSS_PER_TURN,self.config.DIVIDE_MIN_HP - halfHP,halfHP])
+    
+    def testAttackedParentDoesNotDivide(self):
+        """The attack takes the parent below DIVIDE_MIN_HP after it chose to divide."""
+        self.simulation.addMonster(Coords(0,0),[actions.DNA_MAP["A"]],100,(127,127,127))
+        self.simulation.oneStep()
+        self.assertIsNone(self.simulation.getMonster(Coords(2,0)))
+        self.assertEqual(self.simulation.getMonster(Coords(1,0)).hp,self.config.DIVIDE_MIN_HP - self.config.ATTACK_HP_DECREASE)
+
+if __name__ == "__main__":
+    unittest.main()
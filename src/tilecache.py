@@ -0,0 +1,69 @@
+'''
+This module provides TileCache, which keeps pre-drawn monster tiles so each
+monster can be drawn with a single blit.
+
+Created on Oct 18, 2026
+'''
+
+import pygame
+
+class TileCache(object):
+    """
+    A cache of monster tiles: surfaces of one tile, filled with a monster's
+    color with the monster (or followed monster) sprite drawn over it. Tiles
+    are keyed by (color, followed) and made the first time they are needed.
+    
+    Since monster colors only ever change by COLOR_CHANGE_OFFSET, there are
+    usually few enough of them that every tile stays in the cache. If there
+    would be more than maxSize, the least recently used quarter of them are
+    thrown away. (Evicting a batch at a time keeps the bookkeeping for a hit
+    down to two dict operations.)
+    """
+    def __init__(self,tileWidth,monsterImage,followedMonsterImage,maxSize=4096):
+        self.tileWidth = tileWidth
+        self.monsterImage = monsterImage
+        self.followedMonsterImage = followedMonsterImage
+        self.maxSize = maxSize
+        self._tiles = {}
+        self._lastUsed = {} # Maps the keys of _tiles to the value of _clock when they were last used.
+        self._clock = 0
+        self.hits = 0
+        self.misses = 0
+    
+    def __len__(self):
+        return len(self._tiles)
+    
+    def clear(self):
+        """Throws away every tile."""
+        self._tiles.clear()
+        self._lastUsed.clear()
+    
+    def get(self,color,followed):
+        """Returns the tile for a monster of the given color (a tuple) and followed status."""
+        key = (color,followed)
+        self._clock += 1
+        tile = self._tiles.get(key)
+        if tile == None:
+            self.misses += 1
+            if len(self._tiles) >= self.maxSize:
+                self._evict()
+            tile = self._makeTile(color,followed)
+            self._tiles[key] = tile
+        else:
+            self.hits += 1
+        self._lastUsed[key] = self._clock
+        return tile
+    
+    def _evict(self):
+        """Throws away the least recently used quarter of the tiles (at least one)."""
+        byAge = sorted(self._lastUsed,key=self._lastUsed.__getitem__)
+        for key in byAge[:max(1,len(byAge)//4)]:
+            del self._tiles[key]
+            del self._lastUsed[key]
+    
+    def _makeTile(self,color,followed):
+        tileWidth = self.tileWidth
+        tile = pygame.Surface((tileWidth,tileWidth)).convert()
+        tile.fill(color)
+        tile.blit(self.followedMonsterImage if followed else self.monsterImage,(0,0))
+        return tile
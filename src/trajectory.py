@@ -0,0 +1,413 @@
+'''
+This module records simulations to trajectory files, and plays them back.
+
+A trajectory file is laid out as follows (all numbers little-endian):
+-A header: the magic string "PYEVOTRJ", the format version (uint32), the
+ board width and height (uint32 each), the keyframe interval (uint32) and the
+ length of the metadata (uint32).
+-The metadata, as UTF-8 JSON: the config of the simulation recorded.
+-One record per step: the kind ("K" for a keyframe, "D" for a delta), the
+ step count after the step (uint32), the number of cells (uint32), the length
+ of the genome table (uint32) and the length of the payload (uint32),
+ followed by the payload, compressed with zlib. The payload is the genome
+ table, as JSON (the id and DNA string of every genome not seen since the
+ last keyframe), followed by the cells: the index (uint32, y*width + x), cell
+ type (uint8), HP (int32), color (3 uint8) and genome id (int32) of each.
+
+A keyframe lists every non-empty cell; a delta lists the cells which changed
+in that step (including monsters whose HP changed), with empty cells for the
+ones which were emptied. An index file, the trajectory's filename plus
+".idx", holds the step (uint32), file offset (uint64) and kind of every
+record, so any step can be reached by reading the last keyframe before it
+and the deltas after that.
+
+Created on Oct 18, 2026
+'''
+
+import json
+import struct
+import zlib
+from bisect import bisect_right
+import actions
+from boardelements import FOOD,Monster
+from genomes import GenomeRegistry
+from simulator import SimulationBase
+from utils.coords import Coords
+from utils.misc import Config
+
+MAGIC = "PYEVOTRJ"
+FORMAT_VERSION = 1
+
+KEYFRAME_INTERVAL = 100
+# The default number of steps between keyframes. Seeking takes longer with
+# more steps between keyframes, but the file is bigger with fewer.
+
+COMPRESSION_LEVEL = 1
+# The zlib level the records are compressed with. Most of a delta is HP
+# changes, which compress well even at the fastest level.
+
+EMPTY_CELL,FOOD_CELL,MONSTER_CELL = 0,1,2
+NO_GENOME = -1
+
+_HEADER = struct.Struct("<8sIIIII")
+_RECORD = struct.Struct("<cIIII")
+_CELL = struct.Struct("<IBiBBBi")
+_INDEX_ENTRY = struct.Struct("<IQc")
+
+EMPTY_STATE = (EMPTY_CELL,0,0,0,0,NO_GENOME)
+FOOD_STATE = (FOOD_CELL,0,0,0,0,NO_GENOME)
+# A cell's state, as recorded, is a tuple (cell type, hp, red, green, blue, genome id).
+
+class TrajectoryError(Exception):
+    """An exception raised when a file is not a usable trajectory."""
+    pass
+
+def _jsonConfig(config):
+    """Returns the options of the given config which can be stored as JSON."""
+    jsonConfig = {}
+    for name,value in config.iteritems():
+        if name.isupper() and isinstance(value,(bool,int,long,float,basestring,tuple,list,type(None))):
+            jsonConfig[name] = value
+    return jsonConfig
+
+def indexFilename(filename):
+    """Returns the name of the index file of the given trajectory file."""
+    return filename + ".idx"
+
+
+class TrajectoryRecorder(object):
+    """
+    Records a simulation to a trajectory file, one record per step. Use
+    SimulationBase.enableRecording rather than creating one directly: the
+    engines call stepped at the end of every step.
+    
+    The recorder keeps the state of every non-empty cell as it was last
+    recorded. The cells to compare in each step are the ones the simulation
+    reports as changed, plus every monster's cell, since a monster's HP
+    changes without the cell being marked as changed. Records are written
+    and flushed as they are made, with the index entry last, so a recording
+    which was cut short is still readable up to its last complete step.
+    """
+    def __init__(self,simulation,filename,keyframeInterval=KEYFRAME_INTERVAL):
+        """
+        Starts recording the given (bounded) simulation to the given file,
+        with a keyframe every keyframeInterval steps. The first record is a
+        keyframe of the board as it is now.
+        """
+        if simulation.width == None or simulation.height == None:
+            raise Exception, "Only a bounded board can be recorded."
+        self.simulation = simulation
+        self.filename = filename
+        self.keyframeInterval = keyframeInterval
+        self.numRecords = 0
+        self._width = simulation.width
+        self._cells = {} # Maps the indices of the non-empty cells to their states, as last recorded.
+        self._monsterCells = set() # The indices of the cells last recorded with monsters in them.
+        self._genomesWritten = set() # The ids of the genomes written since the last keyframe.
+        metadataBytes = json.dumps({"config": _jsonConfig(simulation.config)}).encode("utf-8")
+        self._file = open(filename,"wb")
+        self._indexFile = open(indexFilename(filename),"wb")
+        self._file.write(_HEADER.pack(MAGIC,FORMAT_VERSION,simulation.width,simulation.height,
+                                      keyframeInterval,len(metadataBytes)))
+        self._file.write(metadataBytes)
+        self._changedCells = simulation.trackChanges()
+        self._writeKeyframe()
+    
+    def stepped(self,simulation):
+        """Records the step just taken: a keyframe if one is due, otherwise a delta."""
+        if simulation.stepCount % self.keyframeInterval == 0:
+            self._writeKeyframe()
+        else:
+            self._writeDelta()
+    
+    def close(self):
+        """Stops recording and closes the files."""
+        self.simulation.untrackChanges(self._changedCells)
+        self._file.close()
+        self._indexFile.close()
+    
+    def _writeKeyframe(self):
+        width = self._width
+        cells = {}
+        newGenomes = {}
+        for (x,y),element in self.simulation.iteritems():
+            if element == FOOD:
+                cells[y*width + x] = FOOD_STATE
+            else:
+                genome = element.dna
+                color = element.color
+                cells[y*width + x] = (MONSTER_CELL,element.hp,color[0],color[1],color[2],genome.id)
+                newGenomes[genome.id] = genome.string
+        self._cells = cells
+        self._monsterCells = set(index for index,state in cells.iteritems() if state[0] == MONSTER_CELL)
+        self._genomesWritten = set(newGenomes)
+        self._changedCells.clear()
+        self._writeRecord("K",sorted(cells.iteritems()),newGenomes)
+    
+    def _writeDelta(self):
+        width = self._width
+        get = self.simulation.get
+        cells = self._cells
+        monsterCells = self._monsterCells
+        genomesWritten = self._genomesWritten
+        candidates = set([y*width + x for x,y in self._changedCells])
+        candidates.update(monsterCells)
+        self._changedCells.clear()
+        changes = []
+        newGenomes = {}
+        for index in sorted(candidates):
+            y,x = divmod(index,width)
+            element = get((x,y))
+            if element == None:
+                state = EMPTY_STATE
+            elif element == FOOD:
+                state = FOOD_STATE
+            else:
+                genome = element.dna
+                color = element.color
+                state = (MONSTER_CELL,element.hp,color[0],color[1],color[2],genome.id)
+                if genome.id not in genomesWritten:
+                    genomesWritten.add(genome.id)
+                    newGenomes[genome.id] = genome.string
+            if state == cells.get(index,EMPTY_STATE):
+                continue
+            changes.append((index,state))
+            if state[0] == EMPTY_CELL:
+                del cells[index]
+            else:
+                cells[index] = state
+            if state[0] == MONSTER_CELL:
+                monsterCells.add(index)
+            else:
+                monsterCells.discard(index)
+        self._writeRecord("D",changes,newGenomes)
+    
+    def _writeRecord(self,kind,changes,newGenomes):
+        genomeBytes = json.dumps(sorted(newGenomes.iteritems())).encode("utf-8")
+        pack = _CELL.pack
+        payload = zlib.compress(genomeBytes + "".join([pack(index,*state) for index,state in changes]),COMPRESSION_LEVEL)
+        offset = self._file.tell()
+        self._file.write(_RECORD.pack(kind,self.simulation.stepCount,len(changes),len(genomeBytes),len(payload)))
+        self._file.write(payload)
+        self._file.flush()
+        self._indexFile.write(_INDEX_ENTRY.pack(self.simulation.stepCount,offset,kind))
+        self._indexFile.flush()
+        self.numRecords += 1
+
+
+class TrajectoryReader(object):
+    """
+    Reads the records of a trajectory file, using its index file to find
+    them. steps, offsets and kinds list the step, file offset and kind of
+    every record, in order.
+    """
+    def __init__(self,filename):
+        self.filename = filename
+        self._file = open(filename,"rb")
+        header = self._file.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            raise TrajectoryError, "{0} is not a trajectory file.".format(filename)
+        magic,version,self.width,self.height,self.keyframeInterval,metadataLength = _HEADER.unpack(header)
+        if magic != MAGIC:
+            raise TrajectoryError, "{0} is not a trajectory file.".format(filename)
+        if version != FORMAT_VERSION:
+            raise TrajectoryError, "{0} has unsupported format version {1}.".format(filename,version)
+        self.metadata = json.loads(self._file.read(metadataLength).decode("utf-8"))
+        self.steps = []
+        self.offsets = []
+        self.kinds = []
+        with open(indexFilename(filename),"rb") as indexFile:
+            indexBytes = indexFile.read()
+        for entryOffset in range(0,len(indexBytes) - _INDEX_ENTRY.size + 1,_INDEX_ENTRY.size):
+            step,offset,kind = _INDEX_ENTRY.unpack_from(indexBytes,entryOffset)
+            self.steps.append(step)
+            self.offsets.append(offset)
+            self.kinds.append(kind)
+        if not self.steps or self.kinds[0] != "K":
+            raise TrajectoryError, "{0} has no records.".format(filename)
+    
+    def __len__(self):
+        """Returns the number of records."""
+        return len(self.steps)
+    
+    def keyframeBefore(self,step):
+        """
+        Returns the position (in steps) of the last keyframe at or before the
+        given step, or of the first keyframe if the step is before that.
+        """
+        position = max(bisect_right(self.steps,step) - 1,0)
+        while self.kinds[position] != "K":
+            position -= 1
+        return position
+    
+    def read(self,position):
+        """
+        Returns the record at the given position, as (kind, step, genomes,
+        cells): genomes is a list of [id, DNA string] and cells a list of
+        (index, state).
+        """
+        self._file.seek(self.offsets[position])
+        kind,step,numCells,genomesLength,payloadLength = _RECORD.unpack(self._file.read(_RECORD.size))
+        payload = zlib.decompress(self._file.read(payloadLength))
+        genomes = json.loads(payload[:genomesLength].decode("utf-8"))
+        unpack = _CELL.unpack_from
+        cells = [(fields[0],fields[1:]) for fields in
+                 [unpack(payload,cellOffset) for cellOffset in
+                  range(genomesLength,genomesLength + numCells*_CELL.size,_CELL.size)]]
+        return kind,step,genomes,cells
+    
+    def close(self):
+        self._file.close()
+
+
+class ReplaySimulation(SimulationBase):
+    """
+    Plays back a trajectory file. It can be shown and stepped like any other
+    simulation (for instance by SimulationApp, or a SimulationRunner), but
+    each step only applies the next record of the file: no action is ever
+    run, and no random number is drawn. seek jumps to any recorded step.
+    
+    The monsters are Monster objects rebuilt from the recorded cells, so they
+    can be inspected and followed, but the recording doesn't say which
+    monster went where: a followed monster stays followed only until its
+    cell changes (other than by its HP).
+    """
+    def __init__(self,filename):
+        SimulationBase.__init__(self)
+        self.reader = TrajectoryReader(filename)
+        self.width,self.height = self.reader.width,self.reader.height
+        self.config = Config()
+        for name,value in self.reader.metadata["config"].iteritems():
+            # JSON turns tuples (such as colors) into lists, so turn them back.
+            self.config[str(name)] = tuple(value) if isinstance(value,list) else value
+        self.genomeRegistry = GenomeRegistry()
+        self._genomes = {} # Maps the recorded genome ids to the genomes interned in genomeRegistry.
+        self._elements = {} # Maps the indices of the non-empty cells to FOOD or a Monster.
+        self._numMonsters = 0
+        self._position = None # The position (in reader.steps) of the record last applied.
+        self.stepCount = None
+        self.seek(self.reader.steps[0])
+    
+    @property
+    def firstStep(self):
+        return self.reader.steps[0]
+    
+    @property
+    def lastStep(self):
+        return self.reader.steps[-1]
+    
+    def oneStep(self):
+        """
+        Applies the next record, if there is one, and returns the number of
+        monsters (or 0 at the end of the recording).
+        """
+        if self._position + 1 >= len(self.reader):
+            return 0
+        self._apply(self._position + 1)
+        return self._numMonsters
+    
+    def seek(self,step):
+        """
+        Shows the board as it was after the given step (or the nearest one
+        recorded), by applying the last keyframe before it and the deltas up
+        to it.
+        """
+        reader = self.reader
+        position = reader.keyframeBefore(step)
+        if not (self._position != None and position <= self._position and reader.steps[self._position] <= step):
+            self._apply(position)
+        while self._position + 1 < len(reader) and reader.steps[self._position + 1] <= step:
+            self._apply(self._position + 1)
+    
+    def _apply(self,position):
+        kind,step,genomes,cells = self.reader.read(position)
+        for genomeId,dnaString in genomes:
+            self._genomes[genomeId] = self.genomeRegistry.intern([actions.DNA_MAP[letter] for letter in dnaString])
+        elements = self._elements
+        width = self.width
+        if kind == "K":
+            oldElements = elements
+            self._elements = elements = {}
+            self._numMonsters = 0
+            for index,state in cells:
+                self._setCell(index,state,None)
+            for index,element in oldElements.iteritems():
+                newElement = elements.get(index)
+                if newElement == None or (element == FOOD) != (newElement == FOOD) or \
+                        (element != FOOD and (element.followed or element.color != newElement.color)):
+                    self.markChanged(Coords(index % width,index // width))
+            for index,element in elements.iteritems():
+                if index not in oldElements:
+                    self.markChanged(Coords(index % width,index // width))
+        else:
+            for index,state in cells:
+                if self._setCell(index,state,elements.get(index)):
+                    self.markChanged(Coords(index % width,index // width))
+        self._position = position
+        self.stepCount = step
+    
+    def _setCell(self,index,state,oldElement):
+        """
+        Sets the given cell to the given state, and returns whether it looks
+        any different. If it still holds a monster with the same genome and
+        color, only its HP is changed.
+        """
+        cellType,hp,red,green,blue,genomeId = state
+        elements = self._elements
+        oldIsMonster = oldElement != None and oldElement != FOOD
+        if cellType == MONSTER_CELL:
+            genome = self._genomes[genomeId]
+            color = (red,green,blue)
+            if oldIsMonster and oldElement.genome is genome and oldElement.color == color:
+                oldElement.hp = hp
+                return False
+            elements[index] = Monster(genome,hp,color)
+            if not oldIsMonster:
+                self._numMonsters += 1
+            return True
+        if oldIsMonster:
+            self._numMonsters -= 1
+        if cellType == FOOD_CELL:
+            elements[index] = FOOD
+            return oldElement != FOOD
+        elements.pop(index,None)
+        return oldElement != None
+    
+    def countMonsters(self):
+        """Returns the number of monsters on the board."""
+        return self._numMonsters
+    
+    def checkWithinBounds(self,coords):
+        x,y = coords
+        return 0 <= x < self.width and 0 <= y < self.height
+    
+    def get(self,coords,default=None):
+        """Returns the contents of the given coords, like Simulation.get."""
+        if not self.checkWithinBounds(coords):
+            return default
+        return self._elements.get(coords[1]*self.width + coords[0],default)
+    
+    def iteritems(self):
+        """Iterates over (coords,element) for every non-empty cell, like dict.iteritems."""
+        width = self.width
+        for index,element in self._elements.items():
+            yield Coords(index % width,index // width),element
+    
+    def items(self):
+        return list(self.iteritems())
+    
+    def getMonster(self,coords):
+        """Returns the monster at the given coords, or None if there isn't one."""
+        element = self.get(coords)
+        return element if element != FOOD else None
+    
+    def toggleMonsterFollowed(self,monster):
+        """
+        Toggles whether or not the given monster is followed. If this is the
+        first time the monster has been followed, it will also be named.
+        """
+        monster.followed = not monster.followed
+        if not monster.name:
+            name = self._nextName()
+            monster.name = name
+            print "Monster {0} renamed {1}.".format(id(monster),name)
@@ -8,12 +8,34 @@ class Board(dict):
     
     If width and height are not provided (or are None), then they are not limited,
     and nothing is considered out-of-bounds in that dimension.
+    
+    If wrap is true, the (bounded) board wraps around at the edges like a torus:
+    cells on the left edge are neighbors of cells on the right edge, and so on.
+    Keys must still be within the bounds, though.
+    
+    For a bounded board, the neighbors of every cell are worked out once, in
+    the constructor, so that getNeighbors is a single lookup. There is also
+    one canonical Coords object per cell (a flyweight), which the neighbor
+    table and cellAt return, so the board's keys are shared instead of
+    allocated again and again.
+    
+    Item access ([]) checks and converts its keys. Code which already has
+    in-bounds Coords (such as the ones from getNeighbors or from iterating
+    over the board) can use the unchecked fast path instead: get (which is
+    dict's), setUnchecked and deleteUnchecked.
     """
-    def __init__(self,width=None,height=None,neighborDirs=CARDINAL_DIRECTIONS):
+    def __init__(self,width=None,height=None,neighborDirs=CARDINAL_DIRECTIONS,wrap=False):
         dict.__init__(self)
+        if wrap and (width == None or height == None):
+            raise Exception, "Only a bounded board can wrap around."
         self.width = width
         self.height = height
+        self.wrap = wrap
         self._neighborDirs = neighborDirs
+        self._neighborTable = {}
+        self._cells = None # The canonical Coords of a bounded board, indexed by y*width+x.
+        if width != None and height != None:
+            self._buildNeighborTable()
     
     def __setitem__(self,key,value):
         """
@@ -21,25 +43,74 @@ class Board(dict):
         Coords. (You can pass in a regular 2-tuple and it will be converted.)
         It also ensures the coords are within the bounds of the board.
         """
-        coords = Coords.make(key) # Make sure everything is a Coord
-        if not self.checkWithinBounds(coords):
-            raise Exception, "{0} out of bounds.".format(coords)
-        else:
-            dict.__setitem__(self,coords,value)
+        dict.__setitem__(self,self.canonicalCoords(key),value)
     
     def __getitem__(self,key):
-        coords = Coords.make(key)
-        if not self.checkWithinBounds(coords):
-            raise Exception, "{0} out of bounds.".format(coords)
-        else:
-            return dict.__getitem__(self,coords)
+        return dict.__getitem__(self,self.canonicalCoords(key))
+    
+    # The unchecked fast path, for keys known to be in-bounds Coords.
+    setUnchecked = dict.__setitem__
+    deleteUnchecked = dict.__delitem__
+    
+    def canonicalCoords(self,key):
+        """
+        Returns the given key (Coords or a 2-tuple) as Coords: for a bounded
+        board, the canonical Coords of the cell. Raises an exception if it's
+        out of bounds.
+        """
+        if not self.checkWithinBounds(key):
+            raise Exception, "{0} out of bounds.".format(Coords.make(key))
+        if self._cells != None:
+            return self._cells[key[1]*self.width + key[0]]
+        return Coords.make(key)
+    
+    def cellAt(self,x,y):
+        """
+        Returns the canonical Coords of the cell at x,y of a bounded board,
+        without checking that it is within the bounds.
+        """
+        return self._cells[y*self.width + x]
     
     def checkWithinBounds(self,coords):
         """Returns true if the given coords are within the board's bounds."""
-        trueCoords = Coords.make(coords)
-        withinXBounds = (self.width == None) or (trueCoords.x >= 0 and trueCoords.x < self.width)
-        withinYBounds = (self.height == None) or (trueCoords.y >= 0 and trueCoords.y < self.height)
+        x,y = coords
+        withinXBounds = (self.width == None) or (0 <= x < self.width)
+        withinYBounds = (self.height == None) or (0 <= y < self.height)
         return withinXBounds and withinYBounds
     
     def getNeighbors(self,coords):
-        return [coords+dir.offset for dir in self._neighborDirs if self.checkWithinBounds(coords+dir.offset)]
+        """
+        Returns a tuple of the coords neighboring the given coords (in the
+        board's neighbor directions) that are within the board. For a bounded
+        board this is looked up in the precomputed table, so the same tuple is
+        returned every time; it must not be modified.
+        """
+        try:
+            return self._neighborTable[coords]
+        except KeyError:
+            return self._computeNeighbors(Coords.make(coords))
+    
+    def _computeNeighbors(self,coords):
+        """Works out the neighbors of the given coords, without the table."""
+        neighbors = []
+        for dir in self._neighborDirs:
+            neighbor = coords + dir.offset
+            if self.wrap:
+                neighbor = Coords(neighbor.x % self.width, neighbor.y % self.height)
+                if neighbor == coords or neighbor in neighbors:
+                    continue # Only possible on a board 1 or 2 cells wide.
+            elif not self.checkWithinBounds(neighbor):
+                continue
+            neighbors.append(neighbor)
+        return tuple(neighbors)
+    
+    def _buildNeighborTable(self):
+        """
+        Fills in the neighbor table (and the canonical Coords) for every cell
+        of a bounded board. The tuples share the canonical Coords.
+        """
+        width = self.width
+        self._cells = cells = [Coords(index % width, index // width) for index in xrange(width*self.height)]
+        for coords in cells:
+            self._neighborTable[coords] = tuple([cells[neighbor.y*width + neighbor.x]
+                                                 for neighbor in self._computeNeighbors(coords)])
@@ -31,6 +31,8 @@ class Coords(namedtuple("Coords",["x","y"])):
         -two keyword arguments x and y (numbers).
         """
         if not kwargs and len(args) == 1:
+            if type(args[0]) is cls:
+                return args[0] # Coords are immutable, so there's no need to copy them.
             return cls._make(args[0])
         else:
             return cls(*args,**kwargs)
@@ -48,10 +50,10 @@ class Coords(namedtuple("Coords",["x","y"])):
         return self.__add__(other)
     
     def __sub__(self,other):
-        return self + (-other)
+        return Coords(self.x - other.x, self.y - other.y)
     
     def __rsub__(self,other):
-        return other + (-self)
+        return Coords(other[0] - self.x, other[1] - self.y) # other may be a plain tuple.
     
     def __mul__(self,scalar):
         """
@@ -7,6 +7,8 @@ Created on Sep 29, 2011
 @author: garrison
 '''
 
+import os
+
 class Config(dict):
     """
     This class provides a dead-simple mechanism for loading config files
@@ -36,6 +38,8 @@ class Config(dict):
     class is not suitable for production applications, only quick-and-dirty
     ones.
     """
+    _cache = {} # Maps filenames to (modification times, loaded Config), for load.
+    
     def __init__(self,*filenames):
         """
         Creates a Config object, loading from one or more filenames in the
@@ -45,6 +49,24 @@ class Config(dict):
         for filename in filenames:
             execfile(filename,self)
     
+    @classmethod
+    def load(cls,*filenames):
+        """
+        Returns a Config object loaded from the given filenames, like the
+        constructor, except that the files are only run again if one of them
+        has been modified since the last time they were loaded. Otherwise, a
+        copy of the Config loaded then is returned. (The copy is shallow, so
+        its values shouldn't be changed in place.)
+        """
+        modificationTimes = tuple(os.path.getmtime(filename) for filename in filenames)
+        cached = cls._cache.get(filenames)
+        if cached == None or cached[0] != modificationTimes:
+            cached = (modificationTimes,cls(*filenames))
+            cls._cache[filenames] = cached
+        config = cls()
+        config.update(cached[1])
+        return config
+    
     def __getattr__(self,name):
         try:
             value = self[name]
@@ -230,8 +230,11 @@ class PygameApp(object):
         self.tick()
         handlePygameEvents(self)
         self.step()
-        self.draw(self._screen)
-        _pygame.display.flip()
+        dirtyRects = self.draw(self._screen)
+        if dirtyRects == None:
+            _pygame.display.flip()
+        elif dirtyRects:
+            _pygame.display.update(dirtyRects)
     
     def step(self):
         """
@@ -254,6 +257,10 @@ class PygameApp(object):
     def draw(self,screen):
         """
         Override this method to specify how the PygameApp subclass is drawn.
+        
+        If it only redraws part of the screen, it can return a list of the
+        rects it changed, and only those will be updated on the display. If it
+        returns None (the default), the whole display is updated.
         """
         pass
 